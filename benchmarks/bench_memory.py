@@ -0,0 +1,131 @@
+# benchmarks/bench_memory.py
+# Pic de mémoire (ru_maxrss) des étapes écriture / rapport / site pour un
+# catalogue synthétique de taille 1x puis 100x, en mode normal et en mode
+# streaming (utils/streaming.py). Chaque mesure tourne dans un processus neuf.
+#
+#   python benchmarks/bench_memory.py                  # 1x = 1 000 produits
+#   python benchmarks/bench_memory.py --base 500 --scales 1 10 100 --memory-mb 200
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STAGES = ("write", "report", "site")
+PER_SUBCAT = 100
+
+
+def make_catalog(data_dir, n_products):
+    """data/ScraperDefault/<sous-cat>/products.json, PER_SUBCAT produits chacun."""
+    n_sub = max(1, n_products // PER_SUBCAT)
+    words = ["Écran", "Casque", "Clavier", "Souris", "Enceinte", "Chargeur", "Câble", "Support"]
+    brands = ["Samsung", "Logitech", "Sony", "Anker", "Philips"]
+    for s in range(n_sub):
+        sub = os.path.join(data_dir, "ScraperDefault", f"Sous_cat_{s}")
+        os.makedirs(sub, exist_ok=True)
+        recs = []
+        for i in range(PER_SUBCAT):
+            n = s * PER_SUBCAT + i
+            recs.append({
+                "asin": f"B{n:09d}",
+                "name": f"{words[n % len(words)]} {brands[n % len(brands)]} modèle {n}",
+                "description": f"Produit de test {n} " * 6,
+                "price": f"{10 + n % 490},99 €",
+                "url": f"https://www.amazon.fr/dp/B{n:09d}",
+                "brand": brands[n % len(brands)],
+                "image_url": f"https://m.media-amazon.com/images/I/{n}.jpg",
+                "image_local": None,
+            })
+        with open(os.path.join(sub, "products.json"), "w", encoding="utf-8") as f:
+            json.dump(recs, f, ensure_ascii=False, indent=2)
+
+
+def run_stage(stage, data_dir, work_dir, stream, memory_mb):
+    """Exécuté dans le processus enfant : retourne le pic de RSS (Mo) au-delà des imports."""
+    from utils import streaming
+    from utils.catalog import discover_product_files
+    from controller.saver import ProductsJsonWriter, save_products_json
+    from view.report import build_report
+    import generate_html
+    streaming.configure(stream, memory_mb=memory_mb)
+    base = streaming.peak_rss_mb()
+    if stage == "write":
+        # équivalent de _scrape_subcategory : tout le catalogue dans un products.json
+        files = discover_product_files(data_dir)
+        out = os.path.join(work_dir, "write")
+        if stream:
+            with ProductsJsonWriter(out) as w:
+                for path in files:
+                    for rec in streaming.iter_json_array(path):
+                        w.write(rec)
+        else:
+            products = []
+            for path in files:
+                with open(path, "r", encoding="utf-8") as f:
+                    products.extend(json.load(f))
+            save_products_json(products, out)
+    elif stage == "report":
+        build_report(data_dir)
+    else:
+        generate_html.generate_site(data_dir, os.path.join(work_dir, "site"), force=True, thumbs=False,
+                                    precompress=False)
+    return streaming.peak_rss_mb() - base
+
+
+def child(args):
+    import contextlib, io
+    with contextlib.redirect_stdout(io.StringIO()):
+        mb = run_stage(args.stage, args.data, args.work, args.stream, args.memory_mb)
+    print(json.dumps({"peak_mb": round(mb, 1)}))
+
+
+def measure(stage, data_dir, stream, memory_mb):
+    work = tempfile.mkdtemp(prefix="bench_mem_")
+    try:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", stage, "--data", data_dir, "--work", work]
+        if stream:
+            cmd.append("--stream")
+        if memory_mb:
+            cmd += ["--memory-mb", str(memory_mb)]
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip()[-500:])
+        return json.loads(proc.stdout.strip().splitlines()[-1])["peak_mb"]
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pic mémoire par étape, catalogue 1x -> 100x")
+    ap.add_argument("--base", type=int, default=1000, help="produits du catalogue 1x")
+    ap.add_argument("--scales", type=int, nargs="+", default=[1, 100])
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    ap.add_argument("--memory-mb", type=float, default=None, help="plafond passé au mode streaming")
+    ap.add_argument("--child", choices=STAGES, dest="stage", help=argparse.SUPPRESS)
+    ap.add_argument("--data", help=argparse.SUPPRESS)
+    ap.add_argument("--work", help=argparse.SUPPRESS)
+    ap.add_argument("--stream", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.stage:
+        return child(args)
+
+    print(f"{'produits':>9} {'étape':>7} {'normal (Mo)':>12} {'streaming (Mo)':>15}")
+    for scale in args.scales:
+        data_dir = tempfile.mkdtemp(prefix="bench_data_")
+        try:
+            make_catalog(data_dir, args.base * scale)
+            for stage in args.stages:
+                normal = measure(stage, data_dir, False, None)
+                streamed = measure(stage, data_dir, True, args.memory_mb)
+                print(f"{args.base * scale:>9} {stage:>7} {normal:>12.1f} {streamed:>15.1f}")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_normalize.py
+# Normalisation prix / marque / vendeur (utils/normalize.py) sur un lot
+# synthétique de produits bruts, tels que stockés par parse_product_page :
+# enregistrement par enregistrement (normalize_records) contre opérations
+# vectorisées pandas (normalize_frame, construction du DataFrame comprise).
+# Vérifie aussi que les deux donnent le même résultat.
+#
+#   python benchmarks/bench_normalize.py                    # 10 000 et 100 000 produits
+#   python benchmarks/bench_normalize.py --sizes 1000 1000000 --repeat 1
+import os
+import sys
+import time
+import math
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PRICES = ["{w} {c},99 €", "{w}{c},00 €", "{w} {c},", "${w},{c}.99", "£{w}{c}.50", "{w}{c}", "EUR {w}{c},5",
+          "Prix non disponible", None]
+BRANDS = ["Visiter la boutique {b}", "Marque : {B}", "Visit the {b} Store", "{b}", "  {b}  ", "Marque : {b}", None]
+SELLERS = ["Expédié par Amazon. Vendu par {s}.", "Vendu et expédié par Amazon.", "Ships from and sold by Amazon.com.",
+           "Vendu par {s} et expédié par Amazon.", "{s}", "Expédié par Amazon.", "Sold by {s} and Fulfilled by Amazon.",
+           None]
+BRAND_NAMES = ["Samsung", "Logitech", "Sony", "Anker", "Philips", "JBL", "Xiaomi", "Bose"]
+SELLER_NAMES = ["TechStore France", "ElectroDepot", "Boutique Martin", "MegaDiscount", "Amazon EU S.à r.l."]
+DOMAINS = ["fr", "fr", "fr", "de", "it", "co.uk", "com"]
+
+
+def make_records(n):
+    recs = []
+    for i in range(n):
+        b = BRAND_NAMES[i % len(BRAND_NAMES)]
+        price = PRICES[i % len(PRICES)]
+        brand = BRANDS[(i // 3) % len(BRANDS)]
+        seller = SELLERS[(i // 5) % len(SELLERS)]
+        recs.append({
+            "asin": f"B{i:09d}",
+            "name": f"Produit {b} {i}",
+            "subcategory": f"Sous_cat_{i % 40}",
+            "price": price.format(w=1 + i % 3, c=f"{i % 1000:03d}") if price else None,
+            "brand": brand.format(b=b, B=b.upper()) if brand else None,
+            "seller": seller.format(s=SELLER_NAMES[i % len(SELLER_NAMES)]) if seller else None,
+            "rating": round(3 + (i % 20) / 10, 1),
+            "url": f"https://www.amazon.{DOMAINS[i % len(DOMAINS)]}/dp/B{i:09d}",
+            "source": f"ScraperDefault/Sous_cat_{i % 40}",
+        })
+    return recs
+
+
+def best_of(fn, repeat):
+    best, result = math.inf, None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t)
+    return best, result
+
+
+def same(a, b):
+    if len(a) != len(b):
+        return False
+    for ra, rb in zip(a, b):
+        for k, va in ra.items():
+            vb = rb.get(k)
+            if isinstance(va, float) and isinstance(vb, float):
+                if not math.isclose(va, vb):
+                    return False
+            elif va != vb:
+                return False
+    return True
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Normalisation par enregistrement vs vectorisée (pandas)")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=3, help="meilleur de N mesures")
+    args = ap.parse_args(argv)
+
+    from utils import normalize
+    pd = normalize._pd()
+    if pd is None:
+        sys.exit("pandas n'est pas installé (pip install pandas)")
+
+    print(f"{'produits':>9} {'par enregistrement (s)':>23} {'vectorisé (s)':>14} {'gain':>6}  identique")
+    for n in args.sizes:
+        recs = make_records(n)
+        t_rec, by_record = best_of(lambda: normalize.normalize_records(recs), args.repeat)
+        t_vec, frame = best_of(lambda: normalize.normalize_frame(pd.DataFrame.from_records(recs)), args.repeat)
+        ok = same(by_record, normalize.frame_to_records(frame))
+        print(f"{n:>9} {t_rec:>23.3f} {t_vec:>14.3f} {t_rec / t_vec:>5.1f}x  {'oui' if ok else 'NON'}")
+
+
+if __name__ == "__main__":
+    main()
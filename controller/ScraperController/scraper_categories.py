@@ -1,8 +1,12 @@
 # controller/ScraperController/scraper_categories.py
 from typing import List, Tuple, Optional
 from ..fetcher import init_driver, fetch_page
+from ..antibot import BlockedPageError
 from ..parser import extract_product_links, parse_product_page, get_subcategory_links_from_html
 from ..utils import ensure_dir, safe_filename, jitter_sleep
+from .scraper_default import new_subcat_stats, retry_dead_letters
+from .. import category_cache
+from ..marketplace import base_url
 from utils.downloader import download_image_to_dir
 from urllib.parse import urlparse, parse_qs
 import os, time, random
@@ -19,20 +23,30 @@ ensure_dir(ROOT)
 
 def _get_subcats(driver, category_url, max_subcats=5):
     """Use driver-aware parser if present, else HTML-only fallback (this function is internal).
-    It always returns a dict of {name: url} (possibly empty).
+    It always returns a dict of {name: url} (possibly empty). Results are
+    shared with the other modes through the category tree cache.
     """
+    return category_cache.cached_subcats(category_url, max_subcats,
+                                         lambda: _discover_subcats(driver, category_url, max_subcats))
+
+
+def _discover_subcats(driver, category_url, max_subcats=5):
     if get_subcategory_links is not None:
         return get_subcategory_links(driver, category_url, max_subcats=max_subcats) or {}
     # fallback to fetch_page + html parser helper
-    html = fetch_page(driver, category_url)
-    return get_subcategory_links_from_html(html, max_subcats=max_subcats) or {}
+    try:
+        html = fetch_page(driver, category_url, page_type="category")
+    except BlockedPageError as e:
+        print(f"Page catégorie bloquée ({e}) -> scrape direct de l'URL.")
+        return {}
+    return get_subcategory_links_from_html(html, base_domain=base_url(category_url), max_subcats=max_subcats) or {}
 
 
 def _scrape_subcategory(driver, name: str, url: str, out_dir: str,
-                        max_products: int, max_pages: int):
+                        max_products: int, max_pages: int, stats=None):
     # delegate to the implementation in scraper_default to keep behavior identical
     mod = __import__("controller.ScraperController.scraper_default", fromlist=["*"])
-    return mod._scrape_subcategory(driver, name, url, out_dir, max_products, max_pages)  # type: ignore
+    return mod._scrape_subcategory(driver, name, url, out_dir, max_products, max_pages, stats=stats)  # type: ignore
 
 
 def _infer_category_name(parsed) -> str:
@@ -102,15 +116,19 @@ def scrape_category(
             print("Aucune sous-catégorie trouvée -> scrape de la page fournie.")
             out_dir = os.path.join(out_root, safe_category)
             ensure_dir(out_dir)
-            prods = _scrape_subcategory(driver, category_name, category_url, out_dir, max_products, max_pages)
+            stats = new_subcat_stats(category_name)
+            prods = _scrape_subcategory(driver, category_name, category_url, out_dir, max_products, max_pages, stats=stats)
 
             saved = []
             for p in prods:
                 if storage.is_processed(p.asin):
+                    stats["already_processed"] += 1
                     continue
                 storage.mark_processed(p.asin, safe_category)
                 saved.append(p)
-            results.append((category_name, category_url, len(saved)))
+            stats["saved"] = len(saved)
+            results.append((category_name, category_url, len(saved), stats))
+            retry_dead_letters(driver, storage, out_root, results)
             return results
 
         # When subcategories are present, create each subfolder under out_root
@@ -118,15 +136,19 @@ def scrape_category(
         for i, (sub_name, sub_url) in enumerate(items, 1):
             print(f"\n--[{i}/{len(items)}] {sub_name} --")
             # out_dir is out_root so _scrape_subcategory will create the actual subfolder inside out_root
-            prods = _scrape_subcategory(driver, sub_name, sub_url, out_root, max_products, max_pages)
+            stats = new_subcat_stats(sub_name)
+            prods = _scrape_subcategory(driver, sub_name, sub_url, out_root, max_products, max_pages, stats=stats)
             saved = []
             for p in prods:
                 if storage.is_processed(p.asin):
+                    stats["already_processed"] += 1
                     continue
                 storage.mark_processed(p.asin, safe_filename(sub_name))
                 saved.append(p)
-            results.append((sub_name, sub_url, len(saved)))
+            stats["saved"] = len(saved)
+            results.append((sub_name, sub_url, len(saved), stats))
             time.sleep(random.uniform(0.5, 1.2))
+        retry_dead_letters(driver, storage, out_root, results)
 
     finally:
         if created_driver:
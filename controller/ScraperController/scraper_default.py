@@ -1,11 +1,115 @@
-from typing import List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from ..fetcher import init_driver, fetch_page
-from ..parser import extract_product_links, parse_product_page, get_subcategory_links_from_html
+from ..antibot import BlockedPageError
+from .. import category_cache, dead_letter, freshness, tabs
+from ..marketplace import base_url
+from ..parser import extract_product_links, parse_listing_results, parse_product_page, get_subcategory_links_from_html
 from ..utils import ensure_dir, safe_filename, jitter_sleep
 from utils.downloader import download_image_to_dir
 from view.progress import get_progress
+from utils import streaming, trace
+from collections import namedtuple, deque
 import os, time, random
 
+# en mode streaming, _scrape_subcategory ne garde que ceci par produit
+ProductRef = namedtuple("ProductRef", "asin name")
+
+# une page bloquée (captcha) est remise en fin de file ce nombre de fois ;
+# le disjoncteur de l'hôte (controller.antibot) espace les nouvelles tentatives
+BLOCK_RETRIES = 1
+
+# mode "listing seul" : les produits sont construits à partir des cartes de
+# résultats (titre, prix, note, vignette), une page chargée pour ~48 produits ;
+# enrich_incomplete va chercher la fiche produit seulement s'il manque un champ
+# de LISTING_REQUIRED sur la carte.
+SETTINGS = {"listing_only": False, "enrich_incomplete": True}
+LISTING_REQUIRED = ("name", "price", "image_url")
+
+
+def configure(listing_only: Optional[bool] = None, enrich_incomplete: Optional[bool] = None):
+    if listing_only is not None:
+        SETTINGS["listing_only"] = bool(listing_only)
+    if enrich_incomplete is not None:
+        SETTINGS["enrich_incomplete"] = bool(enrich_incomplete)
+
+
+def _incomplete(card: Dict[str, Any]) -> bool:
+    return any(not card.get(k) for k in LISTING_REQUIRED)
+
+
+def _iter_product_pages(driver, todo: deque, stop):
+    """((asin, url, attempt), html, erreur) pour chaque élément de todo : une
+    page à la fois avec fetch_page, ou plusieurs onglets en vol (controller.tabs)
+    et dans l'ordre où ils finissent. todo peut grossir pendant l'itération."""
+    if tabs.enabled():
+        yield from tabs.pool_for(driver).fetch_many(todo, stop, page_type="product")
+        return
+    while todo and not stop():
+        item = todo.popleft()
+        try:
+            html = fetch_page(driver, item[1], page_type="product")
+        except Exception as e:
+            yield item, None, e
+            continue
+        yield item, html, None
+
+
+def _dead_letter(kind: str, asin: str, url: str, error: Optional[str], **context):
+    """Note l'échec dans la dead-letter queue (rejoué en fin de run / au run suivant)."""
+    if dead_letter.enabled() and asin and url:
+        dead_letter.get_queue().add(kind, f"{kind}:{asin}", url, error or "", asin=asin, **context)
+
+
+def _carry_policy(scheduled: bool, dlq) -> Union[bool, Callable[[str], bool]]:
+    """
+    Produits de l'ancien products.json recopiés à la fin du run : sans
+    ordonnanceur, le fichier est remplacé sauf pour les ASINs encore en
+    attente dans la dead-letter queue (gardés jusqu'à leur reprise) ; avec
+    l'ordonnanceur, tout ASIN non re-scrapé (laissé de côté car frais) reste.
+    """
+    if scheduled:
+        return True
+    if dlq is not None:
+        return lambda asin: dlq.is_pending(f"product:{asin}")
+    return False
+
+
+def _build_product(asin: str, url: str, subcategory: str, info: Dict[str, Any]):
+    from model.product import Product
+    prod = Product(
+        asin=asin,
+        name=info.get("name"),
+        desc=info.get("description"),
+        price=info.get("price"),
+        url=url,
+        subcategory=subcategory,
+    )
+    prod.brand = info.get("brand")
+    prod.rating = info.get("rating")
+    prod.image_url = info.get("image_url")
+    return prod
+
+
+def _download_image(prod, images_dir: str, sub_dir: str) -> bool:
+    """Télécharge l'image du produit (image_local) ; en cas d'échec l'image part
+    dans la dead-letter queue au lieu d'être réessayée ici."""
+    saved = download_image_to_dir(prod.image_url, images_dir, prod.name, prod.asin, safe_filename)
+    prod.image_local = os.path.relpath(saved) if saved else None
+    if not saved:
+        _dead_letter("image", prod.asin, prod.image_url, "échec du téléchargement",
+                     name=prod.name, images_dir=images_dir, sub_dir=sub_dir)
+    return bool(saved)
+
+
+def _product_error(stats: Dict[str, Any], asin: str, e: Exception) -> Tuple[str, str]:
+    stats["errors"] += 1
+    try:
+        from tqdm import tqdm
+        tqdm.write(f"      Erreur produit {asin}: {e}")
+    except Exception:
+        print(f"      Erreur produit {asin}: {e}")
+    return "error", f"{type(e).__name__}: {e}"
+
 
 try:
     from ..parser import get_subcategory_links  # may not exist
@@ -13,6 +117,11 @@ except Exception:
     get_subcategory_links = None
 
 def _get_subcats(driver, category_url, max_subcats=5):
+    """Subcategories of category_url, from the category tree cache when fresh."""
+    return category_cache.cached_subcats(category_url, max_subcats,
+                                         lambda: _discover_subcats(driver, category_url, max_subcats))
+
+def _discover_subcats(driver, category_url, max_subcats=5):
     if get_subcategory_links is not None:
         try:
             return get_subcategory_links(driver, category_url, max_subcats=max_subcats)
@@ -20,21 +129,74 @@ def _get_subcats(driver, category_url, max_subcats=5):
             pass
     html = ""
     try:
-        html = fetch_page(driver, category_url)
+        html = fetch_page(driver, category_url, page_type="category")
     except Exception:
         try:
             html = getattr(driver, "page_source", "") or ""
         except Exception:
             html = ""
     try:
-        return get_subcategory_links_from_html(html, max_subcats=max_subcats) or {}
+        return get_subcategory_links_from_html(html, base_domain=base_url(category_url), max_subcats=max_subcats) or {}
     except Exception:
         return {}
 
+def new_subcat_stats(name: str = "") -> Dict[str, Any]:
+    """Counters and timings (seconds) collected for one subcategory run."""
+    return {
+        "dir": safe_filename(name) if name else "",
+        "path": "",       # dossier de la sous-catégorie (clé du rapport, cf. view.report)
+        "found": 0,
+        "already_processed": 0,
+        "fetched": 0,
+        "parse_failures": 0,
+        "image_failures": 0,
+        "errors": 0,
+        "blocked": 0,
+        "blocked_urls": [],
+        "skipped_fresh": 0,
+        "from_listing": 0,
+        "recovered": 0,
+        "written": 0,
+        "saved": 0,
+        "pages": 0,
+        "timings": {"listing": 0.0, "product_fetch": 0.0, "parse": 0.0, "image": 0.0, "total": 0.0},
+    }
+
+
 def _scrape_subcategory(driver, name: str, url: str, out_dir: str,
-                        max_products: int, max_pages: int) -> List[object]:
+                        max_products: int, max_pages: int,
+                        stats: Optional[Dict[str, Any]] = None) -> List[object]:
+    """Scrape one subcategory listing and return the parsed products.
+
+    Block pages (BlockedPageError) are counted in stats["blocked"] and the
+    URL is retried later in the same pass (BLOCK_RETRIES times); URLs still
+    blocked end up in stats["blocked_urls"], and stats["blocked_listing"] is
+    set when the listing page itself could not be read.
+
+    Every scraped product is recorded in the freshness tracker; when the
+    scheduler is enabled (controller.freshness) the listing is reordered and
+    cut by its priorities and the run's fetch budget.
+
+    In listing-only mode (SETTINGS) products come from the result cards and
+    only incomplete ones cost a product page fetch (stats["from_listing"]
+    counts the others). With several tabs (controller.tabs) product pages
+    load concurrently in the same browser and are handled as they finish.
+
+    Products are appended to products.json as soon as they are parsed; in
+    streaming mode (utils.streaming) only ProductRef(asin, name) is kept and
+    returned. If `stats` is given (see new_subcat_stats) it is filled in
+    place with the found / fetched / failure counters and per-stage timings.
+    """
+    if stats is None:
+        stats = {}
+    for k, v in new_subcat_stats(name).items():
+        stats.setdefault(k, v)
+    timings = stats["timings"]
+    started = time.perf_counter()
     safe_name = safe_filename(name)
+    stats["dir"] = safe_name
     sub_dir = os.path.join(out_dir, safe_name)
+    stats["path"] = sub_dir
     images_dir = os.path.join(sub_dir, "images")
     ensure_dir(sub_dir)
     ensure_dir(images_dir)
@@ -44,68 +206,259 @@ def _scrape_subcategory(driver, name: str, url: str, out_dir: str,
     page_count = 0
     collected = 0
 
-    from ..saver import save_products_json
+    from ..saver import ProductsJsonWriter
+    keep_refs = streaming.enabled()
+    tracker = freshness.get_tracker()
+    scheduled = freshness.enabled()
+    listing_only = SETTINGS["listing_only"]
+    dlq = dead_letter.get_queue() if dead_letter.enabled() else None
+    failed = dict(subcategory=name, sub_dir=sub_dir, images_dir=images_dir, listing_url=url)
+    enrich = SETTINGS["enrich_incomplete"]
+
+    with ProductsJsonWriter(sub_dir, keep_existing=_carry_policy(scheduled, dlq)) as writer, \
+            get_progress(total=max_products, desc=safe_name, unit="prod", ncols=80) as pbar:
+
+        def save_product(asin, p_url, info):
+            """None si le produit est enregistré, sinon (issue, erreur) pour la trace."""
+            try:
+                return None if _save(asin, p_url, info) else ("parse_failure", None)
+            except Exception as e:
+                return _product_error(stats, asin, e)
+
+        def _save(asin, p_url, info) -> bool:
+            nonlocal collected
+            if not info.get("name"):
+                stats["parse_failures"] += 1
+                return False
+            prod = _build_product(asin, p_url, name, info)
+
+            if prod.image_url:
+                t0 = time.perf_counter()
+                if not _download_image(prod, images_dir, sub_dir):
+                    stats["image_failures"] += 1
+                timings["image"] += time.perf_counter() - t0
+
+            writer.write(prod)
+            if dlq is not None:
+                dlq.succeed(f"product:{asin}")
+            tracker.record(prod.asin, prod.scraped_at, prod.price, p_url, name)
+            products.append(ProductRef(prod.asin, prod.name) if keep_refs else prod)
+            collected += 1
+            try:
+                pbar.update(1)
+                pbar.set_description(f"{safe_name} {collected}/{max_products}")
+            except Exception:
+                pass
+            return True
 
-    with get_progress(total=max_products, desc=safe_name, unit="prod", ncols=80) as pbar:
+        def stop(in_flight=0):
+            # pages en vol (onglets) comptées comme déjà prises
+            if collected + in_flight >= max_products:
+                return True
+            return scheduled and tracker.remaining() is not None and tracker.remaining() <= in_flight
+
+        listing_attempts = 0
         while page_url and page_count < max_pages and collected < max_products:
-            html = fetch_page(driver, page_url)
+            t0 = time.perf_counter()
+            try:
+                html = fetch_page(driver, page_url, page_type="listing")
+            except BlockedPageError:
+                stats["blocked"] += 1
+                timings["listing"] += time.perf_counter() - t0
+                trace.done(page_url, retry=listing_attempts)
+                if listing_attempts < BLOCK_RETRIES:
+                    listing_attempts += 1
+                    continue
+                stats["blocked_listing"] = True
+                stats["blocked_urls"].append(page_url)
+                break
+            t1 = time.perf_counter()
+            if listing_only:
+                cards = {c["asin"]: c for c in parse_listing_results(html, base_url(page_url))}
+                links = [(c["asin"], c["url"]) for c in cards.values()]
+            else:
+                cards = {}
+                links = extract_product_links(html, base_url(page_url))
+            timings["listing"] += time.perf_counter() - t0
+            trace.done(page_url, parse_s=time.perf_counter() - t1, retry=listing_attempts, found=len(links))
             jitter_sleep(0.5, 1.2)
-            links = extract_product_links(html)
+            stats["pages"] += 1
             if not links:
                 break
+            stats["found"] += len(links)
+            may_fetch = None   # ASINs dont la fiche peut être chargée (None : tous)
+            if scheduled and listing_only:
+                # les cartes ne coûtent rien : toutes sont gardées ; le plan (et le
+                # budget) ne porte que sur les fiches chargées pour les compléter
+                to_enrich = [(a, u) for a, u in links if enrich and _incomplete(cards[a])]
+                may_fetch = {a for a, _ in tracker.plan(to_enrich, limit=max_products - collected)}
+                stats["skipped_fresh"] += len(to_enrich) - len(may_fetch)
+            elif scheduled:
+                planned = tracker.plan(links, limit=max_products - collected, subcategory=name)
+                listed = {a for a, _ in links}
+                stats["skipped_fresh"] += len(listed - {a for a, _ in planned})
+                links = planned
 
+            todo = deque()
             for asin, p_url in links:
-                if collected >= max_products:
-                    break
-                try:
-                    prod_html = fetch_page(driver, p_url)
-                    info = parse_product_page(prod_html)
-                    namep = info.get("name")
-                    if not namep:
-                        continue
-
-                    from model.product import Product
-                    prod = Product(
-                        asin=asin,
-                        name=namep,
-                        desc=info.get("description"),
-                        price=info.get("price"),
-                        url=p_url,
-                        subcategory=name,
-                    )
-                    prod.brand = info.get("brand")
-                    prod.image_url = info.get("image_url")
-
-                    if prod.image_url:
-                        saved = download_image_to_dir(prod.image_url, images_dir, prod.name, prod.asin, safe_filename)
-                        prod.image_local = os.path.relpath(saved) if saved else None
-
-                    products.append(prod)
-                    collected += 1
-                    try:
-                        pbar.update(1)
-                        pbar.set_description(f"{safe_name} {collected}/{max_products}")
-                    except Exception:
-                        pass
+                card = cards.get(asin)
+                if card is not None and not (enrich and _incomplete(card) and (may_fetch is None or asin in may_fetch)):
+                    if collected >= max_products:
+                        break
+                    stats["from_listing"] += 1
+                    save_product(asin, p_url, card)
+                else:
+                    todo.append((asin, p_url, 0))
 
-                except Exception as e:
+            t_wait = time.perf_counter()
+            for (asin, p_url, attempt), prod_html, err in _iter_product_pages(driver, todo, stop):
+                timings["product_fetch"] += time.perf_counter() - t_wait
+                card = cards.get(asin)
+                if isinstance(err, BlockedPageError):
+                    trace.done(p_url, retry=attempt)
+                    stats["blocked"] += 1
+                    if attempt < BLOCK_RETRIES:
+                        todo.append((asin, p_url, attempt + 1))
+                    elif card is not None:
+                        # enrichissement bloqué : on garde les données de la carte
+                        stats["from_listing"] += 1
+                        save_product(asin, p_url, card)
+                    else:
+                        stats["blocked_urls"].append(p_url)
+                        _dead_letter("product", asin, p_url, str(err), **failed)
+                elif err is not None:
+                    outcome, error = _product_error(stats, asin, err)
+                    trace.done(p_url, retry=attempt, outcome=outcome, error=error)
+                    _dead_letter("product", asin, p_url, error, **failed)
+                else:
+                    parse_s = None
                     try:
-                        from tqdm import tqdm
-                        tqdm.write(f"      Erreur produit {asin}: {e}")
-                    except Exception:
-                        print(f"      Erreur produit {asin}: {e}")
-                    continue
+                        tracker.spend()
+                        stats["fetched"] += 1
+                        t1 = time.perf_counter()
+                        detail = parse_product_page(prod_html)
+                        parse_s = time.perf_counter() - t1
+                        timings["parse"] += parse_s
+                        # la fiche complète la carte (ses valeurs priment quand elle en a)
+                        failure = save_product(asin, p_url, dict(card or {}, **{k: v for k, v in detail.items() if v}))
+                    except Exception as e:
+                        failure = _product_error(stats, asin, e)
+                        _dead_letter("product", asin, p_url, failure[1], **failed)
+                    outcome, error = failure or (None, None)
+                    trace.done(p_url, parse_s=parse_s, retry=attempt, outcome=outcome, error=error)
+                    if not tabs.enabled():
+                        jitter_sleep(0.2, 0.6)
+                t_wait = time.perf_counter()
 
-                jitter_sleep(0.2, 0.6)
+            # budget de fraîcheur épuisé en mode listing : le reste garde les données des cartes
+            for asin, p_url, _ in todo:
+                card = cards.get(asin)
+                if card is None or collected >= max_products:
+                    break
+                stats["from_listing"] += 1
+                save_product(asin, p_url, card)
 
             page_count += 1
             page_url = None
 
-    file_path = save_products_json(products, sub_dir)
+    file_path = writer.path
+    try:
+        tracker.save()
+        if dlq is not None:
+            dlq.save()
+    except Exception:
+        pass
+    stats["written"] = writer.count
+    timings["total"] = round(time.perf_counter() - started, 3)
+    for k in ("listing", "product_fetch", "parse", "image"):
+        timings[k] = round(timings[k], 3)
     print(f"    Sauvegardé {len(products)} produits -> {file_path}")
     return products
 
 
+def retry_dead_letters(driver, storage, out_root: str, results: List[tuple]) -> Dict[str, int]:
+    """
+    Replay the due dead-letter entries whose subcategory lives under
+    out_root: product pages first (with driver), then images. Recovered
+    products are added to their products.json, marked in `storage` and
+    counted on their subcategory row of `results` (appended if the
+    subcategory was not scraped in this run).
+    """
+    if not dead_letter.enabled():
+        return {}
+    from ..saver import upsert_products_json
+    dlq = dead_letter.get_queue()
+    root = os.path.abspath(out_root) + os.sep
+    under = lambda e: os.path.abspath(e.get("sub_dir") or "").startswith(root)
+    rows = {os.path.abspath(r[3]["path"]): i for i, r in enumerate(results)
+            if len(r) > 3 and isinstance(r[3], dict) and r[3].get("path")}
+    counts = {"products": 0, "images": 0, "recovered": 0}
+    tracker = freshness.get_tracker()
+
+    for entry in dlq.due(kinds=("product",), where=under):
+        counts["products"] += 1
+        asin, p_url, sub_dir = entry["asin"], entry["url"], entry["sub_dir"]
+        try:
+            info = parse_product_page(fetch_page(driver, p_url, page_type="product"))
+            if not info.get("name"):
+                raise ValueError("fiche sans titre")
+            prod = _build_product(asin, p_url, entry.get("subcategory") or "", info)
+            if prod.image_url:
+                _download_image(prod, entry.get("images_dir") or os.path.join(sub_dir, "images"), sub_dir)
+            upsert_products_json([prod], sub_dir)
+        except Exception as e:
+            dlq.fail(entry["key"], f"{type(e).__name__}: {e}")
+            trace.done(p_url, retry=entry.get("attempts"), outcome="error", error=f"{type(e).__name__}: {e}")
+            continue
+        finally:
+            jitter_sleep(0.2, 0.6)
+        trace.done(p_url, retry=entry.get("attempts"), dead_letter=True)
+        dlq.succeed(entry["key"])
+        tracker.record(asin, prod.scraped_at, prod.price, p_url, prod.subcategory)
+        counts["recovered"] += 1
+
+        tag = os.path.basename(sub_dir)
+        new = 0
+        if storage is not None and not storage.is_processed(asin):
+            storage.mark_processed(asin, tag)
+            new = 1
+        i = rows.get(os.path.abspath(sub_dir))
+        if i is None:
+            stats = new_subcat_stats(entry.get("subcategory") or tag)
+            stats["path"] = sub_dir
+            results.append((entry.get("subcategory") or tag, entry.get("listing_url") or p_url, 0, stats))
+            i = rows[os.path.abspath(sub_dir)] = len(results) - 1
+        r = results[i]
+        r[3]["recovered"] = r[3].get("recovered", 0) + 1
+        r[3]["saved"] = r[3].get("saved", 0) + new
+        results[i] = (r[0], r[1], r[2] + new) + tuple(r[3:])
+
+    for entry in dlq.due(kinds=("image",), where=under):
+        counts["images"] += 1
+        saved = download_image_to_dir(entry["url"], entry["images_dir"], entry.get("name") or entry["asin"],
+                                      entry["asin"], safe_filename)
+        if saved:
+            try:
+                upsert_products_json([{"asin": entry["asin"], "image_local": os.path.relpath(saved)}],
+                                     entry["sub_dir"])
+                dlq.succeed(entry["key"])
+                continue
+            except Exception as e:
+                dlq.fail(entry["key"], f"{type(e).__name__}: {e}")
+                continue
+        dlq.fail(entry["key"], "échec du téléchargement")
+
+    try:
+        dlq.save()
+        tracker.save()
+    except Exception:
+        pass
+    if counts["products"] or counts["images"]:
+        print(f"Reprise des échecs : {counts['recovered']}/{counts['products']} produit(s), "
+              f"{counts['images']} image(s) retentée(s)")
+    return counts
+
+
 def scrape_default(category_url: str, max_products: int, max_subcats: int, max_pages: int, headless: bool = True):
     """Auto-detect subcategories on category_url and scrape them."""
     # --- Cleanup legacy Auto_Detection folder if present (safe, non-raising) ---
@@ -138,15 +491,19 @@ def scrape_default(category_url: str, max_products: int, max_subcats: int, max_p
         items = list(subcats.items())[:max_subcats]
         for i, (sub_name, sub_url) in enumerate(items, 1):
             print(f"\n--[{i}/{len(items)}] {sub_name}--")
-            prods = _scrape_subcategory(driver, sub_name, sub_url, base_dir, max_products, max_pages)
+            stats = new_subcat_stats(sub_name)
+            prods = _scrape_subcategory(driver, sub_name, sub_url, base_dir, max_products, max_pages, stats=stats)
             saved = []
             for p in prods:
                 if storage.is_processed(p.asin):
+                    stats["already_processed"] += 1
                     continue
                 storage.mark_processed(p.asin, sub_name)
                 saved.append(p)
-            results.append((sub_name, sub_url, len(saved)))
+            stats["saved"] = len(saved)
+            results.append((sub_name, sub_url, len(saved), stats))
             time.sleep(random.uniform(0.6, 1.6))
+        retry_dead_letters(driver, storage, base_dir, results)
     finally:
         try:
             driver.quit()
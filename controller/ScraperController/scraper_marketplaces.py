@@ -0,0 +1,82 @@
+# controller/ScraperController/scraper_marketplaces.py
+# scrape_all_categories sur plusieurs marketplaces (amazon.fr, .de, .it...) :
+# une file par domaine, `concurrency` threads par domaine (chacun avec son
+# driver) qui la vident, les domaines avançant en parallèle. Le budget du
+# domaine (controller.marketplace) reste appliqué dans fetch_page, une
+# marketplace lente ou bloquée ne retarde donc plus les autres.
+import time
+import queue
+import random
+import threading
+from typing import Any, Dict, List, Tuple
+
+from ..fetcher import init_driver
+from ..marketplace import group_by_domain, SETTINGS, DEFAULT_CONCURRENCY, marketplace_of
+from ..utils import ensure_dir
+from .scraper_all_categories import ROOT, _scrape_one_category
+
+
+def _domain_worker(domain: str, todo: "queue.Queue", out: Dict[int, List[Tuple]], max_products: int,
+                   max_subcats: int, max_pages: int, headless: bool):
+    driver = None
+    try:
+        while True:
+            try:
+                idx, cat_name, cat_url = todo.get_nowait()
+            except queue.Empty:
+                return
+            print(f"\n==== [{marketplace_of(cat_url)}] Category {idx + 1} : {cat_name} ====")
+            try:
+                if driver is None:
+                    driver = init_driver(headless=headless)
+                out[idx] = _scrape_one_category(driver, cat_name, cat_url, max_products, max_subcats,
+                                                max_pages, headless)
+            except Exception as e:
+                print(f"[{domain}] échec catégorie {cat_name}: {e}")
+                out[idx] = []
+                # driver peut-être inutilisable : on repart d'un neuf
+                try:
+                    if driver is not None:
+                        driver.quit()
+                except Exception:
+                    pass
+                driver = None
+            time.sleep(random.uniform(1.0, 2.0))
+    finally:
+        try:
+            if driver is not None:
+                driver.quit()
+        except Exception:
+            pass
+
+
+def scrape_categories_by_domain(categories_list: List[Tuple[str, str]], max_products: int, max_subcats: int,
+                                max_pages: int, headless: bool = True) -> List[Tuple[str, str, int, Dict[str, Any]]]:
+    """Même sortie que scrape_all_categories, résultats dans l'ordre de categories_list."""
+    ensure_dir(ROOT)
+    groups = group_by_domain(categories_list)
+    print("===================================")
+    print("||Scrape de toutes les catégories||")
+    print(f"||  {len(groups)} marketplaces en parallèle ||")
+    print("===================================")
+
+    out: Dict[int, List[Tuple]] = {}
+    threads = []
+    for domain, items in groups.items():
+        todo: "queue.Queue" = queue.Queue()
+        for item in items:
+            todo.put(item)
+        n = int(SETTINGS.get(domain, {}).get("concurrency", DEFAULT_CONCURRENCY))
+        for w in range(max(1, min(n, len(items)))):
+            t = threading.Thread(target=_domain_worker, name=f"scraper-{domain}-{w + 1}",
+                                 args=(domain, todo, out, max_products, max_subcats, max_pages, headless),
+                                 daemon=True)
+            t.start()
+            threads.append(t)
+    for t in threads:
+        t.join()
+
+    results = []
+    for idx in range(len(categories_list)):
+        results.extend(out.get(idx, []))
+    return results
@@ -0,0 +1,368 @@
+# controller/ScraperController/scraper_queue.py
+# Mode "file de tâches" de scrape_all_categories : un coordinateur enfile une
+# tâche "category" par catégorie, les workers (processus locaux ou autres
+# machines partageant la file) les prennent en bail, détectent les
+# sous-catégories et enfilent une tâche "subcategory" (page de listing +
+# fiches produits) pour chacune. Le coordinateur récupère ensuite les
+# résultats et fait seul le dédoublonnage des ASINs (.processed.json n'est
+# donc jamais écrit en concurrence).
+# Pendant une tâche, un thread renouvelle le bail (heartbeat) : une grosse
+# sous-catégorie peut durer plus que lease_seconds sans être reprise ailleurs.
+# Les workers lancés par run_workers reçoivent les réglages du parent
+# (worker_settings) : en "spawn", l'état de configure() n'est pas hérité.
+import os
+import time
+import socket
+import threading
+import multiprocessing
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from ..task_queue import (open_queue, queue_scheme, new_batch_id, DEFAULT_LEASE_SECONDS, PROCESS_LOCAL,
+                          PENDING, LEASED, DONE, FAILED)
+from ..utils import ensure_dir, safe_filename
+from utils import streaming, trace
+
+ROOT = os.path.join("data", "ScraperAllCategories")
+POLL_INTERVAL = 2.0
+IDLE_TIMEOUT = 60.0
+
+
+def enqueue_categories(categories_list: List[Tuple[str, str]], max_products: int, max_subcats: int,
+                       max_pages: int, queue_url: Optional[str] = None, batch: Optional[str] = None) -> str:
+    """Enfile une tâche par catégorie (name, url) ; retourne l'identifiant du lot."""
+    batch = batch or new_batch_id()
+    queue = open_queue(queue_url)
+    try:
+        for cat_name, cat_url in categories_list:
+            base_dir = os.path.join(ROOT, safe_filename(cat_name))
+            queue.enqueue(batch, "category", {
+                "name": cat_name, "url": cat_url, "base_dir": base_dir,
+                "max_products": max_products, "max_subcats": max_subcats, "max_pages": max_pages,
+            }, key=f"category:{cat_name}", priority=1)
+    finally:
+        queue.close()
+    return batch
+
+
+def _handle_category(queue, driver, task) -> Dict[str, Any]:
+    from .scraper_default import _get_subcats
+    from .scraper_categories import _infer_category_name
+    p = task["payload"]
+    ensure_dir(p["base_dir"])
+    common = {k: p[k] for k in ("max_products", "max_pages", "base_dir")}
+    common["category"] = p["name"]
+    subcats = _get_subcats(driver, p["url"], max_subcats=p["max_subcats"])
+    items = list(subcats.items())[:p["max_subcats"]]
+    if not items:
+        # pas de sous-catégorie : la page fournie est scrapée telle quelle (comme scrape_category)
+        inferred = _infer_category_name(urlparse(p["url"]))
+        out_dir = os.path.join(p["base_dir"], safe_filename(inferred))
+        queue.enqueue(task["batch"], "subcategory", dict(common, name=inferred, url=p["url"], out_dir=out_dir),
+                      key=f"subcategory:{p['name']}:{inferred}")
+        return {"subcategories": 0}
+    for sub_name, sub_url in items:
+        queue.enqueue(task["batch"], "subcategory", dict(common, name=sub_name, url=sub_url, out_dir=p["base_dir"]),
+                      key=f"subcategory:{p['name']}:{sub_name}")
+    return {"subcategories": len(items)}
+
+
+def _handle_subcategory(queue, driver, task) -> Dict[str, Any]:
+    from .scraper_default import _scrape_subcategory, new_subcat_stats
+    p = task["payload"]
+    ensure_dir(p["out_dir"])
+    stats = new_subcat_stats(p["name"])
+    prods = _scrape_subcategory(driver, p["name"], p["url"], p["out_dir"], p["max_products"], p["max_pages"],
+                                stats=stats)
+    if stats.get("blocked_listing") and not prods:
+        # listing bloqué : la tâche repasse en file (nouveau bail plus tard, autre worker possible)
+        from ..antibot import BlockedPageError
+        raise BlockedPageError(p["url"], "listing")
+    return {"asins": [getattr(x, "asin", None) for x in prods], "stats": stats}
+
+
+HANDLERS = {
+    "category": _handle_category,
+    "subcategory": _handle_subcategory,
+}
+
+
+class LeaseKeeper:
+    """Renouvelle le bail d'une tâche toutes les lease_seconds / 3 tant
+    qu'elle tourne ; s'arrête si le bail a été perdu (heartbeat refusé)."""
+
+    def __init__(self, queue, task_id: int, worker: str, lease_seconds: float):
+        self.queue, self.task_id, self.worker = queue, task_id, worker
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{task_id}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(max(0.05, self.lease_seconds / 3)):
+            try:
+                if not self.queue.heartbeat(self.task_id, self.worker, self.lease_seconds):
+                    self.lost = True
+                    return
+            except Exception:
+                continue  # base momentanément verrouillée : on réessaie au prochain tour
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def worker_settings() -> Dict[str, Any]:
+    """Réglages du processus courant à rejouer dans un worker (apply_worker_settings)."""
+    from .. import category_cache, dead_letter, freshness, marketplace, tabs
+    from . import scraper_default
+    return {
+        "freshness": dict(freshness.SETTINGS),
+        "dead_letter": dict(dead_letter.SETTINGS),
+        "marketplaces": {k: dict(v) for k, v in marketplace.SETTINGS.items()},
+        "tabs": tabs.SETTINGS["tabs"],
+        "listing": dict(scraper_default.SETTINGS),
+        "streaming": dict(streaming.SETTINGS),
+        "category_cache": dict(category_cache.SETTINGS),
+        "trace": dict(trace.SETTINGS, run=trace.current_run()),
+    }
+
+
+def apply_worker_settings(settings: Dict[str, Any]):
+    """Applique dans le worker les réglages capturés par worker_settings()."""
+    from .. import category_cache, dead_letter, freshness, marketplace, tabs
+    from . import scraper_default
+    freshness.configure(**settings["freshness"])
+    dead_letter.configure(**settings["dead_letter"])
+    marketplace.configure(settings["marketplaces"])
+    tabs.configure(settings["tabs"])
+    scraper_default.configure(**settings["listing"])
+    streaming.configure(**settings["streaming"])
+    category_cache.configure(**settings["category_cache"])
+    t = settings["trace"]
+    trace.configure(enabled=t.get("enabled"), directory=t.get("dir"))
+    if t.get("run"):
+        trace.start(run_id=f"{t['run']}-p{os.getpid()}")
+
+
+def run_worker(queue_url: Optional[str] = None, worker_id: Optional[str] = None, headless: bool = True,
+               batch: Optional[str] = None, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+               idle_timeout: Optional[float] = IDLE_TIMEOUT, max_tasks: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Boucle d'un worker : prend une tâche, la traite avec son propre driver,
+    rend le résultat. Avec batch, s'arrête quand le lot n'a plus de tâche en
+    attente ni en cours ; sinon après idle_timeout secondes sans travail.
+    """
+    from ..fetcher import init_driver
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    queue = open_queue(queue_url)
+    driver = None
+    summary = {"worker": worker_id, "done": 0, "failed": 0}
+    idle_since = time.time()
+    try:
+        while max_tasks is None or summary["done"] + summary["failed"] < max_tasks:
+            task = queue.lease(worker_id, lease_seconds, kinds=HANDLERS, batch=batch)
+            if task is None:
+                if batch is not None:
+                    counts = queue.counts(batch)
+                    if not counts[PENDING] and not counts[LEASED]:
+                        break
+                elif idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                    break
+                time.sleep(POLL_INTERVAL)
+                continue
+            print(f"[{worker_id}] {task['kind']} {task['payload'].get('name')} (essai {task['attempts']})")
+            try:
+                if driver is None:
+                    driver = init_driver(headless=headless)
+                with LeaseKeeper(queue, task["id"], worker_id, lease_seconds) as keeper:
+                    result = HANDLERS[task["kind"]](queue, driver, task)
+                if keeper.lost:
+                    # la tâche a été reprise ailleurs : son résultat n'est plus le nôtre
+                    print(f"[{worker_id}] bail perdu pour {task['payload'].get('name')}, résultat ignoré")
+                else:
+                    queue.complete(task["id"], worker_id, result)
+                    summary["done"] += 1
+            except Exception as e:
+                queue.fail(task["id"], worker_id, f"{type(e).__name__}: {e}")
+                summary["failed"] += 1
+                print(f"[{worker_id}] échec {task['kind']} {task['payload'].get('name')}: {e}")
+                # le driver peut être dans un état incohérent : on repart d'un neuf
+                try:
+                    if driver is not None:
+                        driver.quit()
+                except Exception:
+                    pass
+                driver = None
+            idle_since = time.time()
+    finally:
+        try:
+            if driver is not None:
+                driver.quit()
+        except Exception:
+            pass
+        queue.close()
+    return summary
+
+
+def _worker_entry(queue_url, worker_id, headless, batch, settings=None):
+    # point d'entrée picklable pour multiprocessing
+    if settings:
+        apply_worker_settings(settings)
+    try:
+        run_worker(queue_url=queue_url, worker_id=worker_id, headless=headless, batch=batch)
+    finally:
+        trace.stop()
+
+
+def run_workers(processes: int, queue_url: Optional[str] = None, headless: bool = True,
+                batch: Optional[str] = None, settings: Optional[Dict[str, Any]] = None) -> List[int]:
+    """
+    Lance `processes` workers locaux et attend leur fin ; retourne leurs codes
+    de sortie. settings : réglages passés aux workers (worker_settings() du
+    processus courant par défaut). Refuse les files propres au processus (memory://).
+    """
+    if queue_scheme(queue_url) in PROCESS_LOCAL:
+        raise ValueError(f"file {queue_url} propre au processus : inutilisable par des workers séparés "
+                         f"(utiliser sqlite:///...)")
+    settings = settings if settings is not None else worker_settings()
+    host = socket.gethostname()
+    procs = []
+    for i in range(max(1, processes)):
+        p = multiprocessing.Process(target=_worker_entry,
+                                    args=(queue_url, f"{host}:w{i + 1}", headless, batch, settings),
+                                    name=f"scraper-worker-{i + 1}")
+        p.start()
+        procs.append(p)
+    for p in procs:
+        p.join()
+    return [p.exitcode for p in procs]
+
+
+def collect_results(batch: str, queue_url: Optional[str] = None) -> List[Tuple[str, str, int, Dict[str, Any]]]:
+    """
+    Résultats du lot au format de scrape_all_categories : (clé, url, sauvés, stats).
+    Le dédoublonnage contre .processed.json est fait ici, une seule fois par lot.
+    """
+    from ..saver import SimpleStorage
+    from .scraper_default import new_subcat_stats
+    queue = open_queue(queue_url)
+    storages: Dict[str, Any] = {}
+    results = []
+    try:
+        for task in queue.tasks(batch, kind="subcategory"):
+            p = task["payload"]
+            cat_name, sub_name = p["category"], p["name"]
+            key = f"{cat_name}_{sub_name}" if sub_name != cat_name else cat_name
+            if task["status"] != DONE:
+                stats = new_subcat_stats(sub_name)
+                stats["errors"] = 1
+                results.append((key, p["url"], 0, stats))
+                print(f"  {key}: tâche {task['status']} ({task.get('error') or 'non terminée'})")
+                continue
+            result = task["result"] or {}
+            stats = result.get("stats") or new_subcat_stats(sub_name)
+            storage = storages.get(p["base_dir"])
+            if storage is None:
+                storage = storages[p["base_dir"]] = SimpleStorage(base_dir=p["base_dir"])
+            tag = safe_filename(sub_name)
+            saved = 0
+            for asin in result.get("asins", []):
+                if storage.is_processed(asin):
+                    stats["already_processed"] += 1
+                    continue
+                storage.mark_processed(asin, tag)
+                saved += 1
+            stats["saved"] = saved
+            results.append((key, p["url"], saved, stats))
+        for task in queue.tasks(batch, kind="category", status=FAILED):
+            print(f"  catégorie {task['payload'].get('name')} en échec : {task.get('error')}")
+    finally:
+        for storage in storages.values():
+            try:
+                storage.close()
+            except Exception:
+                pass
+        queue.close()
+    return results
+
+
+def retry_batch_dead_letters(batch: str, results: List[Tuple], queue_url: Optional[str] = None,
+                             headless: bool = True) -> Dict[str, int]:
+    """
+    Rejoue depuis le coordinateur les échecs que les workers du lot ont notés
+    dans la dead-letter queue (comme scrape_default / scrape_category en fin
+    de run), catégorie par catégorie ; les produits repris sont comptés sur
+    leurs lignes de `results`. Aucun driver n'est lancé si rien n'est dû.
+    """
+    from .. import dead_letter
+    from ..fetcher import init_driver
+    from ..saver import SimpleStorage
+    from .scraper_default import retry_dead_letters
+    if not dead_letter.enabled():
+        return {}
+    queue = open_queue(queue_url)
+    try:
+        base_dirs = sorted({t["payload"]["base_dir"] for t in queue.tasks(batch, kind="category")})
+    finally:
+        queue.close()
+    dead_letter.configure(**dead_letter.SETTINGS)   # relit l'état écrit par les workers
+    dlq = dead_letter.get_queue()
+    under = lambda d: (lambda e: os.path.abspath(e.get("sub_dir") or "").startswith(os.path.abspath(d) + os.sep))
+    todo = [d for d in base_dirs if dlq.due(where=under(d))]
+    totals: Dict[str, int] = {}
+    if not todo:
+        return totals
+    driver = init_driver(headless=headless)
+    try:
+        for base_dir in todo:
+            storage = SimpleStorage(base_dir=base_dir)
+            try:
+                counts = retry_dead_letters(driver, storage, base_dir, results)
+            finally:
+                storage.close()
+            for k, v in counts.items():
+                totals[k] = totals.get(k, 0) + v
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    return totals
+
+
+def batch_status(batch: str, queue_url: Optional[str] = None) -> Dict[str, int]:
+    queue = open_queue(queue_url)
+    try:
+        return queue.counts(batch)
+    finally:
+        queue.close()
+
+
+def scrape_all_categories_queued(categories_list: List[Tuple[str, str]], max_products: int, max_subcats: int,
+                                 max_pages: int, headless: bool = True, processes: int = 2,
+                                 queue_url: Optional[str] = None):
+    """Équivalent de scrape_all_categories réparti sur `processes` workers locaux."""
+    ensure_dir(ROOT)
+    print("===================================")
+    print("||Scrape de toutes les catégories||")
+    print(f"||  file de tâches, {processes} worker(s)  ||")
+    print("===================================")
+    batch = enqueue_categories(categories_list, max_products, max_subcats, max_pages, queue_url)
+    print(f"Lot {batch} : {len(categories_list)} catégorie(s) en file")
+    if queue_scheme(queue_url) in PROCESS_LOCAL:
+        # file en mémoire : un seul worker, dans ce processus
+        run_worker(queue_url, headless=headless, batch=batch)
+    else:
+        run_workers(processes, queue_url, headless, batch)
+    counts = batch_status(batch, queue_url)
+    if counts[PENDING] or counts[LEASED]:
+        print(f"Attention : lot {batch} incomplet ({counts})")
+    results = collect_results(batch, queue_url)
+    retry_batch_dead_letters(batch, results, queue_url, headless)
+    return results
@@ -0,0 +1,120 @@
+# controller/antibot.py
+# Détection des pages de blocage (captcha, "Robot Check", message d'accès
+# automatisé) et disjoncteur par hôte : après BLOCK_THRESHOLD blocages
+# consécutifs, l'hôte est mis en pause (durée doublée à chaque nouveau
+# déclenchement) et les requêtes suivantes sont espacées ; chaque page
+# normale fait redescendre ce ralentissement.
+import time
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from utils.metrics import METRICS
+
+# marqueurs présents dans le HTML des pages de blocage Amazon (FR / EN)
+BLOCK_MARKERS = (
+    "/errors/validateCaptcha",
+    'name="captchacharacters"',
+    "id=\"captchacharacters\"",
+    "<title>Robot Check</title>",
+    "<title dir=\"ltr\">Robot Check</title>",
+    "Saisissez les caractères que vous voyez ci-dessous",
+    "Enter the characters you see below",
+    "api-services-support@amazon.com",
+)
+
+BLOCK_THRESHOLD = 3          # blocages consécutifs avant pause
+PAUSE_SECONDS = 60.0         # première pause, doublée à chaque déclenchement
+MAX_PAUSE_SECONDS = 900.0
+SLOWDOWN_STEP = 1.0          # secondes ajoutées entre requêtes par blocage
+MAX_SLOWDOWN = 10.0
+
+
+class BlockedPageError(Exception):
+    """fetch_page a reçu une page de captcha / blocage au lieu du contenu."""
+
+    def __init__(self, url: str, marker: str = ""):
+        super().__init__(f"page de blocage pour {url}" + (f" ({marker})" if marker else ""))
+        self.url = url
+        self.marker = marker
+
+
+def block_marker(html: Optional[str]) -> Optional[str]:
+    """Retourne le marqueur de blocage trouvé dans html, sinon None."""
+    if not html:
+        return None
+    for marker in BLOCK_MARKERS:
+        if marker in html:
+            return marker
+    return None
+
+
+def is_block_page(html: Optional[str]) -> bool:
+    return block_marker(html) is not None
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).netloc or "").lower()
+
+
+class CircuitBreaker:
+    """État d'un hôte : blocages consécutifs, pause en cours, ralentissement."""
+
+    def __init__(self, host: str, threshold: int = BLOCK_THRESHOLD, pause: float = PAUSE_SECONDS,
+                 max_pause: float = MAX_PAUSE_SECONDS, sleep=time.sleep, clock=time.monotonic):
+        self.host = host
+        self.threshold = threshold
+        self.pause = pause
+        self.max_pause = max_pause
+        self.consecutive = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.slowdown = 0.0
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Attend la fin d'une pause en cours, puis le délai de ralentissement."""
+        with self._lock:
+            wait = max(0.0, self.open_until - self._clock()) + self.slowdown
+        if wait > 0:
+            self._sleep(wait)
+
+    def record_block(self) -> bool:
+        """Compte un blocage ; True si le disjoncteur vient de s'ouvrir."""
+        with self._lock:
+            self.consecutive += 1
+            self.slowdown = min(MAX_SLOWDOWN, self.slowdown + SLOWDOWN_STEP)
+            if self.consecutive < self.threshold:
+                return False
+            self.trips += 1
+            self.consecutive = 0
+            pause = min(self.max_pause, self.pause * (2 ** (self.trips - 1)))
+            self.open_until = self._clock() + pause
+        METRICS.inc("circuit_breaker_trips", host=self.host)
+        print(f"    [antibot] {self.host} : blocages répétés, pause de {pause:.0f}s")
+        return True
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive = 0
+            self.slowdown = max(0.0, self.slowdown - SLOWDOWN_STEP / 2)
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def breaker_for(url: str) -> CircuitBreaker:
+    host = host_of(url)
+    with _BREAKERS_LOCK:
+        br = _BREAKERS.get(host)
+        if br is None:
+            br = _BREAKERS[host] = CircuitBreaker(host)
+        return br
+
+
+def reset_breakers():
+    with _BREAKERS_LOCK:
+        _BREAKERS.clear()
@@ -0,0 +1,94 @@
+# controller/category_cache.py
+# Cache persistant de l'arbre catégorie -> sous-catégories (data/.category_tree.json).
+# La découverte des sous-catégories coûte un chargement de page + un parsing
+# complet ; le résultat change rarement, on le garde TTL_SECONDS et tous les
+# modes (défaut, catégorie, toutes catégories, workers de la file) le partagent.
+import os
+import json
+import time
+import tempfile
+import threading
+from typing import Callable, Dict, Optional
+
+CACHE_PATH = os.path.join("data", ".category_tree.json")
+TTL_SECONDS = 7 * 24 * 3600
+
+SETTINGS = {"ttl": TTL_SECONDS, "refresh": False, "path": CACHE_PATH}
+
+_lock = threading.Lock()
+
+
+def configure(ttl: Optional[float] = None, refresh: Optional[bool] = None, path: Optional[str] = None):
+    """ttl en secondes ; refresh=True force la redécouverte (et réécrit le cache)."""
+    if ttl is not None:
+        SETTINGS["ttl"] = ttl
+    if refresh is not None:
+        SETTINGS["refresh"] = bool(refresh)
+    if path is not None:
+        SETTINGS["path"] = path
+
+
+def load_tree(path: Optional[str] = None) -> Dict[str, Dict]:
+    path = path or SETTINGS["path"]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        cats = data.get("categories") if isinstance(data, dict) else None
+        return cats if isinstance(cats, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_entry(url: str, entry: Dict, path: str):
+    # relire avant d'écrire : d'autres processus (workers) ont pu ajouter des catégories
+    with _lock:
+        cats = load_tree(path)
+        cats[url] = entry
+        d = os.path.dirname(path) or "."
+        os.makedirs(d, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "categories": cats}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+
+def _usable(entry: Optional[Dict], max_subcats: int, ttl: float, now: float) -> bool:
+    if not isinstance(entry, dict) or not isinstance(entry.get("subcats"), dict):
+        return False
+    if now - float(entry.get("fetched_at", 0)) > ttl:
+        return False
+    # assez de sous-catégories en cache, ou la page n'en avait pas plus
+    return entry.get("max_subcats", 0) >= max_subcats or len(entry["subcats"]) < entry.get("max_subcats", 0)
+
+
+def cached_subcats(category_url: str, max_subcats: int, discover: Callable[[], Dict[str, str]],
+                   ttl: Optional[float] = None, refresh: Optional[bool] = None,
+                   path: Optional[str] = None) -> Dict[str, str]:
+    """
+    Sous-catégories de category_url depuis le cache si l'entrée est fraîche,
+    sinon via discover() (chargement + parsing de la page) puis mise en cache.
+    Un résultat vide n'est pas mis en cache (page bloquée ou en erreur).
+    """
+    ttl = SETTINGS["ttl"] if ttl is None else ttl
+    refresh = SETTINGS["refresh"] if refresh is None else refresh
+    path = path or SETTINGS["path"]
+    now = time.time()
+    if not refresh:
+        entry = load_tree(path).get(category_url)
+        if _usable(entry, max_subcats, ttl, now):
+            print(f"Sous-catégories en cache ({len(entry['subcats'])}) pour {category_url}")
+            return dict(list(entry["subcats"].items())[:max_subcats])
+    subcats = discover() or {}
+    if subcats:
+        try:
+            _save_entry(category_url, {"fetched_at": now, "max_subcats": max_subcats, "subcats": subcats}, path)
+        except Exception:
+            pass  # le cache est une optimisation, jamais bloquant
+    return subcats
@@ -0,0 +1,175 @@
+# controller/dead_letter.py
+# File des échecs (dead-letter queue) persistée dans data/.dead_letter.json :
+# fiches produit en erreur ou restées bloquées, images non téléchargées. Au
+# lieu de réessayer dans la boucle de scrape (qui bloquerait le run), chaque
+# échec est noté avec une date de prochain essai (backoff exponentiel) ; les
+# entrées dues sont rejouées en fin de run, et aux runs suivants, jusqu'à
+# MAX_ATTEMPTS essais, après quoi elles restent en "dead" pour inspection.
+import os
+import json
+import time
+import random
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+STATE_PATH = os.path.join("data", ".dead_letter.json")
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 30.0         # délai avant le 2e essai, doublé ensuite
+MAX_BACKOFF_SECONDS = 6 * 3600.0
+
+PENDING = "pending"
+DEAD = "dead"
+
+SETTINGS = {"enabled": True, "max_attempts": MAX_ATTEMPTS, "backoff": BACKOFF_SECONDS, "path": STATE_PATH}
+
+
+def backoff_delay(attempts: int, base: float = BACKOFF_SECONDS, cap: float = MAX_BACKOFF_SECONDS) -> float:
+    """Délai après `attempts` échecs : base, 2*base, 4*base... (+/- 10 %), plafonné."""
+    delay = min(cap, base * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.9, 1.1)
+
+
+class DeadLetterQueue:
+    """Entrées par clé ("product:<asin>", "image:<asin>") ; thread-safe."""
+
+    def __init__(self, path: str = STATE_PATH, max_attempts: int = MAX_ATTEMPTS,
+                 backoff: float = BACKOFF_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._dirty: set = set()
+        self.items: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            items = data.get("items") if isinstance(data, dict) else None
+            return items if isinstance(items, dict) else {}
+        except Exception:
+            return {}
+
+    def add(self, kind: str, key: str, url: str, error: str = "", now: Optional[float] = None, **context):
+        """Nouvel échec (ou échec de plus) pour key ; context = de quoi rejouer."""
+        now = now or time.time()
+        with self._lock:
+            entry = self.items.get(key)
+            if entry is None or entry.get("status") == DEAD:
+                entry = self.items[key] = {"kind": kind, "url": url, "attempts": 0, "first_failed": now}
+            entry.update(context)
+            entry["url"] = url
+            self._failed(entry, error, now)
+            self._dirty.add(key)
+
+    def _failed(self, entry: Dict[str, Any], error: str, now: float):
+        entry["attempts"] = entry.get("attempts", 0) + 1
+        entry["last_error"] = (error or "")[:300]
+        entry["last_failed"] = now
+        if entry["attempts"] >= self.max_attempts:
+            entry["status"] = DEAD
+            entry.pop("next_attempt", None)
+        else:
+            entry["status"] = PENDING
+            entry["next_attempt"] = now + backoff_delay(entry["attempts"], self.backoff)
+
+    def fail(self, key: str, error: str = "", now: Optional[float] = None):
+        with self._lock:
+            entry = self.items.get(key)
+            if entry is not None:
+                self._failed(entry, error, now or time.time())
+                self._dirty.add(key)
+
+    def succeed(self, key: str):
+        with self._lock:
+            if self.items.pop(key, None) is not None:
+                self._dirty.add(key)
+
+    def is_pending(self, key: str) -> bool:
+        """key attend encore un essai (ni réussie, ni abandonnée en dead)."""
+        with self._lock:
+            entry = self.items.get(key)
+            return entry is not None and entry.get("status") == PENDING
+
+    def due(self, kinds: Optional[Iterable[str]] = None, now: Optional[float] = None,
+            where=None) -> List[Dict[str, Any]]:
+        """Entrées en attente dont le prochain essai est passé (plus anciennes d'abord)."""
+        now = now or time.time()
+        kinds = set(kinds) if kinds else None
+        with self._lock:
+            out = [dict(e, key=k) for k, e in self.items.items()
+                   if e.get("status") == PENDING and e.get("next_attempt", 0) <= now
+                   and (kinds is None or e.get("kind") in kinds) and (where is None or where(e))]
+        out.sort(key=lambda e: e.get("next_attempt", 0))
+        return out
+
+    def save(self):
+        """Fusionne avec l'état sur disque (autres processus) puis écrit atomiquement."""
+        with self._lock:
+            if not self._dirty:
+                return
+            disk = self._load()
+            for key in self._dirty:
+                if key in self.items:
+                    disk[key] = self.items[key]
+                else:
+                    disk.pop(key, None)
+            self.items = disk
+            self._dirty.clear()
+            d = os.path.dirname(self.path) or "."
+            os.makedirs(d, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=d, prefix=".tmp_")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"version": 1, "items": disk}, f, ensure_ascii=False, indent=1)
+                os.replace(tmp, self.path)
+            finally:
+                if os.path.exists(tmp):
+                    try:
+                        os.remove(tmp)
+                    except OSError:
+                        pass
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"pending": 0, "dead": 0, "by_kind": {}}
+        now = time.time()
+        with self._lock:
+            for e in self.items.values():
+                status = e.get("status", PENDING)
+                out[status] = out.get(status, 0) + 1
+                kind = out["by_kind"].setdefault(e.get("kind", "?"), {"pending": 0, "dead": 0})
+                kind[status] = kind.get(status, 0) + 1
+            upcoming = [e["next_attempt"] for e in self.items.values() if e.get("status") == PENDING]
+        out["next_due_in_seconds"] = round(max(0.0, min(upcoming) - now)) if upcoming else None
+        return out
+
+
+_queue: Optional[DeadLetterQueue] = None
+_queue_lock = threading.Lock()
+
+
+def configure(enabled: bool = True, max_attempts: Optional[int] = None, backoff: Optional[float] = None,
+              path: Optional[str] = None):
+    global _queue
+    SETTINGS["enabled"] = bool(enabled)
+    if max_attempts is not None:
+        SETTINGS["max_attempts"] = int(max_attempts)
+    if backoff is not None:
+        SETTINGS["backoff"] = float(backoff)
+    if path is not None:
+        SETTINGS["path"] = path
+    _queue = None
+
+
+def enabled() -> bool:
+    return SETTINGS["enabled"]
+
+
+def get_queue() -> DeadLetterQueue:
+    """File du run (créée au premier appel d'après SETTINGS)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = DeadLetterQueue(SETTINGS["path"], SETTINGS["max_attempts"], SETTINGS["backoff"])
+        return _queue
@@ -1,15 +1,32 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+# Selenium et webdriver_manager (~0.3 s d'import) sont chargés dans les
+# fonctions qui en ont besoin, pas au chargement du module.
 from typing import Optional
+import time
+from utils.metrics import METRICS
+from utils import trace
+from .antibot import BlockedPageError, block_marker, breaker_for
+from .marketplace import budget_for
+
+# "eager" : driver.get rend la main au DOMContentLoaded, sans attendre images,
+# pubs et scripts tiers ; c'est wait_until_ready qui décide quand la page est
+# exploitable (avec "normal", get bloquait jusqu'à l'évènement load et l'attente
+# par type de page ne faisait rien gagner).
+PAGE_LOAD_STRATEGY = "eager"
 
 
 def init_driver(headless: bool = True):
+    with METRICS.timer("chrome_startup_seconds"):
+        return _init_driver(headless)
+
+
+def _init_driver(headless: bool = True):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from webdriver_manager.chrome import ChromeDriverManager
+
     options = Options()
+    options.page_load_strategy = PAGE_LOAD_STRATEGY
     if headless:
         try:
             options.add_argument("--headless=new")
@@ -41,13 +58,126 @@ def init_driver(headless: bool = True):
     return driver
 
 
-def fetch_page(driver, url: str, wait_for_tag: Optional[str] = "body", timeout: int = 10) -> str:
-    """Navigate to url and return page_source, waiting for a tag (default: body)."""
-    driver.get(url)
-    if wait_for_tag:
+# Conditions de "page prête" par type de page : le sélecteur des champs dont
+# le parser a besoin (retour dès qu'ils existent) et celui des pages d'erreur
+# / blocage (retour immédiat, sans attendre le timeout).
+PAGE_READY = {
+    "product": "#productTitle, #title, h1.a-size-large",
+    "listing": "[data-component-type='s-search-result'], div.s-main-slot div[data-asin]",
+    "category": "a[href*='/s?'], a[href*='/b?'], a[href*='i=']",
+}
+PAGE_ERROR = ("form[action*='validateCaptcha'], input#captchacharacters, "
+              "img[alt*='Dogs of Amazon'], img[alt*='Chiens d'], div#error-page")
+PAGE_TIMEOUTS = {"product": 10, "listing": 10, "category": 8}
+# document chargé (readyState complete) sans les champs attendus : on n'attend
+# que ce délai de plus avant d'abandonner (page d'erreur non reconnue, produit retiré...)
+COMPLETE_GRACE = 1.5
+POLL_FREQUENCY = 0.1
+
+
+def _page_state(driver, ready_css: str, started: float):
+    """Condition WebDriverWait : 'ready', 'error', 'complete' ou False (continuer)."""
+    from selenium.webdriver.common.by import By
+    if driver.find_elements(By.CSS_SELECTOR, ready_css):
+        return "ready"
+    if driver.find_elements(By.CSS_SELECTOR, PAGE_ERROR):
+        return "error"
+    if time.perf_counter() - started > COMPLETE_GRACE:
         try:
-            WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.TAG_NAME, wait_for_tag)))
+            if driver.execute_script("return document.readyState") == "complete":
+                return "complete"
         except Exception:
-            # best-effort, continue
             pass
-    return driver.page_source
\ No newline at end of file
+    return False
+
+
+def wait_until_ready(driver, page_type: str, timeout: Optional[float] = None) -> str:
+    """Attend que la page du type donné soit exploitable ; retourne l'issue
+    ('ready', 'error', 'complete' ou 'timeout')."""
+    from selenium.webdriver.support.ui import WebDriverWait
+    ready_css = PAGE_READY[page_type]
+    timeout = timeout if timeout is not None else PAGE_TIMEOUTS.get(page_type, 10)
+    started = time.perf_counter()
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+            lambda d: _page_state(d, ready_css, started))
+    except Exception:
+        return "timeout"
+
+
+def fetch_page(driver, url: str, wait_for_tag: Optional[str] = "body", timeout: Optional[int] = None,
+               page_type: Optional[str] = None) -> str:
+    """Navigate to url and return page_source.
+
+    With page_type ("product", "listing", "category") the wait returns as
+    soon as the fields the parser needs are present, or right away on an
+    error / captcha page (see PAGE_READY / PAGE_ERROR); otherwise it waits
+    for wait_for_tag (default: body). Navigation and wait latencies are
+    recorded per page type.
+
+    Page loads go through the domain's budget (controller.marketplace:
+    concurrent loads and minimum interval per marketplace).
+
+    Raises BlockedPageError when Amazon answers with a captcha / robot check
+    page; the host's circuit breaker (controller.antibot) then slows down or
+    pauses the next requests.
+    """
+    breaker = breaker_for(url)
+    breaker.before_request()
+    labels = {"page_type": page_type or "other"}
+    with budget_for(url).slot():
+        return _fetch(driver, url, wait_for_tag, timeout, page_type, breaker, labels)
+
+
+def _fetch(driver, url, wait_for_tag, timeout, page_type, breaker, labels) -> str:
+    started = time.time()
+    t0 = time.perf_counter()
+    try:
+        driver.get(url)
+    except Exception as e:
+        trace.fetch(url, page_type, started, nav_s=time.perf_counter() - t0, outcome="error",
+                    error=f"{type(e).__name__}: {e}")
+        raise
+    t1 = time.perf_counter()
+    METRICS.observe("chrome_navigation_seconds", t1 - t0, **labels)
+    outcome = "ready"
+    if page_type in PAGE_READY:
+        outcome = wait_until_ready(driver, page_type, timeout)
+        if outcome == "timeout":
+            METRICS.inc("fetch_wait_timeouts", **labels)
+        METRICS.observe("fetch_wait_seconds", time.perf_counter() - t1, outcome=outcome, **labels)
+    elif wait_for_tag:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        try:
+            WebDriverWait(driver, timeout or 10).until(EC.presence_of_element_located((By.TAG_NAME, wait_for_tag)))
+        except Exception:
+            # best-effort, continue
+            outcome = "timeout"
+            METRICS.inc("fetch_wait_timeouts", **labels)
+        METRICS.observe("fetch_wait_seconds", time.perf_counter() - t1, outcome=outcome, **labels)
+    METRICS.inc("pages_fetched", **labels)
+    METRICS.observe("fetch_seconds", time.perf_counter() - t0, **labels)
+    html = driver.page_source
+    timing = dict(nav_s=t1 - t0, wait_s=time.perf_counter() - t1, size=len(html or ""))
+    try:
+        html = check_page(url, html, breaker)
+    except BlockedPageError as e:
+        trace.fetch(url, page_type, started, outcome="blocked", error=e.marker, **timing)
+        raise
+    trace.fetch(url, page_type, started, outcome="timeout" if outcome == "timeout" else "ok", **timing)
+    return html
+
+
+def check_page(url: str, html: str, breaker=None) -> str:
+    """Return html, or raise BlockedPageError for a captcha page; feeds the
+    host's circuit breaker either way."""
+    breaker = breaker or breaker_for(url)
+    marker = block_marker(html)
+    if marker:
+        METRICS.inc("blocked_pages", host=breaker.host)
+        breaker.record_block()
+        raise BlockedPageError(url, marker)
+    breaker.record_success()
+    return html
@@ -0,0 +1,190 @@
+# controller/freshness.py
+# Ordonnanceur de re-scrape par fraîcheur. Pour chaque ASIN on garde la date
+# du dernier scrape (Product.scraped_at), l'URL, la sous-catégorie et un petit
+# historique de prix (data/.freshness.json). Avec un budget de pages produit
+# par run, plan() sert d'abord les ASINs jamais vus, puis les plus anciens,
+# pondérés par la volatilité de leur prix, de sorte qu'un budget nocturne fixe
+# fasse tourner tout le catalogue.
+import os
+import json
+import time
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.normalize import parse_price
+
+STATE_PATH = os.path.join("data", ".freshness.json")
+PRICE_HISTORY = 10             # prix gardés par ASIN
+MIN_AGE_HOURS = 12.0           # en dessous, un ASIN connu n'est pas re-scrapé
+VOLATILITY_WEIGHT = 4.0        # 25 % de variation moyenne => priorité x2
+
+SETTINGS = {"enabled": False, "budget": None, "min_age_hours": MIN_AGE_HOURS, "path": STATE_PATH}
+
+def _to_epoch(ts: Any) -> float:
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    try:
+        return datetime.fromisoformat(str(ts).replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return time.time()
+
+
+def volatility(prices: List[List[float]]) -> float:
+    """Variation relative moyenne entre prix successifs (0 = stable)."""
+    values = [p for _, p in prices if p]
+    if len(values) < 2:
+        return 0.0
+    changes = [abs(b - a) / a for a, b in zip(values, values[1:]) if a]
+    return sum(changes) / len(changes) if changes else 0.0
+
+
+class FreshnessTracker:
+    """État de fraîcheur par ASIN + budget de fetch du run en cours."""
+
+    def __init__(self, path: str = STATE_PATH, budget: Optional[int] = None,
+                 min_age_hours: float = MIN_AGE_HOURS):
+        self.path = path
+        self.budget = budget
+        self.min_age = min_age_hours * 3600
+        self.spent = 0
+        self._lock = threading.Lock()
+        self._dirty: set = set()
+        self.items: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            items = data.get("asins") if isinstance(data, dict) else None
+            return items if isinstance(items, dict) else {}
+        except Exception:
+            return {}
+
+    # --- budget -------------------------------------------------------------
+
+    def remaining(self) -> Optional[int]:
+        return None if self.budget is None else max(0, self.budget - self.spent)
+
+    def spend(self, n: int = 1):
+        with self._lock:
+            self.spent += n
+
+    # --- priorité -----------------------------------------------------------
+
+    def priority(self, asin: str, now: Optional[float] = None) -> float:
+        """inf pour un ASIN jamais vu ; sinon âge (h) x (1 + poids x volatilité) ;
+        0 si plus récent que min_age_hours (pas dû)."""
+        entry = self.items.get(asin)
+        if not entry:
+            return float("inf")
+        age = (now or time.time()) - float(entry.get("last", 0))
+        if age < self.min_age:
+            return 0.0
+        return age / 3600 * (1 + VOLATILITY_WEIGHT * volatility(entry.get("prices", [])))
+
+    def plan(self, candidates: Iterable[Tuple[str, str]], limit: Optional[int] = None,
+             subcategory: Optional[str] = None, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """
+        Ordonne les (asin, url) à scraper : candidats du listing + ASINs déjà
+        suivis de la même sous-catégorie, jamais vus d'abord, puis par
+        priorité décroissante ; les ASINs pas encore dus sont écartés. Coupe à
+        min(limit, budget restant).
+        """
+        now = now or time.time()
+        seen = {}
+        for asin, url in candidates:
+            seen.setdefault(asin, url)
+        if subcategory:
+            for asin, entry in self.items.items():
+                if asin not in seen and entry.get("subcategory") == subcategory and entry.get("url"):
+                    seen[asin] = entry["url"]
+        scored = [(self.priority(a, now), i, a, u) for i, (a, u) in enumerate(seen.items())]
+        scored = [s for s in scored if s[0] > 0]
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        cap = [n for n in (limit, self.remaining()) if n is not None]
+        if cap:
+            scored = scored[:min(cap)]
+        return [(a, u) for _, _, a, u in scored]
+
+    # --- enregistrement -----------------------------------------------------
+
+    def record(self, asin: str, scraped_at: Any = None, price: Any = None, url: Optional[str] = None,
+               subcategory: Optional[str] = None):
+        if not asin:
+            return
+        ts = _to_epoch(scraped_at) if scraped_at else time.time()
+        with self._lock:
+            entry = self.items.setdefault(asin, {"prices": [], "scrapes": 0})
+            entry["last"] = ts
+            entry["scrapes"] = entry.get("scrapes", 0) + 1
+            if url:
+                entry["url"] = url
+            if subcategory:
+                entry["subcategory"] = subcategory
+            value = parse_price(price)
+            if value is not None:
+                entry["prices"] = (entry.get("prices", []) + [[ts, value]])[-PRICE_HISTORY:]
+            self._dirty.add(asin)
+
+    def save(self):
+        """Fusionne avec l'état sur disque (autres processus) puis écrit atomiquement."""
+        with self._lock:
+            if not self._dirty:
+                return
+            disk = self._load()
+            for asin in self._dirty:
+                mine = self.items[asin]
+                theirs = disk.get(asin)
+                if not theirs or float(theirs.get("last", 0)) <= float(mine.get("last", 0)):
+                    disk[asin] = mine
+            self.items = disk
+            self._dirty.clear()
+            d = os.path.dirname(self.path) or "."
+            os.makedirs(d, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=d, prefix=".tmp_")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"version": 1, "asins": disk}, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp, self.path)
+            finally:
+                if os.path.exists(tmp):
+                    try:
+                        os.remove(tmp)
+                    except OSError:
+                        pass
+
+    def summary(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = now or time.time()
+        ages = [now - float(e.get("last", 0)) for e in self.items.values()]
+        due = sum(1 for a in ages if a >= self.min_age)
+        return {"tracked": len(ages), "due": due, "spent": self.spent, "budget": self.budget,
+                "oldest_hours": round(max(ages) / 3600, 1) if ages else None}
+
+
+_tracker: Optional[FreshnessTracker] = None
+
+
+def configure(enabled: bool = True, budget: Optional[int] = None, min_age_hours: Optional[float] = None,
+              path: Optional[str] = None):
+    global _tracker
+    SETTINGS["enabled"] = bool(enabled)
+    SETTINGS["budget"] = budget
+    if min_age_hours is not None:
+        SETTINGS["min_age_hours"] = float(min_age_hours)
+    if path is not None:
+        SETTINGS["path"] = path
+    _tracker = None
+
+
+def enabled() -> bool:
+    return SETTINGS["enabled"]
+
+
+def get_tracker() -> FreshnessTracker:
+    """Tracker du run (créé au premier appel d'après SETTINGS)."""
+    global _tracker
+    if _tracker is None:
+        _tracker = FreshnessTracker(SETTINGS["path"], SETTINGS["budget"], SETTINGS["min_age_hours"])
+    return _tracker
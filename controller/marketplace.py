@@ -0,0 +1,136 @@
+# controller/marketplace.py
+# Gestion multi-marketplaces : domaine de base déduit de l'URL (au lieu
+# d'amazon.fr en dur) et budget par domaine (requêtes simultanées + délai
+# minimal entre deux chargements), partagé par tous les threads du processus.
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_BASE = "https://www.amazon.fr"
+
+# code -> domaine des marketplaces suivies
+MARKETPLACES = {
+    "fr": "www.amazon.fr",
+    "de": "www.amazon.de",
+    "it": "www.amazon.it",
+    "es": "www.amazon.es",
+    "uk": "www.amazon.co.uk",
+    "com": "www.amazon.com",
+}
+
+DEFAULT_CONCURRENCY = 1        # drivers en parallèle sur un même domaine
+DEFAULT_MIN_INTERVAL = 1.0     # secondes minimum entre deux chargements sur un domaine
+
+SETTINGS: Dict[str, Dict[str, float]] = {}   # domaine -> {"concurrency", "min_interval"}
+# chargements qu'un driver peut avoir en vol (onglets, controller.tabs) : le
+# budget d'un domaine admet concurrency x loads_per_driver chargements simultanés
+LOADS = {"per_driver": 1}
+
+
+def configure(budgets: Optional[Dict[str, Dict[str, float]]] = None):
+    """budgets : {domaine ou code marketplace: {"concurrency": n, "min_interval": s}}."""
+    SETTINGS.clear()
+    for key, budget in (budgets or {}).items():
+        SETTINGS[MARKETPLACES.get(key, key).lower()] = dict(budget)
+    with _budgets_lock:
+        _budgets.clear()
+
+
+def set_loads_per_driver(n: int):
+    """Appelé par tabs.configure : n onglets par driver => n chargements en vol."""
+    n = max(1, int(n))
+    if n != LOADS["per_driver"]:
+        LOADS["per_driver"] = n
+        with _budgets_lock:
+            _budgets.clear()
+
+
+def domain_of(url: str) -> str:
+    return (urlparse(url).netloc or "").lower()
+
+
+def base_url(url: Optional[str], default: str = DEFAULT_BASE) -> str:
+    """'https://www.amazon.de/s?k=x' -> 'https://www.amazon.de'."""
+    parsed = urlparse(url or "")
+    if not parsed.netloc:
+        return default
+    return f"{parsed.scheme or 'https'}://{parsed.netloc}"
+
+
+def is_amazon_url(url: str) -> bool:
+    return "amazon." in domain_of(url)
+
+
+def marketplace_of(url: str) -> str:
+    """Code marketplace (fr, de, ...) ou le domaine s'il n'est pas connu."""
+    domain = domain_of(url)
+    for code, d in MARKETPLACES.items():
+        if d == domain:
+            return code
+    return domain
+
+
+def group_by_domain(items: List[Tuple[str, str]]) -> Dict[str, List[Tuple[int, str, str]]]:
+    """[(nom, url)] -> {domaine: [(position, nom, url)]} dans l'ordre d'origine."""
+    groups: Dict[str, List[Tuple[int, str, str]]] = {}
+    for i, (name, url) in enumerate(items):
+        groups.setdefault(domain_of(url), []).append((i, name, url))
+    return groups
+
+
+class DomainBudget:
+    """Limite les chargements simultanés et leur cadence sur un domaine."""
+
+    def __init__(self, domain: str, concurrency: int = DEFAULT_CONCURRENCY,
+                 min_interval: float = DEFAULT_MIN_INTERVAL):
+        self.domain = domain
+        self.concurrency = max(1, int(concurrency))
+        self.min_interval = float(min_interval)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Prend une place (False si blocking=False et le domaine est plein),
+        puis attend le délai minimal depuis le chargement précédent."""
+        if not self._slots.acquire(blocking):
+            return False
+        try:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start)
+                self._next_start = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+        except BaseException:
+            self._slots.release()
+            raise
+        return True
+
+    def release(self):
+        self._slots.release()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_budgets: Dict[str, DomainBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def budget_for(url: str) -> DomainBudget:
+    domain = domain_of(url)
+    with _budgets_lock:
+        b = _budgets.get(domain)
+        if b is None:
+            conf = SETTINGS.get(domain, {})
+            loads = int(conf.get("concurrency", DEFAULT_CONCURRENCY)) * LOADS["per_driver"]
+            b = _budgets[domain] = DomainBudget(domain, loads, conf.get("min_interval", DEFAULT_MIN_INTERVAL))
+        return b
@@ -1,7 +1,10 @@
+import re
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 from typing import List, Tuple, Dict, Optional
 from .utils import safe_filename
+from utils.metrics import METRICS
+from .marketplace import DEFAULT_BASE
 
 
 def build_subcategory_url(category_url: str, subcat_text: str, param_name: str = "k") -> str:
@@ -14,7 +17,12 @@ def build_subcategory_url(category_url: str, subcat_text: str, param_name: str =
     return urlunparse(parsed._replace(query=new_query))
 
 
-def get_subcategory_links_from_html(page_source: str, base_domain: str = "https://www.amazon.fr", max_subcats: int = 10) -> Dict[str, str]:
+def get_subcategory_links_from_html(page_source: str, base_domain: str = DEFAULT_BASE, max_subcats: int = 10) -> Dict[str, str]:
+    with METRICS.timer("parse_seconds", page_type="category"):
+        return _get_subcategory_links_from_html(page_source, base_domain, max_subcats)
+
+
+def _get_subcategory_links_from_html(page_source: str, base_domain: str, max_subcats: int) -> Dict[str, str]:
     soup = BeautifulSoup(page_source, "lxml")
     links = {}
     BLACKLIST = ["cart", "bestsellers", "help", "gift-cards", "wishlist", "sign-in", "prime", "account"]
@@ -53,10 +61,16 @@ def get_subcategory_links_from_html(page_source: str, base_domain: str = "https:
     return links
 
 
-def extract_product_links(page_source: str) -> List[Tuple[str, str]]:
-    soup = BeautifulSoup(page_source, "lxml")
+def extract_product_links(page_source: str, base_domain: str = DEFAULT_BASE) -> List[Tuple[str, str]]:
+    """(asin, url) of the listing results; relative links are resolved
+    against base_domain (marketplace of the listing, see marketplace.base_url)."""
+    with METRICS.timer("parse_seconds", page_type="listing"):
+        return _extract_product_links(page_source, base_domain)
+
+
+def _listing_cards(soup, base_domain: str):
+    """(asin, url, card node) of each search result linking to a product page."""
     items = soup.select("div[data-asin]") or soup.select("[data-component-type='s-search-result']")
-    results = []
     for it in items:
         asin = it.get("data-asin")
         if not asin:
@@ -66,16 +80,69 @@ def extract_product_links(page_source: str) -> List[Tuple[str, str]]:
             continue
         href = a.get("href").split("?")[0]
         if href.startswith("/"):
-            full = "https://www.amazon.fr" + href
+            full = base_domain + href
         elif href.startswith("http"):
             full = href
         else:
             continue
-        results.append((asin, full))
+        yield asin, full, it
+
+
+def _extract_product_links(page_source: str, base_domain: str) -> List[Tuple[str, str]]:
+    soup = BeautifulSoup(page_source, "lxml")
+    return [(asin, full) for asin, full, _ in _listing_cards(soup, base_domain)]
+
+
+_RATING_RE = re.compile(r"(\d+(?:[.,]\d+)?)")
+
+
+def parse_rating(text: Optional[str]) -> Optional[float]:
+    """'4,5 sur 5 étoiles' / '4.5 out of 5 stars' -> 4.5"""
+    m = _RATING_RE.search(text or "")
+    if not m:
+        return None
+    try:
+        return float(m.group(1).replace(",", "."))
+    except ValueError:
+        return None
+
+
+def parse_listing_results(page_source: str, base_domain: str = DEFAULT_BASE) -> List[dict]:
+    """Fields available on the search result cards, without visiting the
+    product pages: asin, url, name, price, rating, image_url (None when the
+    card does not show it)."""
+    with METRICS.timer("parse_seconds", page_type="listing"):
+        return _parse_listing_results(page_source, base_domain)
+
+
+def _parse_listing_results(page_source: str, base_domain: str) -> List[dict]:
+    soup = BeautifulSoup(page_source, "lxml")
+    results = []
+    for asin, full, card in _listing_cards(soup, base_domain):
+        def text_of(selectors: List[str]):
+            for s in selectors:
+                n = card.select_one(s)
+                if n and n.get_text(strip=True):
+                    return n.get_text(" ", strip=True)
+            return None
+        img = card.select_one("img.s-image") or card.select_one("img")
+        results.append({
+            "asin": asin,
+            "url": full,
+            "name": text_of(["h2 a span", "h2 span", "h2"]),
+            "price": text_of([".a-price .a-offscreen", ".a-price-whole"]),
+            "rating": parse_rating(text_of(["i.a-icon-star-small span.a-icon-alt", "span.a-icon-alt"])),
+            "image_url": img.get("src") if img else None,
+        })
     return results
 
 
 def parse_product_page(page_source: str) -> dict:
+    with METRICS.timer("parse_seconds", page_type="product"):
+        return _parse_product_page(page_source)
+
+
+def _parse_product_page(page_source: str) -> dict:
     soup = BeautifulSoup(page_source, "lxml")
     def text_of(selectors: List[str]):
         for s in selectors:
@@ -110,5 +177,7 @@ def parse_product_page(page_source: str) -> dict:
     img_node = soup.select_one("#landingImage") or soup.select_one("#imgTagWrapperId img") or soup.select_one("img#main-image")
     if img_node:
         image_url = img_node.get("data-old-hires") or img_node.get("data-src") or img_node.get("src")
-    return {"name": name, "description": desc, "price": price, "brand": brand, "seller": seller, "color": color, "image_url": image_url}
+    rating = parse_rating(text_of(["#acrPopover span.a-icon-alt", "#averageCustomerReviews span.a-icon-alt"]))
+    return {"name": name, "description": desc, "price": price, "brand": brand, "seller": seller, "color": color,
+            "image_url": image_url, "rating": rating}
 
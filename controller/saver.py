@@ -2,7 +2,9 @@
 import os
 import json
 import tempfile
-from typing import List, Any, Dict, Optional
+from typing import List, Any, Callable, Dict, Optional, Union
+from utils.metrics import METRICS
+from utils.streaming import iter_json_array
 
 PROCESSED_FILENAME = ".processed.json"
 
@@ -28,38 +30,149 @@ def _atomic_write(path: str, data: str):
             except Exception:
                 pass
 
-def save_products_json(products: List[Any], target_dir: str, filename: str = "products.json") -> str:
+def _product_record(p: Any) -> Dict[str, Any]:
     """
-    Sauvegarde une liste d'objets 'product' en JSON lisible.
-    Chaque élément est transformé par, dans l'ordre :
+    Transforme un 'product' en dict sérialisable, dans l'ordre :
       - p.to_dict() si disponible
       - p.__dict__ si p est un objet
       - sinon str(p)
+    """
+    try:
+        if hasattr(p, "to_dict") and callable(getattr(p, "to_dict")):
+            return p.to_dict()
+        if isinstance(p, dict):
+            return p
+        if hasattr(p, "__dict__"):
+            return {k: v for k, v in p.__dict__.items() if not k.startswith("_")}
+        return {"repr": str(p)}
+    except Exception:
+        try:
+            return {"repr": str(p)}
+        except Exception:
+            return {}
+
+def save_products_json(products: List[Any], target_dir: str, filename: str = "products.json") -> str:
+    """
+    Sauvegarde une liste d'objets 'product' en JSON lisible (cf. _product_record).
     Retourne le chemin du fichier écrit.
     """
     _ensure_dir(target_dir)
     path = os.path.join(target_dir, filename)
-    records = []
-    for p in products:
-        try:
-            if hasattr(p, "to_dict") and callable(getattr(p, "to_dict")):
-                records.append(p.to_dict())
-            elif isinstance(p, dict):
-                records.append(p)
-            elif hasattr(p, "__dict__"):
-                records.append({k: v for k, v in p.__dict__.items() if not k.startswith("_")})
-            else:
-                records.append({"repr": str(p)})
-        except Exception:
-            try:
-                records.append({"repr": str(p)})
-            except Exception:
-                records.append({})
+    records = [_product_record(p) for p in products]
     # write atomically
-    json_text = json.dumps(records, ensure_ascii=False, indent=2)
-    _atomic_write(path, json_text)
+    with METRICS.timer("storage_write_seconds", kind="products"):
+        json_text = json.dumps(records, ensure_ascii=False, indent=2)
+        _atomic_write(path, json_text)
+    return path
+
+def upsert_products_json(products: List[Any], target_dir: str, filename: str = "products.json") -> str:
+    """
+    Ajoute des produits à un products.json existant ; un produit de même ASIN
+    est mis à jour (un dict partiel {"asin": ..., "image_local": ...} ne
+    change que ces champs). Utilisé pour les reprises de la dead-letter queue ;
+    le produit repris est réécrit par le scrape suivant qui le retrouve dans
+    le listing (ou recopié par ProductsJsonWriter(keep_existing=...)).
+    """
+    _ensure_dir(target_dir)
+    path = os.path.join(target_dir, filename)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        if not isinstance(records, list):
+            records = []
+    except Exception:
+        records = []
+    index = {r.get("asin"): r for r in records if isinstance(r, dict) and r.get("asin")}
+    for p in products:
+        rec = _product_record(p)
+        existing = index.get(rec.get("asin"))
+        if existing is not None:
+            existing.update(rec)
+        else:
+            records.append(rec)
+            index[rec.get("asin")] = rec
+    with METRICS.timer("storage_write_seconds", kind="products"):
+        _atomic_write(path, json.dumps(records, ensure_ascii=False, indent=2))
     return path
 
+class ProductsJsonWriter:
+    """
+    Écriture au fil de l'eau d'un products.json (même format que
+    save_products_json) : chaque produit est sérialisé dès qu'il est ajouté,
+    dans un fichier temporaire renommé à la fermeture. Si le bloc with lève,
+    le fichier existant n'est pas touché.
+
+    keep_existing=True : à la fermeture, les produits de l'ancien fichier dont
+    l'ASIN n'a pas été réécrit (laissés de côté car frais...) sont recopiés à
+    la suite, lus un par un ; keep_existing=fonction(asin) -> bool ne recopie
+    que ceux qu'elle accepte. `count` compte les produits écrits, `carried`
+    ceux recopiés.
+
+        with ProductsJsonWriter(sub_dir, keep_existing=True) as w:
+            w.write(product)
+    """
+    def __init__(self, target_dir: str, filename: str = "products.json",
+                 keep_existing: Union[bool, Callable[[str], bool]] = False):
+        _ensure_dir(target_dir)
+        self.path = os.path.join(target_dir, filename)
+        self.count = 0
+        self.carried = 0
+        self._written = set() if keep_existing else None
+        self._keep = keep_existing if callable(keep_existing) else None
+        fd, self._tmp = tempfile.mkstemp(dir=target_dir, prefix=".tmp_")
+        self._f = os.fdopen(fd, "w", encoding="utf-8")
+        self._f.write("[")
+
+    def write(self, product: Any):
+        with METRICS.timer("storage_write_seconds", kind="products"):
+            rec = _product_record(product)
+            text = json.dumps(rec, ensure_ascii=False, indent=2)
+            self._f.write(("," if self.count else "") + "\n  " + text.replace("\n", "\n  "))
+            self._f.flush()
+        if self._written is not None and isinstance(rec, dict):
+            self._written.add(rec.get("asin"))
+        self.count += 1
+
+    def _carry_existing(self):
+        for rec in iter_json_array(self.path):
+            if not isinstance(rec, dict) or not rec.get("asin") or rec["asin"] in self._written:
+                continue
+            if self._keep is not None and not self._keep(rec["asin"]):
+                continue
+            text = json.dumps(rec, ensure_ascii=False, indent=2)
+            self._f.write(("," if self.count + self.carried else "") + "\n  " + text.replace("\n", "\n  "))
+            self.carried += 1
+
+    def close(self) -> str:
+        if self._f is not None:
+            if self._written is not None:
+                with METRICS.timer("storage_write_seconds", kind="products"):
+                    self._carry_existing()
+            self._f.write("\n]" if self.count + self.carried else "]")
+            self._f.close()
+            self._f = None
+            os.replace(self._tmp, self.path)
+        return self.path
+
+    def abort(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
 class SimpleStorage:
     """
     Stocke les ASINs déjà traités pour éviter les doublons entre runs.
@@ -133,8 +246,9 @@ class SimpleStorage:
 
     def _save(self):
         try:
-            json_text = json.dumps(self._data, ensure_ascii=False, indent=2)
-            _atomic_write(self._path, json_text)
+            with METRICS.timer("storage_write_seconds", kind="processed"):
+                json_text = json.dumps(self._data, ensure_ascii=False, indent=2)
+                _atomic_write(self._path, json_text)
         except Exception:
             # ne doit pas lever pour ne pas casser le scraper
             try:
@@ -1,5 +1,31 @@
-from .ScraperController.scraper_default import scrape_default
-from .ScraperController.scraper_categories import scrape_category
-from .ScraperController.scraper_all_categories import scrape_all_categories
+# Façade des modes de scrape. Les modules sont chargés à la demande
+# (PEP 562) : importer controller.scraper ne tire ni Selenium ni bs4.
+import importlib
 
-__all__ = ["scrape_default", "scrape_category", "scrape_all_categories"]
+_EXPORTS = {
+    "scrape_default": ".ScraperController.scraper_default",
+    "scrape_category": ".ScraperController.scraper_categories",
+    "scrape_all_categories": ".ScraperController.scraper_all_categories",
+    "scrape_all_categories_queued": ".ScraperController.scraper_queue",
+    "enqueue_categories": ".ScraperController.scraper_queue",
+    "run_worker": ".ScraperController.scraper_queue",
+    "run_workers": ".ScraperController.scraper_queue",
+    "collect_results": ".ScraperController.scraper_queue",
+    "batch_status": ".ScraperController.scraper_queue",
+    "retry_batch_dead_letters": ".ScraperController.scraper_queue",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __package__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,160 @@
+# controller/tabs.py
+# Plusieurs onglets en vol dans un seul Chrome : la navigation est lancée par
+# window.location (non bloquant, contrairement à driver.get), puis les onglets
+# sont interrogés tour à tour et le HTML est rendu dès qu'un onglet a fini,
+# dans l'ordre d'arrivée. De la concurrence par navigateur pour le coût
+# mémoire d'onglets, au lieu d'un Chrome (et d'un chromedriver) par driver.
+#
+# Le budget du domaine (controller.marketplace) borne toujours le nombre de
+# chargements simultanés : configure() le porte à concurrency x onglets, chaque
+# driver peut donc remplir ses onglets ; min_interval espace toujours les départs.
+import time
+import threading
+import weakref
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from utils.metrics import METRICS
+from utils import trace
+from .antibot import BlockedPageError, breaker_for
+from .fetcher import PAGE_READY, PAGE_ERROR, PAGE_TIMEOUTS, COMPLETE_GRACE, check_page
+from . import marketplace
+from .marketplace import budget_for
+
+POLL_INTERVAL = 0.05
+DEFAULT_TIMEOUT = 10
+
+SETTINGS = {"tabs": 1}
+
+# marqueur posé sur l'ancien document avant la navigation : tant qu'il est
+# visible, l'onglet affiche encore la page précédente (readyState trompeur)
+_STATE_JS = """
+if (window.__tabpool_stale) return 'loading';
+if (arguments[1] && document.querySelector(arguments[1])) return 'error';
+if (arguments[0] && document.querySelector(arguments[0])) return 'ready';
+return document.readyState === 'complete' ? 'complete' : 'loading';
+"""
+_NAVIGATE_JS = "window.__tabpool_stale = true; window.location.href = arguments[0];"
+
+
+def configure(tabs: Optional[int] = None):
+    if tabs is not None:
+        SETTINGS["tabs"] = max(1, int(tabs))
+    marketplace.set_loads_per_driver(SETTINGS["tabs"])
+
+
+def enabled() -> bool:
+    return SETTINGS["tabs"] > 1
+
+
+class TabPool:
+    """`size` onglets d'un même driver, réutilisés d'un appel à l'autre."""
+
+    def __init__(self, driver, size: int, poll: float = POLL_INTERVAL):
+        self.driver = driver
+        self.size = max(1, int(size))
+        self.poll = poll
+        self.handles = []
+
+    def _ensure_tabs(self):
+        handles = list(self.driver.window_handles)
+        while len(handles) < self.size:
+            self.driver.switch_to.new_window("tab")
+            handles = list(self.driver.window_handles)
+        self.handles = handles[:self.size]
+
+    def _state(self, handle, ready_css, error_css) -> str:
+        self.driver.switch_to.window(handle)
+        return self.driver.execute_script(_STATE_JS, ready_css, error_css) or "loading"
+
+    def fetch_many(self, todo: deque, stop: Callable[[int], bool] = lambda in_flight: False,
+                   page_type: Optional[str] = None,
+                   timeout: Optional[float] = None) -> Iterator[Tuple[Any, Optional[str], Optional[Exception]]]:
+        """
+        Vide `todo` (deque d'éléments dont item[1] est l'URL) et produit
+        (item, html, None) ou (item, None, exception) dans l'ordre où les
+        onglets terminent. Des éléments ajoutés à todo pendant l'itération
+        (nouvel essai) sont pris en compte ; stop(en_vol) arrête de lancer de
+        nouvelles navigations, celles en cours sont menées à terme.
+        """
+        self._ensure_tabs()
+        ready_css = PAGE_READY.get(page_type, "")
+        timeout = timeout if timeout is not None else PAGE_TIMEOUTS.get(page_type, DEFAULT_TIMEOUT)
+        labels = {"page_type": page_type or "other", "mode": "tabs"}
+        free = list(self.handles)
+        busy: Dict[str, tuple] = {}   # handle -> (item, url, started, budget, epoch)
+        try:
+            while True:
+                while free and todo and not stop(len(busy)):
+                    item = todo[0]
+                    budget = budget_for(item[1])
+                    if not budget.acquire(blocking=False):
+                        break           # domaine à sa limite : on attend qu'un onglet se libère
+                    todo.popleft()
+                    breaker_for(item[1]).before_request()
+                    handle = free.pop()
+                    try:
+                        self.driver.switch_to.window(handle)
+                        self.driver.execute_script(_NAVIGATE_JS, item[1])
+                    except Exception as e:
+                        budget.release()
+                        free.append(handle)
+                        yield item, None, e
+                        continue
+                    busy[handle] = (item, item[1], time.perf_counter(), budget, time.time())
+                if not busy:
+                    if todo and not stop(0):
+                        time.sleep(self.poll)   # budget pris par un autre thread
+                        continue
+                    return
+                finished = []
+                for handle, (item, url, started, budget, epoch) in busy.items():
+                    elapsed = time.perf_counter() - started
+                    html = None
+                    try:
+                        state = self._state(handle, ready_css, PAGE_ERROR)
+                        if state == "complete" and ready_css and elapsed < COMPLETE_GRACE:
+                            state = "loading"
+                        if state == "loading" and elapsed < timeout:
+                            continue
+                        if state == "loading":
+                            state = "timeout"
+                            METRICS.inc("fetch_wait_timeouts", **labels)
+                        METRICS.inc("pages_fetched", **labels)
+                        METRICS.observe("fetch_wait_seconds", elapsed, outcome=state, **labels)
+                        METRICS.observe("fetch_seconds", elapsed, **labels)
+                        html = self.driver.page_source
+                        result = (check_page(url, html), None)
+                        trace.fetch(url, page_type, epoch, wait_s=elapsed, size=len(html or ""),
+                                    outcome="timeout" if state == "timeout" else "ok", mode="tabs")
+                    except Exception as e:
+                        result = (None, e)
+                        trace.fetch(url, page_type, epoch, wait_s=elapsed,
+                                    size=len(html) if html is not None else None, mode="tabs",
+                                    outcome="blocked" if isinstance(e, BlockedPageError) else "error",
+                                    error=e.marker if isinstance(e, BlockedPageError) else f"{type(e).__name__}: {e}")
+                    finished.append((handle, item, budget, result))
+                for handle, item, budget, (html, err) in finished:
+                    del busy[handle]
+                    budget.release()
+                    free.append(handle)
+                    yield item, html, err
+                if not finished:
+                    time.sleep(self.poll)
+        finally:
+            for _, _, _, budget, _ in busy.values():
+                budget.release()
+
+
+_pools: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_pools_lock = threading.Lock()
+
+
+def pool_for(driver, size: Optional[int] = None) -> TabPool:
+    """TabPool attaché au driver (créé au premier appel, SETTINGS["tabs"] onglets)."""
+    size = size or SETTINGS["tabs"]
+    with _pools_lock:
+        pool = _pools.get(driver)
+        if pool is None or pool.size != size:
+            pool = _pools[driver] = TabPool(driver, size)
+        return pool
@@ -0,0 +1,305 @@
+# controller/task_queue.py
+# File de tâches durable pour le mode "queue" (coordinateur + workers).
+#
+# Une tâche = {id, batch, kind, payload, status, attempts, ...}. Un worker la
+# prend en bail (lease) pour lease_seconds ; s'il meurt sans appeler
+# complete()/fail(), le bail expire et la tâche redevient disponible.
+# Deux backends au même contrat : SQLiteQueue (fichier partagé entre
+# processus) et MemoryQueue (même processus, pour les essais : une seule file
+# par URL memory:// dans le processus, invisible des workers multiprocessing).
+# D'autres backends peuvent être branchés via register_backend().
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_QUEUE_URL = "sqlite:///" + os.path.join("data", ".task_queue.sqlite")
+DEFAULT_LEASE_SECONDS = 600
+DEFAULT_MAX_ATTEMPTS = 3
+
+PENDING, LEASED, DONE, FAILED = "pending", "leased", "done", "failed"
+
+
+def new_batch_id() -> str:
+    return time.strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
+
+
+class MemoryQueue:
+    """Implémentation en mémoire (thread-safe), sert de référence au contrat."""
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._tasks: Dict[int, Dict[str, Any]] = {}
+        self._keys: Dict[tuple, int] = {}
+        self._next_id = 1
+
+    def enqueue(self, batch: str, kind: str, payload: Dict[str, Any],
+                key: Optional[str] = None, priority: int = 0) -> Optional[int]:
+        """Ajoute une tâche ; None si (batch, key) existe déjà."""
+        with self._lock:
+            if key is not None and (batch, key) in self._keys:
+                return None
+            tid = self._next_id
+            self._next_id += 1
+            self._tasks[tid] = {"id": tid, "batch": batch, "kind": kind, "key": key,
+                                "payload": dict(payload), "priority": priority, "status": PENDING,
+                                "attempts": 0, "worker": None, "lease_expires": None,
+                                "result": None, "error": None, "created": time.time()}
+            if key is not None:
+                self._keys[(batch, key)] = tid
+            return tid
+
+    def lease(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              kinds: Optional[Iterable[str]] = None, batch: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        kinds = set(kinds) if kinds else None
+        with self._lock:
+            candidates = sorted((t for t in self._tasks.values()
+                                 if (t["status"] == PENDING or (t["status"] == LEASED and t["lease_expires"] < now))
+                                 and (kinds is None or t["kind"] in kinds)
+                                 and (batch is None or t["batch"] == batch)),
+                                key=lambda t: (-t["priority"], t["id"]))
+            t = None
+            for c in candidates:
+                if c["attempts"] < self.max_attempts:
+                    t = c
+                    break
+                # bail expiré alors que toutes les tentatives sont consommées
+                c.update(status=FAILED, worker=None, lease_expires=None,
+                         error=c["error"] or "bail expiré trop de fois")
+            if t is None:
+                return None
+            t.update(status=LEASED, worker=worker, lease_expires=now + lease_seconds, attempts=t["attempts"] + 1)
+            return dict(t, payload=dict(t["payload"]))
+
+    def heartbeat(self, task_id: int, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        with self._lock:
+            t = self._tasks.get(task_id)
+            if not t or t["status"] != LEASED or t["worker"] != worker:
+                return False
+            t["lease_expires"] = time.time() + lease_seconds
+            return True
+
+    def complete(self, task_id: int, worker: str, result: Any = None) -> bool:
+        with self._lock:
+            t = self._tasks.get(task_id)
+            if not t or t["status"] != LEASED or t["worker"] != worker:
+                return False
+            t.update(status=DONE, result=result, lease_expires=None)
+            return True
+
+    def fail(self, task_id: int, worker: str, error: str, retry: bool = True) -> bool:
+        with self._lock:
+            t = self._tasks.get(task_id)
+            if not t or t["status"] != LEASED or t["worker"] != worker:
+                return False
+            again = retry and t["attempts"] < self.max_attempts
+            t.update(status=PENDING if again else FAILED, error=error, worker=None, lease_expires=None)
+            return True
+
+    def tasks(self, batch: str, kind: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(t) for t in sorted(self._tasks.values(), key=lambda t: t["id"])
+                    if t["batch"] == batch and (kind is None or t["kind"] == kind)
+                    and (status is None or t["status"] == status)]
+
+    def counts(self, batch: str) -> Dict[str, int]:
+        out = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for t in self.tasks(batch):
+            out[t["status"]] += 1
+        return out
+
+    def close(self):
+        pass
+
+
+class SQLiteQueue:
+    """Backend SQLite : plusieurs processus (ou machines sur un volume partagé
+    qui gère bien les verrous) partagent le même fichier. Chaque opération est
+    une transaction courte ; lease() prend un verrou d'écriture (BEGIN IMMEDIATE)
+    pour qu'une tâche ne soit jamais donnée à deux workers."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        batch TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        key TEXT,
+        payload TEXT NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        worker TEXT,
+        lease_expires REAL,
+        result TEXT,
+        error TEXT,
+        created REAL NOT NULL,
+        UNIQUE (batch, key)
+    );
+    CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, priority, id);
+    """
+
+    def __init__(self, path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS, timeout: float = 30.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.DatabaseError:
+            pass
+        self._conn.executescript(self.SCHEMA)
+
+    def _row(self, row) -> Dict[str, Any]:
+        cols = ("id", "batch", "kind", "key", "payload", "priority", "status", "attempts",
+                "worker", "lease_expires", "result", "error", "created")
+        t = dict(zip(cols, row))
+        t["payload"] = json.loads(t["payload"])
+        t["result"] = json.loads(t["result"]) if t["result"] is not None else None
+        return t
+
+    def enqueue(self, batch: str, kind: str, payload: Dict[str, Any],
+                key: Optional[str] = None, priority: int = 0) -> Optional[int]:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO tasks (batch, kind, key, payload, priority, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (batch, kind, key, json.dumps(payload, ensure_ascii=False), priority, time.time()))
+            return cur.lastrowid if cur.rowcount else None
+
+    def lease(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              kinds: Optional[Iterable[str]] = None, batch: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        where = ["(status = 'pending' OR (status = 'leased' AND lease_expires < ?))"]
+        args: List[Any] = [now]
+        kinds = list(kinds) if kinds else None
+        if kinds:
+            where.append("kind IN (%s)" % ",".join("?" * len(kinds)))
+            args.extend(kinds)
+        if batch is not None:
+            where.append("batch = ?")
+            args.append(batch)
+        sql = "SELECT * FROM tasks WHERE " + " AND ".join(where) + " ORDER BY priority DESC, id LIMIT 1"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._conn.execute(sql, args).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+                    t = self._row(row)
+                    if t["attempts"] >= self.max_attempts:
+                        # bail expiré alors que toutes les tentatives sont consommées
+                        self._conn.execute(
+                            "UPDATE tasks SET status = 'failed', worker = NULL, lease_expires = NULL, "
+                            "error = COALESCE(error, 'bail expiré trop de fois') WHERE id = ?", (t["id"],))
+                        continue
+                    self._conn.execute(
+                        "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                        "WHERE id = ?", (worker, now + lease_seconds, t["id"]))
+                    self._conn.execute("COMMIT")
+                    t.update(status=LEASED, worker=worker, lease_expires=now + lease_seconds,
+                             attempts=t["attempts"] + 1)
+                    return t
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _update_owned(self, task_id: int, worker: str, sets: str, args: tuple) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                f"UPDATE tasks SET {sets} WHERE id = ? AND status = 'leased' AND worker = ?",
+                args + (task_id, worker))
+            return cur.rowcount == 1
+
+    def heartbeat(self, task_id: int, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        return self._update_owned(task_id, worker, "lease_expires = ?", (time.time() + lease_seconds,))
+
+    def complete(self, task_id: int, worker: str, result: Any = None) -> bool:
+        return self._update_owned(task_id, worker, "status = 'done', lease_expires = NULL, result = ?",
+                                  (json.dumps(result, ensure_ascii=False, default=str),))
+
+    def fail(self, task_id: int, worker: str, error: str, retry: bool = True) -> bool:
+        status = ("CASE WHEN attempts < %d THEN 'pending' ELSE 'failed' END" % self.max_attempts) if retry else "'failed'"
+        return self._update_owned(task_id, worker,
+                                  f"status = {status}, error = ?, worker = NULL, lease_expires = NULL", (error,))
+
+    def tasks(self, batch: str, kind: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql, args = "SELECT * FROM tasks WHERE batch = ?", [batch]
+        if kind is not None:
+            sql += " AND kind = ?"
+            args.append(kind)
+        if status is not None:
+            sql += " AND status = ?"
+            args.append(status)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY id", args).fetchall()
+        return [self._row(r) for r in rows]
+
+    def counts(self, batch: str) -> Dict[str, int]:
+        out = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            for status, n in self._conn.execute(
+                    "SELECT status, COUNT(*) FROM tasks WHERE batch = ? GROUP BY status", (batch,)):
+                out[status] = n
+        return out
+
+    def close(self):
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+
+
+_memory_queues: Dict[str, MemoryQueue] = {}
+_memory_lock = threading.Lock()
+
+
+def _memory_queue(name: str) -> MemoryQueue:
+    # open_queue("memory://x") rend toujours la même file : enqueue, worker et
+    # collect ouvrent chacun la file, elle ne doit pas repartir vide
+    with _memory_lock:
+        q = _memory_queues.get(name)
+        if q is None:
+            q = _memory_queues[name] = MemoryQueue()
+        return q
+
+
+_BACKENDS: Dict[str, Callable[[str], Any]] = {
+    "sqlite": lambda rest: SQLiteQueue(rest),
+    "memory": _memory_queue,
+}
+
+# backends dont l'état ne sort pas du processus (refusés par run_workers)
+PROCESS_LOCAL = {"memory"}
+
+
+def register_backend(scheme: str, factory: Callable[[str], Any]):
+    """Branche un autre backend (ex. serveur partagé) : open_queue("scheme://...")."""
+    _BACKENDS[scheme] = factory
+
+
+def queue_scheme(url: Optional[str] = None) -> str:
+    scheme, sep, _ = (url or DEFAULT_QUEUE_URL).partition("://")
+    return scheme if sep else "sqlite"
+
+
+def open_queue(url: Optional[str] = None):
+    """Ouvre une file à partir d'une URL : sqlite:///chemin, memory://."""
+    url = url or DEFAULT_QUEUE_URL
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return SQLiteQueue(url)  # chemin de fichier nu
+    factory = _BACKENDS.get(scheme)
+    if factory is None:
+        raise ValueError(f"backend de file inconnu: {scheme} (connus: {', '.join(sorted(_BACKENDS))})")
+    if scheme == "sqlite" and rest.startswith("/"):
+        rest = rest[1:]  # sqlite:///rel/path -> rel/path ; sqlite:////abs -> /abs
+    return factory(rest)
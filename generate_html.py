@@ -13,9 +13,48 @@ import shutil
 import os
 import html
 import re
+import hashlib
+import gzip
+import heapq
+import itertools
+import unicodedata
+import string
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.catalog import discover_product_files, iter_catalog
+from utils import thumbnails
+from utils.metrics import METRICS
+from utils import streaming
 
 ROOT_IGNORE = {"ScraperCategories", "ScraperAllCategories", "ScraperDefault"}
 
+# incremental build: manifest + per-category shards under output_dir
+MANIFEST_NAME = ".build_manifest.json"
+SHARDS_DIR = "shards"
+# build-only files (search postings, merge scratch) live next to output_dir,
+# not in it, so they are never published nor precompressed
+POSTINGS_DIR = "postings"
+# products per shard (one "page" loaded by the browser on scroll)
+PAGE_SIZE = 48
+# bump when make_product_card / shard markup changes to invalidate the cache
+RENDER_VERSION = 5
+# client-side search index (assets/search-index.js), see build_search_index
+SEARCH_INDEX_FILE = Path("assets") / "search-index.js"
+# max postings files merged at once by build_search_index (open files)
+SEARCH_MERGE_FANIN = 128
+# how images are placed in site/assets/images: "copy", "hardlink", "symlink"
+# or "link" (hardlink, else symlink). Linking falls back to copying.
+ASSET_MODES = ("copy", "hardlink", "symlink", "link")
+ASSET_MODE = "copy"
+# output files are streamed through buffered writers of this size
+WRITE_BUFFER = 1 << 16
+# pre-compressed .gz twins for static hosts (gzip_static); tiny files skipped
+GZIP_MIN_SIZE = 1024
+GZIP_SUFFIXES = (".html", ".js", ".css", ".json")
+SEARCH_STOPWORDS = {"de", "la", "le", "les", "des", "du", "et", "en", "pour", "avec", "un", "une",
+                    "au", "aux", "sur", "par", "the", "and", "for", "with", "of"}
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
 # CSS fourni par toi (inséré tel quel ci-dessous)
 PAGE_CSS = r"""
 /* --- Ta CSS fournie --- */
@@ -57,6 +96,7 @@ body { font-family: 'Amazon Ember', Arial, sans-serif; background: #f3f3f3; }
 /* Product Cards - Fixed Height */
 .product { background: white; border-radius: 8px; overflow: hidden; transition: all 0.3s ease; border: 1px solid #ddd; display: flex; flex-direction: column; height: 480px; }
 .product:hover { box-shadow: 0 4px 12px rgba(0,0,0,0.15); transform: translateY(-2px); }
+.product picture { display: block; }
 .product img { width: 100%; height: 200px; object-fit: contain; background: #f8f9fa; border-bottom: 1px solid #eee; }
 .product-info { padding: 15px; flex: 1; display: flex; flex-direction: column; }
 .product-title { font-size: 14px; font-weight: 600; color: #0066c0; margin-bottom: 8px; line-height: 1.3; height: 40px; overflow: hidden; }
@@ -82,6 +122,11 @@ body { font-family: 'Amazon Ember', Arial, sans-serif; background: #f3f3f3; }
 }
 
 .empty-state { text-align: center; color: #666; background: white; padding: 40px; border-radius: 8px; }
+.shard-sentinel { height: 1px; }
+.shard-page { display: contents; }
+.searching .product { display: none; }
+.searching .product.match { display: flex; }
+.searching .category-section.no-match { display: none !important; }
 """
 
 # JS fourni (légèrement adapté pour être dynamique)
@@ -99,6 +144,78 @@ function closeSidebar() {
   document.querySelector('.overlay').classList.remove('show');
 }
 
+// Shards: each category's cards live in shards/<slug>/<page>.js files that
+// call registerShard(); they are loaded on demand (script tags also work
+// when the page is opened from file://).
+const shardState = {};      // slug -> {pages: n, done: {page: true}, pending: {page: Promise}}
+const shardWaiters = {};    // "slug/page" -> resolve
+
+function registerShard(slug, page, cardsHtml) {
+  const section = document.querySelector(`.category-section[data-category="${slug}"]`);
+  const holder = section && section.querySelector(`.shard-page[data-page="${page}"]`);
+  if (holder) holder.innerHTML = cardsHtml;
+  const key = `${slug}/${page}`;
+  if (shardWaiters[key]) { shardWaiters[key](); delete shardWaiters[key]; }
+}
+
+function loadScript(src, key) {
+  return new Promise(resolve => {
+    if (key) shardWaiters[key] = resolve;
+    const s = document.createElement('script');
+    s.src = src;
+    if (!key) s.onload = () => resolve();
+    s.onerror = () => resolve();
+    document.body.appendChild(s);
+  });
+}
+
+function loadShard(slug, page) {
+  const st = shardState[slug];
+  if (!st || page >= st.pages || st.done[page]) return Promise.resolve(false);
+  if (st.pending[page]) return st.pending[page];
+  st.pending[page] = loadScript(`shards/${encodeURIComponent(slug)}/${page}.js`, `${slug}/${page}`).then(() => {
+    st.done[page] = true;
+    delete st.pending[page];
+    updateResultsCount();
+    return true;
+  });
+  return st.pending[page];
+}
+
+function loadNextShard(slug) {
+  const st = shardState[slug];
+  if (!st) return Promise.resolve(false);
+  let page = 0;
+  while (page < st.pages && st.done[page]) page++;
+  return loadShard(slug, page);
+}
+
+async function loadAllShards(slug) {
+  while (await loadNextShard(slug)) { /* keep going */ }
+}
+
+function sectionVisible(section) {
+  return section.style.display !== 'none';
+}
+
+function isSearching() {
+  return document.querySelector('.container').classList.contains('searching');
+}
+
+// Infinite scroll: when a section's sentinel comes into view, load its next page
+const shardObserver = ('IntersectionObserver' in window) ? new IntersectionObserver(entries => {
+  entries.forEach(entry => {
+    if (!entry.isIntersecting || isSearching()) return;
+    const section = entry.target.closest('.category-section');
+    if (section && sectionVisible(section)) {
+      loadNextShard(section.dataset.category).then(loaded => {
+        // sentinel still visible (short page): keep loading
+        if (loaded) { shardObserver.unobserve(entry.target); shardObserver.observe(entry.target); }
+      });
+    }
+  });
+}, { rootMargin: '600px 0px' }) : null;
+
 // Category filtering
 function showCategory(category, event) {
   if (event) event.preventDefault();
@@ -118,34 +235,143 @@ function showCategory(category, event) {
     sections.forEach(section => {
       section.style.display = section.dataset.category === category ? 'block' : 'none';
     });
+    loadNextShard(category);
   }
-  updateResultsCount();
+  if (isSearching()) filterProducts(); else updateResultsCount();
   closeSidebar();
 }
 
-// Search functionality
-function filterProducts() {
-  const searchTerm = document.getElementById('searchInput').value.toLowerCase();
-  const products = document.querySelectorAll('.product');
-  let visibleCount = 0;
+// Search: prebuilt inverted index (assets/search-index.js, loaded on first
+// search). Accent-folded tokens; every query token must match, the last one
+// as a prefix. Only the shards holding the first results are loaded.
+const MAX_SEARCH_RESULTS = 240;
+let searchIndex = null;
+let searchIndexLoading = null;
+let searchSeq = 0;
 
-  products.forEach(product => {
-    const section = product.closest('.category-section');
-    if (section && section.style.display === 'none') {
-      return; // Skip products in hidden categories
-    }
+function registerSearchIndex(idx) {
+  searchIndex = idx;
+  searchIndex.stopSet = new Set(idx.stop || []);
+}
+
+function loadSearchIndex() {
+  if (searchIndex) return Promise.resolve(searchIndex);
+  if (!searchIndexLoading) {
+    searchIndexLoading = loadScript('assets/search-index.js').then(() => searchIndex);
+  }
+  return searchIndexLoading;
+}
+
+function foldText(s) {
+  return s.normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+}
 
+function queryTokens(q) {
+  return foldText(q).split(/[^0-9a-z]+/).filter(t => t.length >= 2 && !searchIndex.stopSet.has(t));
+}
+
+function lowerBound(arr, key) {
+  let lo = 0, hi = arr.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (arr[mid] < key) lo = mid + 1; else hi = mid;
+  }
+  return lo;
+}
+
+function postingsFor(token, prefix) {
+  const terms = searchIndex.terms;
+  let i = lowerBound(terms, token);
+  if (!prefix) return new Set(terms[i] === token ? searchIndex.postings[i] : []);
+  const out = new Set();
+  for (; i < terms.length && terms[i].startsWith(token); i++) {
+    searchIndex.postings[i].forEach(id => out.add(id));
+  }
+  return out;
+}
+
+function searchIds(q) {
+  const tokens = queryTokens(q);
+  if (!tokens.length) return [];
+  let result = null;
+  tokens.forEach((t, k) => {
+    const ids = postingsFor(t, k === tokens.length - 1);
+    result = result === null ? ids : new Set([...result].filter(id => ids.has(id)));
+  });
+  return Array.from(result).sort((a, b) => a - b);
+}
+
+function docLocation(id) {
+  const cats = searchIndex.cats;
+  let lo = 0, hi = cats.length - 1;
+  while (lo < hi) {
+    const mid = (lo + hi + 1) >> 1;
+    if (cats[mid].offset <= id) lo = mid; else hi = mid - 1;
+  }
+  const c = cats[lo];
+  const n = id - c.offset;
+  return { slug: c.slug, n: n, page: Math.floor(n / searchIndex.pageSize) };
+}
+
+// Fallback when the index is unavailable: match the cards already loaded
+function filterLoadedProducts(searchTerm) {
+  let visibleCount = 0;
+  document.querySelectorAll('.product').forEach(product => {
     const title = product.querySelector('.product-title').textContent.toLowerCase();
     const descElement = product.querySelector('.product-description');
     const desc = descElement ? descElement.textContent.toLowerCase() : '';
     const visible = title.includes(searchTerm) || desc.includes(searchTerm);
-    product.style.display = visible ? 'flex' : 'none';
-    if (visible) visibleCount++;
+    product.classList.toggle('match', visible);
+    const section = product.closest('.category-section');
+    if (visible && section && sectionVisible(section)) visibleCount++;
   });
-
+  document.querySelectorAll('.category-section').forEach(section => {
+    section.classList.toggle('no-match', !section.querySelector('.product.match'));
+  });
+  document.querySelector('.container').classList.add('searching');
   document.getElementById('resultsCount').textContent = `${visibleCount} produit(s) trouvé(s)`;
 }
 
+async function filterProducts() {
+  const raw = document.getElementById('searchInput').value;
+  const container = document.querySelector('.container');
+  const seq = ++searchSeq;
+  if (!raw.trim()) {
+    container.classList.remove('searching');
+    document.querySelectorAll('.product.match').forEach(el => el.classList.remove('match'));
+    updateResultsCount();
+    return;
+  }
+  await loadSearchIndex();
+  if (seq !== searchSeq) return; // a newer keystroke superseded this search
+  if (!searchIndex) {
+    filterLoadedProducts(raw.toLowerCase());
+    return;
+  }
+
+  const visibleSlugs = new Set(Array.from(document.querySelectorAll('.category-section'))
+    .filter(sectionVisible).map(section => section.dataset.category));
+  const hits = searchIds(raw).map(docLocation).filter(loc => visibleSlugs.has(loc.slug));
+  const shown = hits.slice(0, MAX_SEARCH_RESULTS);
+  const pages = new Map();
+  shown.forEach(loc => pages.set(`${loc.slug}/${loc.page}`, loc));
+  await Promise.all(Array.from(pages.values()).map(loc => loadShard(loc.slug, loc.page)));
+  if (seq !== searchSeq) return;
+
+  document.querySelectorAll('.product.match').forEach(el => el.classList.remove('match'));
+  const matchedSlugs = new Set();
+  shown.forEach(loc => {
+    const el = document.querySelector(`.product[data-pid="${loc.slug}/${loc.n}"]`);
+    if (el) { el.classList.add('match'); matchedSlugs.add(loc.slug); }
+  });
+  document.querySelectorAll('.category-section').forEach(section => {
+    section.classList.toggle('no-match', !matchedSlugs.has(section.dataset.category));
+  });
+  container.classList.add('searching');
+  const more = hits.length > shown.length ? ` (${shown.length} affichés)` : '';
+  document.getElementById('resultsCount').textContent = `${hits.length} produit(s) trouvé(s)${more}`;
+}
+
 // Description toggle
 function toggleDescription(btn) {
   const container = btn.closest('.product-info');
@@ -165,6 +391,7 @@ function toggleDescription(btn) {
 
 // Update results count
 function updateResultsCount() {
+  if (isSearching()) return;
   const visibleProducts = document.querySelectorAll('.product:not([style*="display: none"]):not([style*="display:none"])').length;
   document.getElementById('resultsCount').textContent = `${visibleProducts} produit(s) affichés sur ${totalProducts} total`;
 }
@@ -173,9 +400,12 @@ function updateResultsCount() {
 document.addEventListener('DOMContentLoaded', function() {
   const categoryList = document.getElementById('categoryList');
 
-  // categories variable injected by generate_html.py (array of {slug,label})
+  // categories variable injected by generate_html.py (array of {slug,label,pages,loaded})
   if (typeof categories !== 'undefined' && Array.isArray(categories)) {
     categories.forEach(c => {
+      const done = {};
+      for (let i = 0; i < (c.loaded || 0); i++) done[i] = true;
+      shardState[c.slug] = { pages: c.pages || 0, done: done, pending: {} };
       const newCat = document.createElement('a');
       newCat.href = '#';
       newCat.className = 'category-item';
@@ -185,6 +415,14 @@ document.addEventListener('DOMContentLoaded', function() {
     });
   }
 
+  document.querySelectorAll('.shard-sentinel').forEach(el => {
+    if (shardObserver) {
+      shardObserver.observe(el);
+    } else {
+      loadAllShards(el.closest('.category-section').dataset.category);
+    }
+  });
+
   updateResultsCount();
 
   // wire search input
@@ -213,40 +451,338 @@ def read_json(path: Path):
 def ensure_dir(p: Path):
     p.mkdir(parents=True, exist_ok=True)
 
-def copy_image_to_site(src: Path, dst_dir: Path):
+def link_or_copy(src: Path, dst: Path, mode: str = "copy") -> str:
+    """Place src at dst as a hardlink / symlink / copy according to mode.
+    Returns how it was actually done ("hardlink", "symlink" or "copy")."""
+    if dst.is_symlink() or dst.exists():
+        dst.unlink()
+    if mode in ("hardlink", "link"):
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass  # other filesystem, unsupported, ...
+    if mode in ("symlink", "link"):
+        try:
+            os.symlink(os.path.abspath(src), dst)
+            return "symlink"
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+def copy_image_to_site(src: Path, dst_dir: Path, manifest_images=None, stats=None, mode: str = ASSET_MODE):
+    """Copy (or link, see ASSET_MODES) src into dst_dir; skipped when the
+    manifest says the same source (size + mtime) was already placed there the
+    same way and the output still exists."""
     try:
         ensure_dir(dst_dir)
         dst = dst_dir / src.name
-        shutil.copy2(src, dst)
+        st = src.stat()
+        key = str(src)
+        sig = {"size": st.st_size, "mtime": st.st_mtime_ns, "dst": str(dst), "mode": mode}
+        if manifest_images is not None and manifest_images.get(key) == sig and dst.exists():
+            if stats is not None:
+                stats["images_skipped"] += 1
+            return dst
+        how = link_or_copy(src, dst, mode)
+        if manifest_images is not None:
+            manifest_images[key] = sig
+        if stats is not None:
+            if how == "copy":
+                stats["images_copied"] += 1
+                stats["bytes_copied"] += st.st_size
+            else:
+                stats["images_linked"] += 1
+                stats["bytes_linked"] += st.st_size
         return dst
     except Exception:
         return None
 
-def safe_html(s):
-    return html.escape(str(s)) if s is not None else ""
+def category_name_for(jp: Path) -> str:
+    # category name: parent name, unless parent is root ignore then parent.parent
+    parent = jp.parent
+    category_name = parent.name
+    if category_name in ROOT_IGNORE and parent.parent:
+        category_name = parent.parent.name
+    if category_name in ROOT_IGNORE:
+        category_name = "autres"
+    return category_name
 
-def make_product_card(prod, image_rel_path):
-    # prod fields: asin, name, description, price, url, brand, subcategory
-    title = safe_html(prod.get("name") or prod.get("title") or prod.get("asin") or "Produit")
-    price = safe_html(prod.get("price") or "")
-    description = prod.get("description") or ""
-    short = safe_html(description[:160] + ("..." if len(description) > 160 else ""))
-    full = safe_html(description)
-    brand = safe_html(prod.get("brand") or "")
-    tags_html = ""
-    if brand:
-        tags_html = f'<div class="product-tags"><span class="tag">{brand}</span></div>'
-    # image_rel_path may be None (use placeholder)
-    if image_rel_path:
-        img_src = image_rel_path.replace("\\", "/")
-        img_html = f'<img src="{html.escape(img_src)}" alt="{title}">'
-    else:
-        img_html = '<div style="height:200px;display:flex;align-items:center;justify-content:center;color:#666">Pas d\'image</div>'
+def unwrap_products(prods):
+    """Return the product list of a decoded products.json, or None."""
+    if prods is None:
+        return None
+    if isinstance(prods, dict):
+        # may be wrapped
+        for key in ("products", "items", "results"):
+            if key in prods and isinstance(prods[key], list):
+                return prods[key]
+        # single product -> wrap
+        return [prods]
+    return prods if isinstance(prods, list) else None
 
-    url = safe_html(prod.get("url") or prod.get("product_url") or "")
+def files_fingerprint(paths, salt: str = "") -> str:
+    """Cheap fingerprint of a set of source files (path, size, mtime); salt
+    carries build options that change the output (e.g. asset mode)."""
+    h = hashlib.sha1(f"v{RENDER_VERSION}|{salt}".encode())
+    for p in sorted(str(x) for x in paths):
+        try:
+            st = os.stat(p)
+            h.update(f"{p}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+        except OSError:
+            h.update(f"{p}|missing\n".encode("utf-8"))
+    return h.hexdigest()
+
+def load_manifest(out_path: Path) -> dict:
+    data = read_json(out_path / MANIFEST_NAME)
+    if not isinstance(data, dict) or data.get("version") != RENDER_VERSION:
+        return {"version": RENDER_VERSION, "images": {}, "sections": {}, "thumbs": {}}
+    data.setdefault("images", {})
+    data.setdefault("sections", {})
+    data.setdefault("thumbs", {})
+    return data
+
+def save_manifest(out_path: Path, manifest: dict):
+    tmp = out_path / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, out_path / MANIFEST_NAME)
 
-    card = f'''
-    <div class="product">
+def resolve_image_ref(p, out_path: Path, cat_img_dir: Path, manifest_images=None, stats=None, asset_mode: str = ASSET_MODE):
+    """Copy the product's local image into the site (if found) and return the
+    path to use in the page, else the external image url, else None."""
+    img_local = p.get("image_local") or p.get("image_path") or p.get("image")  # support several keys
+    chosen_rel = None
+    if img_local:
+        # convert backslashes and try to find the file relative to project root or as given
+        img_path = Path(str(img_local).replace("\\", os.sep))
+        if not img_path.exists():
+            # maybe it's relative to source dir
+            src_dir = Path(p.get("_source_dir", ""))
+            candidate = src_dir / Path(str(img_local).replace("\\", "/")).name
+            if candidate.exists():
+                img_path = candidate
+        if img_path.exists():
+            p["_image_src"] = str(img_path)
+            copied = copy_image_to_site(img_path, cat_img_dir, manifest_images, stats, asset_mode)
+            if copied:
+                chosen_rel = os.path.relpath(copied, start=out_path).replace("\\", "/")
+    # fallback to image_url (external)
+    if not chosen_rel:
+        img_url = p.get("image_url") or p.get("image")
+        if img_url and isinstance(img_url, str) and img_url.startswith("http"):
+            chosen_rel = img_url
+    return chosen_rel
+
+def write_section(out, slug, label, count, pages, page_cards=None):
+    """Stream a category section: one (display: contents) placeholder per
+    shard page, filled later by registerShard(), or inline in single-page
+    mode where page_cards(i) returns the cards html of page i."""
+    out.write(f'<section class="category-section" data-category="{slug}">'
+              f'<div class="category-title">{html.escape(label)} ({count})</div>'
+              '<div class="grid">')
+    for i in range(pages):
+        out.write(f'<div class="shard-page" data-page="{i}">')
+        if page_cards is not None:
+            out.write(page_cards(i))
+        out.write('</div>')
+    out.write('</div><div class="shard-sentinel"></div></section>\n')
+
+def fold_text(s) -> str:
+    """Lowercase and strip accents (é -> e) for search tokens."""
+    s = unicodedata.normalize("NFKD", str(s))
+    return "".join(c for c in s if not unicodedata.combining(c)).lower()
+
+def search_tokens(s) -> set:
+    return {t for t in _TOKEN_SPLIT.split(fold_text(s)) if len(t) >= 2 and t not in SEARCH_STOPWORDS}
+
+def product_search_tokens(prod) -> set:
+    tokens = set()
+    for key in ("name", "title", "brand", "description", "asin"):
+        if prod.get(key):
+            tokens |= search_tokens(prod[key])
+    return tokens
+
+def build_dir(out_path: Path) -> Path:
+    """Private build directory of a site: site/ -> .site.build/ beside it."""
+    return out_path.parent / f".{out_path.name}.build"
+
+def postings_path(out_path: Path, slug) -> Path:
+    """Search postings of a category (see ShardWriter). Postings left in
+    shards/<slug>/search.jsonl by older builds are moved here."""
+    path = build_dir(out_path) / POSTINGS_DIR / f"{slug}.jsonl"
+    legacy = out_path / SHARDS_DIR / slug / "search.jsonl"
+    if legacy.exists():
+        ensure_dir(path.parent)
+        if path.exists():
+            legacy.unlink()
+        else:
+            os.replace(legacy, path)
+    return path
+
+class ShardWriter:
+    """Stream a category's cards into shards/<slug>/<n>.js (PAGE_SIZE cards
+    each) as products arrive, and its search postings into
+    postings_path(): a {"count": n} header line then one
+    ["token", [positions]] line per token, sorted by token, so that
+    build_search_index can merge categories without loading them all.
+    Cards are written one by one (a JSON string escapes char by char, so
+    escaping each card and concatenating is equivalent)."""
+
+    def __init__(self, out_path: Path, slug):
+        self.slug = slug
+        self.shard_dir = out_path / SHARDS_DIR / slug
+        if self.shard_dir.exists():
+            shutil.rmtree(self.shard_dir, ignore_errors=True)
+        ensure_dir(self.shard_dir)
+        self.postings = postings_path(out_path, slug)
+        ensure_dir(self.postings.parent)
+        self.pages = 0
+        self.count = 0
+        self.terms = {}  # token -> [position of the product in the category]
+        self._out = None
+
+    def add(self, p):
+        if self.count % PAGE_SIZE == 0:
+            self._close_page()
+            self._out = open(self.shard_dir / f"{self.pages}.js", "w", encoding="utf-8", buffering=WRITE_BUFFER)
+            self._out.write(f'registerShard({json.dumps(self.slug)}, {self.pages}, "')
+            self.pages += 1
+        n = self.count
+        card = make_product_card(p, p.get("_image_ref"), pid=f"{self.slug}/{n}")
+        self._out.write(json.dumps(card, ensure_ascii=False)[1:-1])
+        for tok in product_search_tokens(p):
+            self.terms.setdefault(tok, []).append(n)
+        self.count += 1
+
+    def _close_page(self):
+        if self._out is not None:
+            self._out.write('");\n')
+            self._out.close()
+            self._out = None
+
+    def close(self) -> int:
+        """Finish the last shard and write the postings; returns the number of shards."""
+        self._close_page()
+        with open(self.postings, "w", encoding="utf-8", buffering=WRITE_BUFFER) as out:
+            out.write(json.dumps({"count": self.count}) + "\n")
+            for tok in sorted(self.terms):
+                out.write(json.dumps([tok, self.terms[tok]], ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.terms = {}
+        return self.pages
+
+def write_category_shards(out_path: Path, slug, products) -> int:
+    """Render products into shards (see ShardWriter); returns the number of shards written."""
+    writer = ShardWriter(out_path, slug)
+    for p in products:
+        writer.add(p)
+    return writer.close()
+
+def _iter_postings(path: Path, offset: int):
+    """(token, global positions) lines of a category's postings file, in token order."""
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except OSError:
+        return
+    with f:
+        f.readline()  # header
+        for line in f:
+            try:
+                tok, positions = json.loads(line)
+            except ValueError:
+                continue
+            yield tok, [offset + n for n in positions]
+
+def _merge_postings(sources):
+    """k-way merge of (postings path, offset) sources: yields (token,
+    positions) once per token. heapq.merge keeps equal tokens in source order,
+    so positions stay ascending."""
+    streams = [_iter_postings(path, offset) for path, offset in sources]
+    current, positions = None, []
+    for tok, pos in heapq.merge(*streams, key=lambda item: item[0]):
+        if tok != current:
+            if current is not None:
+                yield current, positions
+            current, positions = tok, []
+        positions.extend(pos)
+    if current is not None:
+        yield current, positions
+
+def _postings_sources(out_path: Path, cats, tmp_dir: Path):
+    """Per-category postings files, pre-merged into temporary files while
+    there are more than SEARCH_MERGE_FANIN of them (bounded open files)."""
+    sources = [(postings_path(out_path, c["slug"]), c["offset"]) for c in cats]
+    level = 0
+    while len(sources) > SEARCH_MERGE_FANIN:
+        ensure_dir(tmp_dir)
+        merged = []
+        for i in range(0, len(sources), SEARCH_MERGE_FANIN):
+            path = tmp_dir / f"{level}_{i}.jsonl"
+            with open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER) as out:
+                out.write("{}\n")
+                for tok, positions in _merge_postings(sources[i:i + SEARCH_MERGE_FANIN]):
+                    out.write(json.dumps([tok, positions], ensure_ascii=False, separators=(",", ":")) + "\n")
+            merged.append((path, 0))
+        sources = merged
+        level += 1
+    return sources
+
+def build_search_index(out_path: Path, ordered_slugs) -> int:
+    """Merge the per-category postings into assets/search-index.js.
+
+    Product ids are global integers: category offset + position in the
+    category (page = position // PAGE_SIZE). Terms are sorted so the page can
+    binary-search them for prefix matches. The file is streamed in two merge
+    passes (terms, then postings). Returns the number of terms."""
+    cats = []
+    offset = 0
+    for slug in ordered_slugs:
+        count = 0
+        try:
+            with open(postings_path(out_path, slug), "r", encoding="utf-8") as f:
+                count = int(json.loads(f.readline() or "{}").get("count", 0))
+        except (OSError, ValueError):
+            pass
+        cats.append({"slug": slug, "offset": offset, "count": count})
+        offset += count
+    target = out_path / SEARCH_INDEX_FILE
+    ensure_dir(target.parent)
+    tmp = target.with_name(target.name + ".tmp")
+    merge_dir = build_dir(out_path) / "search_merge"
+    sources = _postings_sources(out_path, cats, merge_dir)
+    dumps = lambda v: json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+    n_terms = 0
+    with open(tmp, "w", encoding="utf-8", buffering=WRITE_BUFFER) as out:
+        out.write('registerSearchIndex({"pageSize":%d,"cats":%s,"stop":%s,"terms":['
+                  % (PAGE_SIZE, dumps(cats), dumps(sorted(SEARCH_STOPWORDS))))
+        for tok, _ in _merge_postings(sources):
+            out.write(("," if n_terms else "") + dumps(tok))
+            n_terms += 1
+        out.write('],"postings":[')
+        for i, (_, positions) in enumerate(_merge_postings(sources)):
+            out.write(("," if i else "") + dumps(positions))
+        out.write("]});\n")
+    os.replace(tmp, target)
+    shutil.rmtree(merge_dir, ignore_errors=True)
+    return n_terms
+
+def render_category_job(job):
+    """Worker entry point (must stay top-level to be picklable):
+    job = (output dir, slug, products) -> number of shards written."""
+    out_dir, slug, products = job
+    return write_category_shards(Path(out_dir), slug, products)
+
+def read_shard_cards(out_path: Path, slug, page) -> str:
+    """Cards html stored in a shard file (used by the single-page mode)."""
+    text = (out_path / SHARDS_DIR / slug / f"{page}.js").read_text(encoding="utf-8")
+    payload = text[text.index(",", text.index(",") + 1) + 1:text.rindex(")")]
+    return json.loads(payload)
+
+def safe_html(s):
+    return html.escape(str(s)) if s is not None else ""
+
+CARD_TEMPLATE = '''
+    <div class="product"{pid_attr}>
       {img_html}
       <div class="product-info">
         <div class="product-title">{title}</div>
@@ -255,7 +791,7 @@ def make_product_card(prod, image_rel_path):
           <div class="description-full">{full}</div>
         </div>
         <div class="product-price">{price}</div>
-        <div class="product-meta">ASIN: {safe_html(prod.get("asin") or "")}</div>
+        <div class="product-meta">ASIN: {asin}</div>
         {tags_html}
         <div class="product-actions">
           <a class="btn-primary" href="{url}" target="_blank" rel="noopener">Voir produit</a>
@@ -266,98 +802,331 @@ def make_product_card(prod, image_rel_path):
       </div>
     </div>
     '''
-    return card
 
-def generate_site(data_dir="data", output_dir="site"):
+def compile_template(template: str):
+    """Parse a str.format-style template once into (literal, field) pairs and
+    return a render(**values) function that only concatenates."""
+    parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+    def render(**values):
+        return "".join(literal + (values[field] if field is not None else "") for literal, field in parts)
+    return render
+
+render_card = compile_template(CARD_TEMPLATE)
+
+def make_product_card(prod, image_rel_path, pid=None):
+    # prod fields: asin, name, description, price, url, brand, subcategory
+    title = safe_html(prod.get("name") or prod.get("title") or prod.get("asin") or "Produit")
+    price = safe_html(prod.get("price") or "")
+    description = prod.get("description") or ""
+    short = safe_html(description[:160] + ("..." if len(description) > 160 else ""))
+    full = safe_html(description)
+    brand = safe_html(prod.get("brand") or "")
+    tags_html = ""
+    if brand:
+        tags_html = f'<div class="product-tags"><span class="tag">{brand}</span></div>'
+    # image_rel_path may be None (use placeholder)
+    thumbs = prod.get("_thumbs")
+    if thumbs and thumbs.get("jpeg"):
+        # resized derivatives: the browser picks the smallest that fits
+        sizes = "(max-width: 768px) 50vw, 280px"
+        webp = ", ".join(f"{html.escape(src)} {w}w" for src, w in thumbs.get("webp", []))
+        jpeg = ", ".join(f"{html.escape(src)} {w}w" for src, w in thumbs["jpeg"])
+        source = f'<source type="image/webp" srcset="{webp}" sizes="{sizes}">' if webp else ""
+        img_html = (f'<picture>{source}<img src="{html.escape(thumbs["jpeg"][0][0])}" srcset="{jpeg}" sizes="{sizes}" '
+                    f'alt="{title}" loading="lazy" decoding="async"></picture>')
+    elif image_rel_path:
+        img_src = image_rel_path.replace("\\", "/")
+        img_html = f'<img src="{html.escape(img_src)}" alt="{title}" loading="lazy" decoding="async">'
+    else:
+        img_html = '<div style="height:200px;display:flex;align-items:center;justify-content:center;color:#666">Pas d\'image</div>'
+
+    url = safe_html(prod.get("url") or prod.get("product_url") or "")
+    pid_attr = f' data-pid="{safe_html(pid)}"' if pid else ""
+
+    return render_card(pid_attr=pid_attr, img_html=img_html, title=title, short=short, full=full,
+                       price=price, asin=safe_html(prod.get("asin") or ""), tags_html=tags_html, url=url)
+
+def remove_stale_categories(out_path: Path, slugs, manifest_images=None) -> int:
+    """Delete the shards and copied images of categories that left data/,
+    and their entries in the image manifest. Returns how many were removed."""
+    removed = 0
+    for slug in slugs:
+        if not slug:
+            continue
+        img_dir = out_path / "assets" / "images" / slug
+        for d in (out_path / SHARDS_DIR / slug, img_dir):
+            shutil.rmtree(d, ignore_errors=True)
+        try:
+            postings_path(out_path, slug).unlink()
+        except OSError:
+            pass
+        if manifest_images:
+            prefix = str(img_dir) + os.sep
+            for key in [k for k, sig in manifest_images.items() if str(sig.get("dst", "")).startswith(prefix)]:
+                del manifest_images[key]
+        removed += 1
+    return removed
+
+def render_category_streaming(out_path: Path, slug, files, assets_images_dir: Path, manifest, stats,
+                              asset_mode=ASSET_MODE, thumbs=True):
+    """Bounded-memory variant of the load / resolve images / render steps for
+    one category (utils.streaming): products are read one by one from each
+    products.json and handled in chunks whose size follows the memory budget;
+    each decoded record is annotated, rendered and dropped, nothing is kept
+    for the whole category. Returns (product count, shards written)."""
+    cat_img_dir = assets_images_dir / slug
+    ensure_dir(cat_img_dir)
+    thumbs_dir = out_path / "assets" / "thumbs"
+    rel = lambda path: os.path.relpath(path, start=out_path).replace("\\", "/")
+    budget = streaming.MemoryBudget()
+    writer = ShardWriter(out_path, slug)
+    for jp_str in files:
+        source_dir = str(Path(jp_str).parent)
+        records = (r for r in streaming.iter_json_array(jp_str) if isinstance(r, dict))
+        while True:
+            chunk = list(itertools.islice(records, budget.check()))
+            if not chunk:
+                break
+            for p in chunk:
+                p["_source_dir"] = source_dir
+                p["_image_ref"] = resolve_image_ref(p, out_path, cat_img_dir, manifest["images"], stats, asset_mode)
+            if thumbs:
+                derived = thumbnails.build_derivatives([p["_image_src"] for p in chunk if p.get("_image_src")],
+                                                       str(thumbs_dir), manifest["thumbs"])
+                for p in chunk:
+                    d = derived.get(p.get("_image_src"))
+                    if d:
+                        p["_thumbs"] = {fmt: [(rel(path), w) for path, w in items] for fmt, items in d.items()}
+                stats["thumbnails"] += len(derived)
+            for p in chunk:
+                writer.add(p)
+    return writer.count, writer.close()
+
+def generate_site(data_dir="data", output_dir="site", force=False, sharded=True, asset_mode=ASSET_MODE, workers=1,
+                  thumbs=True, precompress=True, external_assets=False):
+    """Build the static site.
+
+    index.html is a small shell; each category's cards are written as
+    PAGE_SIZE-card shards (shards/<slug>/<n>.js) loaded on demand by the page.
+    sharded=False inlines every card into index.html (old single-page output).
+    Incremental: images whose source (size, mtime) is unchanged are not
+    recopied and categories whose products.json files are unchanged keep their
+    shards. force=True rebuilds all. asset_mode picks how images are placed
+    (see ASSET_MODES). workers > 1 renders changed categories in parallel
+    processes. Output files are streamed, never assembled in memory.
+    thumbs=True (and Pillow installed) adds resized WebP/JPEG derivatives
+    under assets/thumbs, cached by source hash, used by the cards' srcset.
+    precompress=True writes .gz twins of the html/js/css outputs;
+    external_assets=True moves the CSS/JS to fingerprinted assets/site.<hash>.*
+    files that a static host can serve with a long cache lifetime.
+    With utils.streaming enabled, changed categories are rendered one product
+    at a time under the configured memory ceiling (workers is then unused).
+    Returns a small build report dict."""
+    with METRICS.timer("site_build_seconds"):
+        return _generate_site(data_dir, output_dir, force, sharded, asset_mode, workers,
+                              thumbs, precompress, external_assets)
+
+def _generate_site(data_dir, output_dir, force, sharded, asset_mode, workers, thumbs, precompress, external_assets):
+    if asset_mode not in ASSET_MODES:
+        raise ValueError(f"asset_mode inconnu: {asset_mode} (attendu: {', '.join(ASSET_MODES)})")
+    thumbs = thumbs and thumbnails.available()
     data_path = Path(data_dir)
     out_path = Path(output_dir)
     if not data_path.exists():
         print(f"[generate_html] Dossier data introuvable: {data_dir}")
         return
 
-    # find all products.json
-    all_jsons = list(data_path.rglob("products.json"))
-    categories = {}  # slug -> {label, products: [] , images_dir}
-    for jp in all_jsons:
-        # determine category name: parent name, unless parent is root ignore then parent.parent
-        parent = jp.parent
-        category_name = parent.name
-        if category_name in ROOT_IGNORE and parent.parent:
-            category_name = parent.parent.name
-        if category_name in ROOT_IGNORE:
-            category_name = "autres"
+    # find all products.json and group them per category without loading them
+    all_jsons = discover_product_files(str(data_path))
+    groups = {}  # slug -> {label, files: []}
+    for jp_str in all_jsons:
+        category_name = category_name_for(Path(jp_str))
         slug = slugify(category_name)
-        prods = read_json(jp)
-        if prods is None:
-            continue
-        if isinstance(prods, dict):
-            # may be wrapped
-            for key in ("products", "items", "results"):
-                if key in prods and isinstance(prods[key], list):
-                    prods = prods[key]
-                    break
-            else:
-                # single product -> wrap
-                prods = [prods]
-        # ensure list
-        if not isinstance(prods, list):
-            continue
-        categories.setdefault(slug, {"label": category_name, "products": [], "src_paths": []})
-        # record products with reference to jp.parent for image resolution
-        for p in prods:
-            p["_source_dir"] = str(jp.parent)
-            categories[slug]["products"].append(p)
+        groups.setdefault(slug, {"label": category_name, "files": []})["files"].append(jp_str)
 
-    if not categories:
+    if not groups:
         print("[generate_html] Aucun products.json trouvé.")
         return
 
+    ensure_dir(out_path)
+    previous = load_manifest(out_path)
+    built_before = set(previous["sections"])
+    manifest = {"version": RENDER_VERSION, "images": {}, "sections": {}, "thumbs": {}} if force else previous
+    old_sections = manifest["sections"]
+    manifest["sections"] = {}
+    stats = {"categories_rendered": 0, "categories_reused": 0, "categories_removed": 0, "images_copied": 0,
+             "images_linked": 0, "images_skipped": 0, "bytes_copied": 0, "bytes_linked": 0, "thumbnails": 0}
+
     # prepare output dirs
     assets_images_dir = out_path / "assets" / "images"
     ensure_dir(assets_images_dir)
+    ensure_dir(out_path / SHARDS_DIR)
+
+    # decide which categories changed; only those are loaded and rendered
+    sections = {}  # slug -> {label, count, pages, hash}
+    changed = {}
+    for slug, meta in groups.items():
+        fp = files_fingerprint(meta["files"], f"{asset_mode}|thumbs={thumbs}")
+        prev = old_sections.get(slug)
+        shard_dir = out_path / SHARDS_DIR / slug
+        # the postings (private build dir, may have been wiped) are needed to rebuild the search index
+        if (prev and prev.get("hash") == fp and postings_path(out_path, slug).exists()
+                and all((shard_dir / f"{i}.js").exists() for i in range(prev.get("pages", 0)))):
+            sections[slug] = {"label": meta["label"], "count": prev.get("count", 0), "pages": prev.get("pages", 0), "hash": fp}
+            stats["categories_reused"] += 1
+        else:
+            changed[slug] = fp
+            sections[slug] = {"label": meta["label"], "count": 0, "pages": 0, "hash": fp}
+    # categories of the previous build that no longer exist (even with force=True)
+    stats["categories_removed"] = remove_stale_categories(out_path, built_before - set(sections), manifest["images"])
+
+    if streaming.enabled():
+        for slug in changed:
+            count, pages = render_category_streaming(out_path, slug, groups[slug]["files"], assets_images_dir,
+                                                     manifest, stats, asset_mode, thumbs)
+            sections[slug]["count"] = count
+            sections[slug]["pages"] = pages
+            stats["categories_rendered"] += 1
+        changed = {}
 
-    # copy images and prepare per-product image paths
-    total_products = 0
-    for slug, meta in categories.items():
+    changed_files = [f for slug in changed for f in groups[slug]["files"]]
+    categories = {slug: [] for slug in changed}
+    for jp_str, prods in iter_catalog(str(data_path), files=changed_files):
+        prods = unwrap_products(prods)
+        if prods is None:
+            continue
+        slug = slugify(category_name_for(Path(jp_str)))
+        # record products with reference to jp.parent for image resolution
+        for p in prods:
+            p["_source_dir"] = str(Path(jp_str).parent)
+            categories[slug].append(p)
+
+    # copy images (here: the manifest is updated in place), then render
+    # changed categories, in worker processes if asked
+    jobs = []
+    for slug, products in categories.items():
         cat_img_dir = assets_images_dir / slug
         ensure_dir(cat_img_dir)
-        for p in meta["products"]:
-            total_products += 1
-            img_local = p.get("image_local") or p.get("image_path") or p.get("image")  # support several keys
-            chosen_rel = None
-            if img_local:
-                # convert backslashes and try to find the file relative to project root or as given
-                img_path = Path(str(img_local).replace("\\", os.sep))
-                if not img_path.exists():
-                    # maybe it's relative to source dir
-                    src_dir = Path(p.get("_source_dir", ""))
-                    candidate = src_dir / Path(str(img_local).replace("\\", "/")).name
-                    if candidate.exists():
-                        img_path = candidate
-                if img_path.exists():
-                    copied = copy_image_to_site(img_path, cat_img_dir)
-                    if copied:
-                        chosen_rel = os.path.relpath(copied, start=out_path).replace("\\", "/")
-            # fallback to image_url (external)
-            if not chosen_rel:
-                img_url = p.get("image_url") or p.get("image")
-                if img_url and isinstance(img_url, str) and img_url.startswith("http"):
-                    chosen_rel = img_url
-            p["_image_ref"] = chosen_rel
-
-    # build HTML
-    ensure_dir(out_path)
-    index_html = []
-    index_html.append("<!doctype html>")
-    index_html.append("<html lang='fr'><head><meta charset='utf-8'><meta name='viewport' content='width=device-width,initial-scale=1'>")
-    index_html.append("<title>Catalogue scrappé</title>")
-    index_html.append("<style>")
-    index_html.append(PAGE_CSS)
-    index_html.append("</style>")
-    index_html.append("</head><body>")
-
-    # header + sidebar skeleton
-    header = f"""
+        for p in products:
+            p["_image_ref"] = resolve_image_ref(p, out_path, cat_img_dir, manifest["images"], stats, asset_mode)
+        sections[slug]["count"] = len(products)
+        jobs.append((str(out_path), slug, products))
+    if thumbs and jobs:
+        thumbs_dir = out_path / "assets" / "thumbs"
+        sources = [p["_image_src"] for _, _, products in jobs for p in products if p.get("_image_src")]
+        derived = thumbnails.build_derivatives(sources, str(thumbs_dir), manifest["thumbs"])
+        rel = lambda path: os.path.relpath(path, start=out_path).replace("\\", "/")
+        for _, _, products in jobs:
+            for p in products:
+                d = derived.get(p.get("_image_src"))
+                if d:
+                    p["_thumbs"] = {fmt: [(rel(path), w) for path, w in items] for fmt, items in d.items()}
+        stats["thumbnails"] = len(derived)
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pages_list = list(pool.map(render_category_job, jobs))
+    else:
+        pages_list = [render_category_job(job) for job in jobs]
+    for (_, slug, _), pages in zip(jobs, pages_list):
+        sections[slug]["pages"] = pages
+        stats["categories_rendered"] += 1
+
+    manifest["sections"] = sections
+    total_products = sum(meta["count"] for meta in sections.values())
+
+    ordered = sorted(sections, key=lambda slug: sections[slug]["label"].lower())
+    write_index(out_path, sections, ordered, total_products, sharded, external_assets)
+    stats["search_terms"] = build_search_index(out_path, ordered)
+    if precompress:
+        stats["gzipped"] = precompress_outputs(out_path)
+    save_manifest(out_path, manifest)
+    print(f"[generate_html] Site généré: {out_path.resolve() / 'index.html'} (images copiées dans {assets_images_dir})")
+    print(f"[generate_html] {stats['categories_rendered']} catégorie(s) régénérée(s), {stats['categories_reused']} réutilisée(s), "
+          f"{stats['categories_removed']} supprimée(s); "
+          f"images copiées: {stats['images_copied']} ({stats['bytes_copied']} octets), "
+          f"liées: {stats['images_linked']} ({stats['bytes_linked']} octets), inchangées: {stats['images_skipped']}")
+    return stats
+
+def write_fingerprinted_asset(out_path: Path, stem: str, ext: str, content: str) -> str:
+    """Write assets/<stem>.<hash>.<ext> (content-addressed, cacheable forever),
+    remove older versions, and return its path relative to out_path."""
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:10]
+    assets = out_path / "assets"
+    ensure_dir(assets)
+    name = f"{stem}.{digest}{ext}"
+    target = assets / name
+    if not target.exists():
+        target.write_text(content, encoding="utf-8")
+    for old in assets.glob(f"{stem}.*{ext}*"):
+        if old.name not in (name, name + ".gz"):
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    return f"assets/{name}"
+
+def gzip_file(path: Path) -> bool:
+    """Write path.gz next to path unless an up-to-date one exists.
+    mtime=0 in the header keeps the output reproducible."""
+    gz = path.with_name(path.name + ".gz")
+    try:
+        st = path.stat()
+        if st.st_size < GZIP_MIN_SIZE:
+            return False
+        if gz.exists() and gz.stat().st_mtime_ns >= st.st_mtime_ns:
+            return False
+        tmp = gz.with_name(gz.name + ".tmp")
+        with open(path, "rb") as src, open(tmp, "wb") as raw:
+            with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=9, mtime=0) as out:
+                shutil.copyfileobj(src, out, WRITE_BUFFER)
+        os.replace(tmp, gz)
+        return True
+    except OSError:
+        return False
+
+def precompress_outputs(out_path: Path) -> int:
+    """gzip index.html, assets and shards (only new or changed files).
+    Dot files (build manifest) are not published and are skipped."""
+    count = 0
+    for base in (out_path, out_path / "assets", out_path / SHARDS_DIR):
+        if not base.exists():
+            continue
+        files = base.rglob("*") if base != out_path else base.glob("*")
+        for f in files:
+            if f.suffix in GZIP_SUFFIXES and not f.name.startswith(".") and f.is_file() and not f.is_symlink():
+                count += gzip_file(f)
+    return count
+
+def write_index(out_path: Path, sections, ordered, total_products, sharded=True, external_assets=False):
+    """Stream index.html (tmp file + replace) section by section.
+    external_assets=True links PAGE_CSS / PAGE_JS_TEMPLATE as fingerprinted
+    files instead of inlining them."""
+    target = out_path / "index.html"
+    tmp = out_path / "index.html.tmp"
+    css_href = js_src = None
+    if external_assets:
+        css_href = write_fingerprinted_asset(out_path, "site", ".css", PAGE_CSS)
+        js_src = write_fingerprinted_asset(out_path, "site", ".js", PAGE_JS_TEMPLATE)
+    else:
+        for old in (out_path / "assets").glob("site.*"):
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    with open(tmp, "w", encoding="utf-8", buffering=WRITE_BUFFER) as out:
+        out.write("<!doctype html>\n")
+        out.write("<html lang='fr'><head><meta charset='utf-8'><meta name='viewport' content='width=device-width,initial-scale=1'>\n")
+        out.write("<title>Catalogue scrappé</title>\n")
+        if css_href:
+            out.write(f'<link rel="stylesheet" href="{css_href}">\n')
+        else:
+            out.write("<style>\n")
+            out.write(PAGE_CSS)
+            out.write("\n</style>\n")
+        out.write("</head><body>\n")
+
+        # header + sidebar skeleton
+        out.write("""
     <div class="header">
       <div class="header-content">
         <button class="menu-toggle" onclick="toggleSidebar()">☰</button>
@@ -368,53 +1137,45 @@ def generate_site(data_dir="data", output_dir="site"):
         </div>
       </div>
     </div>
-    """
-    index_html.append(header)
-
-    sidebar = """
     <div id="sidebar" class="sidebar">
       <div class="sidebar-header">Catégories <button class="sidebar-close" onclick="closeSidebar()">✕</button></div>
       <div class="category-list" id="categoryList"></div>
     </div>
     <div class="overlay" onclick="closeSidebar()"></div>
-    """
-    index_html.append(sidebar)
-
-    # main container: results info + categories sections
-    index_html.append('<div class="container">')
-    index_html.append('<div class="results-info"><div id="resultsCount" class="results-count"></div><div><button class="filter-toggle" onclick="toggleSidebar()">Filtrer</button></div></div>')
-
-    # for each category, create a section
-    for slug, meta in sorted(categories.items(), key=lambda kv: kv[1]["label"].lower()):
-        label = meta["label"]
-        products = meta["products"]
-        index_html.append(f'<section class="category-section" data-category="{slug}">')
-        index_html.append(f'<div class="category-title">{html.escape(label)} ({len(products)})</div>')
-        index_html.append('<div class="grid">')
-        for p in products:
-            card = make_product_card(p, p.get("_image_ref"))
-            index_html.append(card)
-        index_html.append('</div>')  # grid
-        index_html.append('</section>')
+""")
 
-    index_html.append('</div>')  # container
+        # main container: results info + categories sections
+        out.write('<div class="container">\n')
+        out.write('<div class="results-info"><div id="resultsCount" class="results-count"></div><div><button class="filter-toggle" onclick="toggleSidebar()">Filtrer</button></div></div>\n')
 
-    # inject categories array and totalProducts into JS
-    categories_js_array = []
-    for slug, meta in categories.items():
-        label = f"{meta['label']} ({len(meta['products'])})"
-        categories_js_array.append({"slug": slug, "label": label})
+        # for each category, a section shell (cards come from the shards)
+        for slug in ordered:
+            meta = sections[slug]
+            page_cards = None
+            if not sharded:
+                page_cards = lambda i, slug=slug: read_shard_cards(out_path, slug, i)
+            write_section(out, slug, meta["label"], meta["count"], meta["pages"], page_cards)
 
-    index_html.append("<script>")
-    index_html.append("const categories = " + json.dumps(categories_js_array, ensure_ascii=False) + ";")
-    index_html.append("const totalProducts = " + str(total_products) + ";")
-    index_html.append(PAGE_JS_TEMPLATE)
-    index_html.append("</script>")
+        out.write('</div>\n')  # container
 
-    index_html.append("</body></html>")
+        # inject categories array and totalProducts into JS
+        categories_js_array = []
+        for slug, meta in sections.items():
+            label = f"{meta['label']} ({meta['count']})"
+            categories_js_array.append({"slug": slug, "label": label, "pages": meta["pages"],
+                                        "loaded": 0 if sharded else meta["pages"]})
 
-    (out_path / "index.html").write_text("\n".join(index_html), encoding="utf-8")
-    print(f"[generate_html] Site généré: {out_path.resolve() / 'index.html'} (images copiées dans {assets_images_dir})")
+        out.write("<script>\n")
+        out.write("const categories = " + json.dumps(categories_js_array, ensure_ascii=False) + ";\n")
+        out.write("const totalProducts = " + str(total_products) + ";\n")
+        if js_src:
+            out.write("</script>\n")
+            out.write(f'<script src="{js_src}"></script>\n')
+        else:
+            out.write(PAGE_JS_TEMPLATE)
+            out.write("\n</script>\n")
+        out.write("</body></html>")
+    os.replace(tmp, target)
 
 # allow usage as script
 if __name__ == "__main__":
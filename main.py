@@ -1,8 +1,17 @@
 import os
-import generate_html
+import sys
+import json
+import time
+import argparse
+import contextlib
 from view.view import show_menu, show_message
 from view.report import save_last_scrape, interactive_report_menu
-from controller.scraper import scrape_default, scrape_category, scrape_all_categories
+from controller import scraper  # façade paresseuse : Selenium/bs4 chargés au premier scrape
+from utils.metrics import METRICS, export_metrics
+from utils import normalize, streaming, trace
+
+# generate_html (Pillow, multiprocessing) n'est importé qu'au moment de générer le site,
+# pour que "main.py report" démarre vite (cf. python -m utils.import_budget)
 
 
 MAX_PRODUCTS = 5
@@ -17,7 +26,11 @@ CATEGORY_URLS = {
     "mode": "https://www.amazon.fr/b?node=11961521031",
     "maison": "https://www.amazon.fr/s?k=Maison",
     "jeux": "https://www.amazon.fr/s?k=jeux",
-    "sport": "https://www.amazon.fr/s?k=sport"
+    "sport": "https://www.amazon.fr/s?k=sport",
+    # autres marketplaces (à ajouter explicitement via --categories ou all_categories)
+    "technologie_de": "https://www.amazon.de/b?node=562066",
+    "technologie_it": "https://www.amazon.it/b?node=412609031",
+    "technologie_es": "https://www.amazon.es/b?node=667049031",
 }
 
 ALL_CATEGORIES = ["technologie", "mode", "maison", "sport"]
@@ -25,29 +38,57 @@ ALL_CATEGORIES = ["technologie", "mode", "maison", "sport"]
 def build_categories_list(names, mapping):
     return [(n, mapping[n]) for n in names if n in mapping]
 
-def try_generate_site():
+def try_generate_site(**site_options):
     try:
-
-        generate_html.generate_site(data_dir="data", output_dir="site")
+        import generate_html
+        stats = generate_html.generate_site(data_dir="data", output_dir="site", **site_options)
         show_message("Site statique généré dans ./site")
+        return stats
     except Exception as e:
         show_message(f"Erreur génération site : {e}")
+        return {"error": str(e)}
+
+def try_normalize(kind):
+    try:
+        stats = normalize.normalize_run(kind)
+        show_message(f"Produits normalisés ({stats['rows']}) : {stats['path']}")
+        return stats
+    except Exception as e:
+        show_message(f"Erreur normalisation : {e}")
+        return {"error": str(e)}
+
+def finish_run(kind, results, build_site=True, site_options=None):
+    """Rapport, normalisation, site et export des métriques du run."""
+    out = {"report": save_last_scrape(kind, results)}
+    if normalize.enabled():
+        out["normalize"] = try_normalize(kind)
+    if build_site:
+        out["site"] = try_generate_site(**(site_options or {}))
+    try:
+        out["metrics"] = export_metrics(kind)
+    except Exception as e:
+        show_message(f"Erreur export métriques : {e}")
+    path = trace.stop()
+    if path:
+        out["trace"] = path
+    return out
 
 def run():
     while True:
         os.system("cls" if os.name == "nt" else "clear")
         choix = show_menu()
+        METRICS.reset()
+        if choix in ("1", "2", "3"):
+            trace.start(("default", "categories", "all_categories")[int(choix) - 1])
         if choix == "1":
-            results = scrape_default(DEFAULT_CATEGORY_URL, MAX_PRODUCTS, MAX_SUBCATS, MAX_PAGES, HEADLESS)
-            save_last_scrape("default", results)
-            try_generate_site()
+            results = scraper.scrape_default(DEFAULT_CATEGORY_URL, MAX_PRODUCTS, MAX_SUBCATS, MAX_PAGES, HEADLESS)
+            finish_run("default", results)
             show_message("Scraping terminé ! Rapport enregistré.")
         elif choix == "2":
             url = input("URL de la catégorie : ").strip()
             if url:
-                results = scrape_category(url, MAX_PRODUCTS, MAX_SUBCATS, MAX_PAGES, HEADLESS)
-                save_last_scrape("categories", results)
-                try_generate_site()
+                results = scraper.scrape_category(url, MAX_PRODUCTS, MAX_SUBCATS, MAX_PAGES, HEADLESS)
+                finish_run("categories", results)
                 show_message("Scraping terminé ! Rapport enregistré.")
             else:
                 show_message("URL vide")
@@ -56,9 +97,8 @@ def run():
             if not cats:
                 show_message("Aucune catégorie valide.")
             else:
-                results = scrape_all_categories(cats, MAX_PRODUCTS, MAX_SUBCATS, MAX_PAGES, HEADLESS)
-                save_last_scrape("all_categories", results)
-                try_generate_site()
+                results = scraper.scrape_all_categories(cats, MAX_PRODUCTS, MAX_SUBCATS, MAX_PAGES, HEADLESS)
+                finish_run("all_categories", results)
                 show_message("Scraping terminé ! Rapport enregistré.")
         elif choix == "4":
             interactive_report_menu()
@@ -69,5 +109,296 @@ def run():
             show_message("Choix invalide !")
         input("Appuyez sur Entrée pour continuer...")
 
+# --- mode non interactif (cron / batch) -------------------------------------
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_EMPTY = 3   # run terminé mais aucun produit nouveau
+
+def default_settings():
+    """Réglages par défaut = constantes du module (surchargées par --config puis par les flags)."""
+    return {
+        "max_products": MAX_PRODUCTS,
+        "max_subcats": MAX_SUBCATS,
+        "max_pages": MAX_PAGES,
+        "headless": HEADLESS,
+        "default_category_url": DEFAULT_CATEGORY_URL,
+        "category_urls": dict(CATEGORY_URLS),
+        "all_categories": list(ALL_CATEGORIES),
+        "build_site": True,
+        "processes": 0,        # >0 : "all" passe par la file de tâches avec N workers locaux
+        "queue_url": None,     # défaut : sqlite:///data/.task_queue.sqlite
+        "category_tree_ttl_hours": 168,  # cache data/.category_tree.json des sous-catégories
+        # re-scrape par fraîcheur (controller/freshness.py) : budget de fiches produit par run
+        "freshness": {"enabled": False, "budget": None, "min_age_hours": 12},
+        # budget par marketplace (controller/marketplace.py) :
+        # {"fr": {"concurrency": 1, "min_interval": 1.0}, "www.amazon.de": {...}}
+        "marketplaces": {},
+        # produits lus sur les cartes du listing, fiche produit seulement si la carte est incomplète
+        "listing": {"listing_only": False, "enrich_incomplete": True},
+        # onglets en vol par navigateur pour les fiches produit (controller/tabs.py)
+        "tabs": 1,
+        # trace JSONL par URL (view/reports/traces/), cf. utils/trace.py
+        "trace": True,
+        # prix numérique / devise, marque et vendeur canoniques (view/reports/products_normalized_<kind>.csv)
+        "normalize": True,
+        # échecs produit / image rejoués en fin de run et aux runs suivants (data/.dead_letter.json)
+        "dead_letter": {"enabled": True, "max_attempts": 5, "backoff": 30},
+        # mode mémoire bornée (scrape, rapport, site par paquets), cf. utils/streaming.py
+        "streaming": {"enabled": False, "memory_mb": None, "chunk": streaming.DEFAULT_CHUNK,
+                      "report_max_names": streaming.REPORT_MAX_NAMES},
+        "site": {"asset_mode": "copy", "workers": 1, "thumbs": True,
+                 "precompress": True, "external_assets": False},
+    }
+
+def load_config(path):
+    """Lit un fichier de config JSON (mêmes clés que default_settings)."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: un objet JSON est attendu")
+    return data
+
+def merge_settings(base, override):
+    out = dict(base)
+    for k, v in (override or {}).items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = merge_settings(out[k], v)
+        else:
+            out[k] = v
+    return out
+
+def build_arg_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", help="fichier de config JSON (limites, catégories, site)")
+    common.add_argument("--max-products", type=int)
+    common.add_argument("--max-subcats", type=int)
+    common.add_argument("--max-pages", type=int)
+    common.add_argument("--headless", dest="headless", action="store_true", default=None)
+    common.add_argument("--no-headless", dest="headless", action="store_false")
+    common.add_argument("--no-site", dest="build_site", action="store_false", default=None,
+                        help="ne pas regénérer le site après le scrape")
+    common.add_argument("--workers", type=int, help="processus de rendu du site")
+    common.add_argument("--stream", action="store_true", default=None,
+                        help="mode mémoire bornée pour les très gros catalogues")
+    common.add_argument("--memory-mb", type=float, help="plafond de RSS du mode --stream (Mo)")
+    common.add_argument("--refresh-categories", action="store_true",
+                        help="ignore le cache des sous-catégories et le réécrit")
+    common.add_argument("--fresh-budget", type=int,
+                        help="active l'ordonnanceur de fraîcheur avec ce budget de fiches produit")
+    common.add_argument("--listing-only", action="store_true", default=None,
+                        help="produits lus sur le listing (sans ouvrir chaque fiche produit)")
+    common.add_argument("--no-enrich", dest="enrich", action="store_false", default=None,
+                        help="avec --listing-only : ne jamais ouvrir la fiche, même si la carte est incomplète")
+    common.add_argument("--tabs", type=int,
+                        help="fiches produit chargées dans N onglets d'un même Chrome")
+    common.add_argument("--no-trace", dest="trace", action="store_false", default=None,
+                        help="n'écrit pas la trace par URL du run")
+    common.add_argument("--no-normalize", dest="normalize", action="store_false", default=None,
+                        help="ne normalise pas prix / marques / vendeurs en fin de run")
+    common.add_argument("--json", action="store_true", help="résumé JSON sur stdout (logs sur stderr)")
+    common.add_argument("--summary", help="écrit aussi le résumé JSON dans ce fichier")
+
+    parser = argparse.ArgumentParser(prog="main.py", description="Scraper Amazon (sans argument : menu interactif)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("default", parents=[common], help="scrape de la catégorie par défaut")
+    p.add_argument("--url", help="URL de catégorie (sinon default_category_url)")
+    p = sub.add_parser("category", parents=[common], help="scrape d'une catégorie")
+    p.add_argument("url")
+    p = sub.add_parser("all", parents=[common], help="scrape de toutes les catégories configurées")
+    p.add_argument("--categories", help="noms séparés par des virgules (sinon all_categories)")
+    p.add_argument("--processes", type=int, help="répartit le scrape sur N workers via la file de tâches")
+    p.add_argument("--queue", dest="queue_url", help="URL de la file (sqlite:///chemin, memory://)")
+    p = sub.add_parser("enqueue", parents=[common], help="enfile les catégories pour des workers")
+    p.add_argument("--categories", help="noms séparés par des virgules (sinon all_categories)")
+    p.add_argument("--queue", dest="queue_url")
+    p = sub.add_parser("worker", parents=[common], help="traite les tâches de la file")
+    p.add_argument("--queue", dest="queue_url")
+    p.add_argument("--processes", type=int, default=1)
+    p.add_argument("--batch", help="ne traiter que ce lot (et s'arrêter quand il est vide)")
+    p = sub.add_parser("collect", parents=[common], help="récupère un lot terminé : rapport + site")
+    p.add_argument("batch")
+    p.add_argument("--queue", dest="queue_url")
+    p = sub.add_parser("report", parents=[common], help="affiche / regénère les rapports")
+    p.add_argument("--kind", choices=["default", "categories", "all_categories"], default="default")
+    p.add_argument("--regenerate", action="store_true")
+    p = sub.add_parser("site", parents=[common], help="(re)génère le site statique")
+    p.add_argument("--force", action="store_true", help="ignore le cache incrémental")
+    p.add_argument("--asset-mode", help="copy, hardlink, symlink ou link (cf. generate_html.ASSET_MODES)")
+    p = sub.add_parser("trace", parents=[common], help="résume la trace d'un run (pages lentes, erreurs)")
+    p.add_argument("run", nargs="?", help="identifiant de run ou fichier .jsonl (défaut : la plus récente)")
+    p.add_argument("--top", type=int, default=10, help="nombre d'URLs lentes listées")
+    p = sub.add_parser("normalize", parents=[common], help="normalise prix, marques et vendeurs d'un type de run")
+    p.add_argument("--kind", choices=["default", "categories", "all_categories", "all"], default="default",
+                   help="dossier data/ à normaliser (all : tout data/)")
+    return parser
+
+def resolve_settings(args):
+    settings = default_settings()
+    if args.config:
+        settings = merge_settings(settings, load_config(args.config))
+    for key in ("max_products", "max_subcats", "max_pages", "headless", "build_site", "queue_url", "tabs", "trace",
+                "normalize"):
+        value = getattr(args, key, None)
+        if value is not None:
+            settings[key] = value
+    if args.workers is not None:
+        settings["site"]["workers"] = args.workers
+    if getattr(args, "asset_mode", None):
+        settings["site"]["asset_mode"] = args.asset_mode
+    if args.fresh_budget is not None:
+        settings["freshness"].update(enabled=True, budget=args.fresh_budget)
+    if args.listing_only:
+        settings["listing"]["listing_only"] = True
+    if args.enrich is not None:
+        settings["listing"]["enrich_incomplete"] = args.enrich
+    if args.stream:
+        settings["streaming"]["enabled"] = True
+    if args.memory_mb is not None:
+        settings["streaming"].update(enabled=True, memory_mb=args.memory_mb)
+    return settings
+
+def _selected_categories(args, settings):
+    names = args.categories.split(",") if args.categories else settings["all_categories"]
+    return build_categories_list([n.strip() for n in names], settings["category_urls"])
+
+def _summarize_results(results):
+    rows = [{"name": r[0], "url": r[1], "saved": int(r[2])} for r in results]
+    return rows, sum(r["saved"] for r in rows)
+
+def run_command(args, settings):
+    """Exécute une sous-commande ; retourne (exit_code, résumé dict)."""
+    limits = (settings["max_products"], settings["max_subcats"], settings["max_pages"], settings["headless"])
+    summary = {"command": args.command, "settings": settings}
+    METRICS.reset()
+    streaming.configure(**settings["streaming"])
+    from controller import category_cache, dead_letter, freshness, marketplace, tabs
+    freshness.configure(**settings["freshness"])
+    dead_letter.configure(**settings["dead_letter"])
+    marketplace.configure(settings["marketplaces"])
+    tabs.configure(settings["tabs"])
+    trace.configure(enabled=settings["trace"])
+    normalize.configure(enabled=settings["normalize"])
+    if args.command in ("default", "category", "all", "worker"):
+        summary["trace"] = trace.start(args.command)
+    category_cache.configure(ttl=float(settings["category_tree_ttl_hours"]) * 3600,
+                             refresh=bool(args.refresh_categories))
+    if args.command in ("default", "category", "all", "worker"):
+        from controller.ScraperController import scraper_default
+        scraper_default.configure(**settings["listing"])
+    if args.command in ("default", "category", "all", "collect"):
+        if args.command == "default":
+            kind = "default"
+            results = scraper.scrape_default(args.url or settings["default_category_url"], *limits)
+        elif args.command == "category":
+            kind = "categories"
+            results = scraper.scrape_category(args.url, *limits)
+        elif args.command == "collect":
+            kind = "all_categories"
+            summary["batch"] = args.batch
+            summary["tasks"] = scraper.batch_status(args.batch, settings["queue_url"])
+            results = scraper.collect_results(args.batch, settings["queue_url"])
+            scraper.retry_batch_dead_letters(args.batch, results, settings["queue_url"], settings["headless"])
+        else:
+            kind = "all_categories"
+            cats = _selected_categories(args, settings)
+            if not cats:
+                summary["error"] = "Aucune catégorie valide."
+                return EXIT_USAGE, summary
+            processes = args.processes if args.processes is not None else settings["processes"]
+            if processes and processes > 0:
+                results = scraper.scrape_all_categories_queued(cats, *limits, processes=processes,
+                                                               queue_url=settings["queue_url"])
+            else:
+                results = scraper.scrape_all_categories(cats, *limits)
+        summary.update(finish_run(kind, results, settings["build_site"], settings["site"]))
+        if freshness.enabled():
+            summary["freshness"] = freshness.get_tracker().summary()
+        if dead_letter.enabled():
+            summary["dead_letter"] = dead_letter.get_queue().summary()
+        rows, saved = _summarize_results(results)
+        summary["results"] = rows
+        summary["saved"] = saved
+        return (EXIT_OK if saved else EXIT_EMPTY), summary
+    if args.command == "enqueue":
+        cats = _selected_categories(args, settings)
+        if not cats:
+            summary["error"] = "Aucune catégorie valide."
+            return EXIT_USAGE, summary
+        summary["batch"] = scraper.enqueue_categories(cats, *limits[:3], queue_url=settings["queue_url"])
+        summary["categories"] = [name for name, _ in cats]
+        print(f"Lot {summary['batch']} : {len(cats)} catégorie(s) en file")
+        return EXIT_OK, summary
+    if args.command == "worker":
+        if args.processes > 1:
+            codes = scraper.run_workers(args.processes, settings["queue_url"], settings["headless"], args.batch)
+            summary["workers"] = codes
+            return (EXIT_OK if all(c == 0 for c in codes) else EXIT_ERROR), summary
+        summary["workers"] = [scraper.run_worker(settings["queue_url"], headless=settings["headless"],
+                                                 batch=args.batch)]
+        return EXIT_OK, summary
+    if args.command == "report":
+        from view.report import build_report, generate_text_reports, save_report_json, load_text_report
+        if args.regenerate:
+            rpt = build_report(); generate_text_reports(rpt); summary["json"] = save_report_json(rpt)
+        content = load_text_report(args.kind)
+        if content is None:
+            summary["error"] = "Rapport introuvable : lancez un scrape ou --regenerate."
+            print(summary["error"])
+            return EXIT_EMPTY, summary
+        summary["text"] = content
+        print(content)
+        return EXIT_OK, summary
+    if args.command == "trace":
+        path = trace.resolve(args.run)
+        if not path:
+            summary["error"] = "Trace introuvable."
+            print(summary["error"])
+            return EXIT_ERROR, summary
+        summary["trace"] = trace.summarize(path, top=args.top)
+        print(trace.format_summary(summary["trace"]))
+        return EXIT_OK, summary
+    if args.command == "normalize":
+        summary["normalize"] = try_normalize(args.kind)
+        return (EXIT_ERROR if "error" in summary["normalize"] else EXIT_OK), summary
+    if args.command == "site":
+        import generate_html
+        opts = dict(settings["site"], force=args.force)
+        stats = generate_html.generate_site(data_dir="data", output_dir="site", **opts)
+        summary["site"] = stats
+        return (EXIT_OK if stats else EXIT_ERROR), summary
+    return EXIT_USAGE, summary
+
+def main(argv=None):
+    """Point d'entrée : sans argument, menu interactif ; sinon sous-commande."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        run()
+        return EXIT_OK
+    args = build_arg_parser().parse_args(argv)
+    t0 = time.time()
+    # en mode --json, stdout est réservé au résumé : les logs vont sur stderr
+    log_target = sys.stderr if args.json else sys.stdout
+    try:
+        settings = resolve_settings(args)
+        with contextlib.redirect_stdout(log_target):
+            code, summary = run_command(args, settings)
+    except Exception as e:
+        code, summary = EXIT_ERROR, {"command": args.command, "error": f"{type(e).__name__}: {e}"}
+        print(f"Erreur : {summary['error']}", file=sys.stderr)
+    finally:
+        trace.stop()
+    summary["exit_code"] = code
+    summary["status"] = "ok" if code == EXIT_OK else ("empty" if code == EXIT_EMPTY else "error")
+    summary["duration_seconds"] = round(time.time() - t0, 3)
+    text = json.dumps(summary, ensure_ascii=False, indent=2, default=str)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text)
+    if args.json:
+        print(text)
+    return code
+
 if __name__ == "__main__":
-    run()
+    sys.exit(main())
@@ -11,6 +11,7 @@ class Product:
         self.brand = None
         self.seller = None
         self.color = None
+        self.rating = None
         self.image_url = None     
         self.image_local = None   
         self.scraped_at = datetime.utcnow().isoformat() + "Z"
@@ -26,6 +27,7 @@ class Product:
             "brand": self.brand,
             "seller": self.seller,
             "color": self.color,
+            "rating": self.rating,
             "image_url": self.image_url,
             "image_local": self.image_local,
             "scraped_at": self.scraped_at,
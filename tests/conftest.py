@@ -0,0 +1,9 @@
+# tests/conftest.py
+# Les modules du projet s'importent depuis la racine du dépôt (pas de paquet
+# installé) : on l'ajoute au chemin quel que soit le répertoire de lancement.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,105 @@
+# tests/test_antibot.py
+import pytest
+
+from controller import antibot
+from controller.antibot import CircuitBreaker, block_marker, breaker_for, is_block_page
+
+CAPTCHA_HTML = """<html><head><title dir="ltr">Robot Check</title></head><body>
+<form method="get" action="/errors/validateCaptcha" name="">
+<p>Saisissez les caractères que vous voyez ci-dessous</p>
+<input autocomplete="off" type="text" id="captchacharacters" name="captchacharacters">
+</form></body></html>"""
+
+NORMAL_HTML = """<html><head><title>Amazon.fr : souris sans fil</title></head><body>
+<div data-component-type="s-search-result" data-asin="B0TEST0001">
+<h2><span>Souris sans fil</span></h2><span class="a-price"><span class="a-offscreen">19,99 €</span></span>
+</div><a href="/gp/help/customer/display.html">Aide</a></body></html>"""
+
+
+class FakeClock:
+    """Horloge et sleep injectés : sleep avance l'horloge sans attendre."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _breaker(clock, **kw):
+    return CircuitBreaker("www.amazon.fr", threshold=3, pause=60, max_pause=200,
+                          sleep=clock.sleep, clock=clock, **kw)
+
+
+def test_block_marker_on_captcha_and_normal_page():
+    assert block_marker(CAPTCHA_HTML) == "/errors/validateCaptcha"
+    assert is_block_page(CAPTCHA_HTML)
+    assert is_block_page("<p>Enter the characters you see below</p>")
+    assert block_marker(NORMAL_HTML) is None
+    assert not is_block_page(NORMAL_HTML)
+    assert block_marker("") is None and block_marker(None) is None
+
+
+def test_breaker_opens_after_threshold_then_waits_out_the_pause(clock):
+    br = _breaker(clock)
+    assert br.record_block() is False
+    assert br.record_block() is False
+    assert br.record_block() is True            # ouvert
+    assert br.trips == 1 and br.open_until == clock.now + 60
+
+    clock.now += 20
+    br.before_request()                         # reste de la pause + ralentissement (3 blocages)
+    assert clock.sleeps == [pytest.approx(40 + 3 * antibot.SLOWDOWN_STEP)]
+    assert clock.now >= br.open_until
+
+
+def test_half_open_lets_one_request_through_and_retrips_with_longer_pause(clock):
+    br = _breaker(clock)
+    for _ in range(3):
+        br.record_block()
+    clock.now = br.open_until + 1               # pause écoulée : semi-ouvert
+    br.before_request()
+    assert clock.sleeps == [pytest.approx(br.slowdown)]     # seulement l'espacement
+
+    # la requête d'essai est encore bloquée : pas de pause tout de suite...
+    assert br.record_block() is False
+    br.record_block()
+    # ...mais un nouveau déclenchement double la pause, plafonnée à max_pause
+    assert br.record_block() is True and br.open_until == clock.now + 120
+    for _ in range(3):
+        br.record_block()
+    assert br.trips == 3 and br.open_until == clock.now + 200
+
+
+def test_successes_close_the_breaker_and_wind_down_the_slowdown(clock):
+    br = _breaker(clock)
+    br.record_block()
+    br.record_block()
+    br.record_success()                         # fermé : le compteur repart de zéro
+    assert br.consecutive == 0
+    assert br.record_block() is False and br.record_block() is False and br.trips == 0
+
+    while br.slowdown > 0:
+        br.record_success()
+    clock.sleeps.clear()
+    br.before_request()
+    assert clock.sleeps == []                   # plus aucune attente
+
+
+def test_breaker_for_is_shared_per_host(monkeypatch):
+    monkeypatch.setattr(antibot, "_BREAKERS", {})
+    a = breaker_for("https://www.amazon.fr/dp/A1")
+    assert breaker_for("https://WWW.amazon.fr/s?k=x") is a
+    assert breaker_for("https://www.amazon.de/dp/A1") is not a
+    antibot.reset_breakers()
+    assert breaker_for("https://www.amazon.fr/dp/A1") is not a
@@ -0,0 +1,88 @@
+# tests/test_category_cache.py
+import json
+
+import pytest
+
+from controller import category_cache
+from controller.category_cache import _usable, cached_subcats, load_tree
+
+CAT = "https://www.amazon.fr/b?node=123"
+SUBS = {"Souris": "https://www.amazon.fr/b?node=1", "Claviers": "https://www.amazon.fr/b?node=2",
+        "Écrans": "https://www.amazon.fr/b?node=3"}
+
+
+class Discover:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return dict(self.result)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / ".category_tree.json")
+
+
+@pytest.mark.parametrize("entry,max_subcats,age,usable", [
+    ({"max_subcats": 3, "subcats": SUBS}, 3, 10, True),
+    ({"max_subcats": 3, "subcats": SUBS}, 3, 101, False),      # TTL dépassé
+    ({"max_subcats": 5, "subcats": SUBS}, 2, 10, True),        # on en demande moins qu'en cache
+    ({"max_subcats": 3, "subcats": SUBS}, 5, 10, False),       # on en demande plus, la page en avait peut-être
+    ({"max_subcats": 5, "subcats": SUBS}, 8, 10, True),        # la page n'en avait que 3 (< 5 demandées)
+    ({"max_subcats": 3, "subcats": []}, 3, 10, False),
+    (None, 3, 10, False),
+])
+def test_usable_rules(entry, max_subcats, age, usable):
+    now = 1_000_000.0
+    if entry is not None:
+        entry = dict(entry, fetched_at=now - age)
+    assert _usable(entry, max_subcats, ttl=100, now=now) is usable
+
+
+def test_discovers_once_then_serves_from_cache(path):
+    discover = Discover(SUBS)
+    assert cached_subcats(CAT, 3, discover, ttl=3600, path=path) == SUBS
+    assert cached_subcats(CAT, 3, discover, ttl=3600, path=path) == SUBS
+    assert cached_subcats(CAT, 2, discover, ttl=3600, path=path) == dict(list(SUBS.items())[:2])
+    assert discover.calls == 1
+    entry = load_tree(path)[CAT]
+    assert entry["max_subcats"] == 3 and entry["subcats"] == SUBS
+
+
+def test_expired_entry_is_rediscovered(path, monkeypatch):
+    discover = Discover(SUBS)
+    cached_subcats(CAT, 3, discover, ttl=60, path=path)
+    later = load_tree(path)[CAT]["fetched_at"] + 61
+    monkeypatch.setattr(category_cache.time, "time", lambda: later)
+    cached_subcats(CAT, 3, discover, ttl=60, path=path)
+    assert discover.calls == 2
+    assert load_tree(path)[CAT]["fetched_at"] == later
+
+
+def test_empty_result_is_not_cached(path):
+    blocked = Discover({})
+    assert cached_subcats(CAT, 3, blocked, ttl=3600, path=path) == {}
+    assert load_tree(path) == {}
+    # la page redevient accessible : nouvelle découverte, cette fois mise en cache
+    discover = Discover(SUBS)
+    assert cached_subcats(CAT, 3, discover, ttl=3600, path=path) == SUBS
+    assert discover.calls == 1 and CAT in load_tree(path)
+
+
+def test_refresh_forces_discovery_and_rewrites_cache(path, monkeypatch):
+    cached_subcats(CAT, 3, Discover(SUBS), ttl=3600, path=path)
+    other = "https://www.amazon.fr/b?node=999"
+    cached_subcats(other, 3, Discover({"Sacs": "https://www.amazon.fr/b?node=9"}), ttl=3600, path=path)
+
+    monkeypatch.setattr(category_cache, "SETTINGS", dict(category_cache.SETTINGS))
+    category_cache.configure(refresh=True)
+    fresh = {"Souris": SUBS["Souris"]}
+    discover = Discover(fresh)
+    assert cached_subcats(CAT, 3, discover, ttl=3600, path=path) == fresh
+    assert discover.calls == 1
+    with open(path, encoding="utf-8") as f:
+        cats = json.load(f)["categories"]
+    assert cats[CAT]["subcats"] == fresh and other in cats     # les autres entrées sont conservées
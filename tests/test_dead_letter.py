@@ -0,0 +1,61 @@
+# tests/test_dead_letter.py
+import json
+
+import pytest
+
+from controller.dead_letter import DEAD, PENDING, DeadLetterQueue, backoff_delay
+
+NOW = 1_700_000_000.0
+
+
+@pytest.mark.parametrize("attempts, nominal", [(0, 30), (1, 30), (2, 60), (3, 120), (6, 960)])
+def test_backoff_delay_doubles_with_jitter(attempts, nominal):
+    for _ in range(20):
+        assert nominal * 0.9 <= backoff_delay(attempts, base=30) <= nominal * 1.1
+
+
+def test_backoff_delay_is_capped():
+    assert backoff_delay(50, base=30, cap=100) <= 110
+
+
+def test_entry_goes_dead_after_max_attempts(tmp_path):
+    q = DeadLetterQueue(str(tmp_path / "dlq.json"), max_attempts=3, backoff=10)
+    q.add("product", "product:A1", "u1", "timeout", now=NOW, asin="A1", sub_dir="d")
+    e = q.items["product:A1"]
+    assert e["status"] == PENDING and e["attempts"] == 1
+    assert NOW + 9 <= e["next_attempt"] <= NOW + 11
+    q.fail("product:A1", "timeout", now=NOW + 20)
+    assert e["status"] == PENDING and e["attempts"] == 2
+    q.fail("product:A1", "KeyError: 'name'", now=NOW + 60)
+    assert e["status"] == DEAD and "next_attempt" not in e and e["last_error"] == "KeyError: 'name'"
+    assert q.due(now=NOW + 10_000) == []
+    # nouvel échec sur une entrée morte : on repart de zéro
+    q.add("product", "product:A1", "u1", "timeout", now=NOW + 100)
+    assert q.items["product:A1"]["attempts"] == 1
+
+
+def test_due_filters_and_orders(tmp_path):
+    q = DeadLetterQueue(str(tmp_path / "dlq.json"), backoff=10)
+    q.add("image", "image:B", "ub", now=NOW, sub_dir="data/x")
+    q.add("product", "product:A", "ua", now=NOW - 5, sub_dir="data/x")
+    q.add("product", "product:C", "uc", now=NOW, sub_dir="data/y")
+    assert q.due(now=NOW) == []
+    due = [e["key"] for e in q.due(now=NOW + 20)]
+    assert due[0] == "product:A" and set(due) == {"product:A", "image:B", "product:C"}  # B/C : jitter
+    assert [e["key"] for e in q.due(kinds=("product",), now=NOW + 20,
+                                   where=lambda e: e["sub_dir"] == "data/x")] == ["product:A"]
+    q.succeed("product:A")
+    assert "product:A" not in q.items
+
+
+def test_save_merges_with_other_process(tmp_path):
+    path = str(tmp_path / "dlq.json")
+    a, b = DeadLetterQueue(path), DeadLetterQueue(path)
+    a.add("product", "product:A", "ua", now=NOW)
+    b.add("product", "product:B", "ub", now=NOW)
+    a.save()
+    b.save()
+    assert set(json.loads((tmp_path / "dlq.json").read_text(encoding="utf-8"))["items"]) == {"product:A", "product:B"}
+    a.succeed("product:A")
+    a.save()
+    assert set(DeadLetterQueue(path).items) == {"product:B"}
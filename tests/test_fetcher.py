@@ -0,0 +1,32 @@
+# tests/test_fetcher.py
+import sys
+import types
+
+import pytest
+
+from controller import fetcher
+
+pytest.importorskip("selenium")
+
+
+def test_driver_returns_before_load_event(monkeypatch):
+    created = {}
+
+    class FakeChrome:
+        def __init__(self, service=None, options=None):
+            created["options"] = options
+
+        def execute_cdp_cmd(self, *a):
+            pass
+
+    class FakeManager:
+        def install(self):
+            return "/bin/true"
+
+    from selenium import webdriver
+    monkeypatch.setattr(webdriver, "Chrome", FakeChrome)
+    monkeypatch.setitem(sys.modules, "webdriver_manager.chrome",
+                        types.SimpleNamespace(ChromeDriverManager=FakeManager))
+    fetcher._init_driver(headless=True)
+    assert created["options"].page_load_strategy == "eager"
+    assert created["options"].to_capabilities()["pageLoadStrategy"] == "eager"
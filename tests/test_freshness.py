@@ -0,0 +1,59 @@
+# tests/test_freshness.py
+import json
+
+from controller.freshness import FreshnessTracker, volatility
+
+NOW = 1_700_000_000.0
+HOUR = 3600.0
+
+
+def _tracker(tmp_path, budget=None, **items):
+    path = tmp_path / "fresh.json"
+    path.write_text(json.dumps({"version": 1, "asins": items}), encoding="utf-8")
+    return FreshnessTracker(str(path), budget=budget, min_age_hours=12)
+
+
+def test_unseen_first_then_oldest_and_fresh_skipped(tmp_path):
+    t = _tracker(tmp_path,
+                 OLD={"last": NOW - 48 * HOUR, "prices": []},
+                 MID={"last": NOW - 20 * HOUR, "prices": []},
+                 FRESH={"last": NOW - 2 * HOUR, "prices": []})
+    links = [("FRESH", "u0"), ("MID", "u1"), ("NEW", "u2"), ("OLD", "u3")]
+    assert t.plan(links, now=NOW) == [("NEW", "u2"), ("OLD", "u3"), ("MID", "u1")]
+
+
+def test_volatile_price_raises_priority(tmp_path):
+    t = _tracker(tmp_path,
+                 STABLE={"last": NOW - 30 * HOUR, "prices": [[0, 10.0], [1, 10.0]]},
+                 MOVING={"last": NOW - 20 * HOUR, "prices": [[0, 10.0], [1, 15.0]]})
+    assert volatility([[0, 10.0], [1, 15.0]]) == 0.5
+    plan = t.plan([("STABLE", "a"), ("MOVING", "b")], now=NOW)
+    assert [a for a, _ in plan] == ["MOVING", "STABLE"]
+
+
+def test_plan_is_capped_by_limit_and_budget(tmp_path):
+    t = _tracker(tmp_path, budget=3)
+    links = [(f"A{i}", f"u{i}") for i in range(5)]
+    assert len(t.plan(links, limit=4, now=NOW)) == 3
+    t.spend(2)
+    assert t.plan(links, limit=4, now=NOW) == [("A0", "u0")]
+    assert len(t.plan(links, limit=4, now=NOW)) == t.remaining()
+
+
+def test_tracked_asins_of_the_subcategory_are_added(tmp_path):
+    t = _tracker(tmp_path,
+                 GONE={"last": NOW - 50 * HOUR, "url": "ug", "subcategory": "Souris", "prices": []},
+                 OTHER={"last": NOW - 50 * HOUR, "url": "uo", "subcategory": "Claviers", "prices": []})
+    assert t.plan([("NEW", "un")], subcategory="Souris", now=NOW) == [("NEW", "un"), ("GONE", "ug")]
+
+
+def test_record_and_save_merge_with_disk(tmp_path):
+    a = _tracker(tmp_path)
+    b = FreshnessTracker(a.path)
+    a.record("A1", NOW, "1 299,99 €", "u1", "Souris")
+    b.record("B1", NOW, None, "u2", "Claviers")
+    a.save()
+    b.save()
+    state = json.loads((tmp_path / "fresh.json").read_text(encoding="utf-8"))["asins"]
+    assert set(state) == {"A1", "B1"}
+    assert state["A1"]["prices"] == [[NOW, 1299.99]] and state["A1"]["scrapes"] == 1
@@ -0,0 +1,92 @@
+# tests/test_generate_html.py
+import os
+import json
+import shutil
+
+import generate_html
+
+
+def _category(data_root, name, n):
+    d = os.path.join(data_root, "ScraperDefault", name)
+    os.makedirs(os.path.join(d, "images"), exist_ok=True)
+    recs = []
+    for i in range(n):
+        img = os.path.join(d, "images", f"{name}_{i}.jpg")
+        with open(img, "wb") as f:
+            f.write(b"\xff\xd8" + bytes(64))
+        recs.append({"asin": f"{name}{i}", "name": f"{name} produit {i}", "price": "9,99 €", "image_local": img})
+    with open(os.path.join(d, "products.json"), "w", encoding="utf-8") as f:
+        json.dump(recs, f)
+    return d
+
+
+def _build(data, site, **kw):
+    return generate_html.generate_site(str(data), str(site), thumbs=False, precompress=False, **kw)
+
+
+def test_removed_category_is_deleted_from_site(tmp_path):
+    data, site = tmp_path / "data", tmp_path / "site"
+    _category(str(data), "Audio", 3)
+    video = _category(str(data), "Video", 2)
+    _build(data, site)
+    assert (site / "shards" / "Video" / "0.js").exists()
+    assert (site / "assets" / "images" / "Video").is_dir()
+
+    shutil.rmtree(video)
+    stats = _build(data, site)
+
+    assert stats["categories_removed"] == 1
+    assert not (site / "shards" / "Video").exists()
+    assert not (site / "assets" / "images" / "Video").exists()
+    assert (site / "shards" / "Audio" / "0.js").exists()
+    manifest = json.loads((site / generate_html.MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert set(manifest["sections"]) == {"Audio"}
+    assert not any("Video" in sig["dst"] for sig in manifest["images"].values())
+
+
+def test_force_rebuild_also_removes_stale_categories(tmp_path):
+    data, site = tmp_path / "data", tmp_path / "site"
+    _category(str(data), "Audio", 1)
+    video = _category(str(data), "Video", 1)
+    _build(data, site)
+    shutil.rmtree(video)
+    _build(data, site, force=True)
+    assert not (site / "shards" / "Video").exists()
+    assert not (site / "assets" / "images" / "Video").exists()
+
+
+def test_search_postings_stay_out_of_published_site(tmp_path):
+    data, site = tmp_path / "data", tmp_path / "site"
+    _category(str(data), "Audio", 2)
+    video = _category(str(data), "Video", 1)
+    # postings d'un ancien build, encore dans shards/
+    legacy = site / "shards" / "Audio" / "search.jsonl"
+    legacy.parent.mkdir(parents=True)
+    legacy.write_text('{"count": 0}\n', encoding="utf-8")
+    generate_html.generate_site(str(data), str(site), thumbs=False, precompress=True, force=True)
+
+    published = [p.name for p in site.rglob("*")]
+    assert not [n for n in published if "search.jsonl" in n or n.endswith(".jsonl.gz")]
+    assert generate_html.MANIFEST_NAME + ".gz" not in published
+    build = generate_html.build_dir(site)
+    assert (build / "postings" / "Audio.jsonl").exists()
+    assert (site / "assets" / "search-index.js").exists()
+    assert '"count":2' in (site / "assets" / "search-index.js").read_text(encoding="utf-8")
+
+    shutil.rmtree(video)
+    _build(data, site)
+    assert not (build / "postings" / "Video.jsonl").exists()
+
+
+def test_reused_categories_stay_searchable_without_build_dir(tmp_path):
+    data, site = tmp_path / "data", tmp_path / "site"
+    _category(str(data), "Audio", 2)
+    _category(str(data), "Video", 3)
+    _build(data, site)
+    index = (site / "assets" / "search-index.js").read_text(encoding="utf-8")
+    shutil.rmtree(generate_html.build_dir(site))
+
+    stats = _build(data, site)
+    assert stats["categories_reused"] == 0 and stats["categories_rendered"] == 2
+    assert (site / "assets" / "search-index.js").read_text(encoding="utf-8") == index
+    assert _build(data, site)["categories_reused"] == 2
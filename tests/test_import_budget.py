@@ -0,0 +1,21 @@
+# tests/test_import_budget.py
+# Le budget d'import de main (utils.import_budget) tourne avec les tests : une
+# régression (import lourd remonté au niveau module) fait échouer la CI.
+import os
+
+from utils import import_budget
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", import_budget.DEFAULT_BUDGET_MS))
+
+
+def test_main_import_skips_heavy_modules_and_stays_under_budget():
+    assert {"selenium", "bs4", "PIL", "generate_html"} <= set(import_budget.FORBIDDEN)
+    res = import_budget.check("main", BUDGET_MS, cwd=ROOT)
+    assert res["forbidden"] == [], f"modules lourds importés par main : {res['forbidden']}"
+    assert res["total_ms"] <= BUDGET_MS, f"import main : {res['total_ms']} ms > {BUDGET_MS} ms ({res['slowest'][:5]})"
+
+
+def test_forbidden_detection_catches_submodules():
+    per_module = {"main": 10.0, "bs4.element": 2.0, "selenium": 5.0, "bs4x": 1.0}
+    assert import_budget.forbidden_loaded(per_module, ("bs4", "selenium")) == ["bs4.element", "selenium"]
@@ -0,0 +1,16 @@
+# tests/test_main.py
+import main
+
+
+def test_report_missing_exits_empty(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert main.main(["report", "--kind", "categories"]) == main.EXIT_EMPTY
+
+
+def test_report_found_exits_ok(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    reports = tmp_path / "view" / "reports"
+    reports.mkdir(parents=True)
+    # le mot "introuvable" dans le contenu ne doit pas changer le code de sortie
+    (reports / "report_categories.txt").write_text("Produit introuvable ailleurs\n", encoding="utf-8")
+    assert main.main(["report", "--kind", "categories"]) == main.EXIT_OK
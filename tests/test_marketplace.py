@@ -0,0 +1,112 @@
+# tests/test_marketplace.py
+import threading
+import time
+
+import pytest
+
+from controller import marketplace
+from controller.marketplace import DomainBudget, budget_for
+
+
+class FakeTime:
+    """monotonic / sleep simulés : sleep avance l'horloge et note la durée."""
+
+    def __init__(self):
+        self.now = 50.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setattr(marketplace, "SETTINGS", {})
+    monkeypatch.setattr(marketplace, "LOADS", dict(marketplace.LOADS))
+    monkeypatch.setattr(marketplace, "_budgets", {})
+
+
+def test_acquire_without_blocking_fails_when_domain_is_full():
+    b = DomainBudget("www.amazon.fr", concurrency=2, min_interval=0)
+    assert b.acquire(blocking=False) and b.acquire(blocking=False)
+    assert b.acquire(blocking=False) is False
+    b.release()
+    assert b.acquire(blocking=False)
+    b.release()
+    b.release()
+    with pytest.raises(ValueError):
+        b.release()                               # pas plus de libérations que de places
+
+
+def test_concurrency_caps_loads_in_flight():
+    b = DomainBudget("www.amazon.fr", concurrency=2, min_interval=0)
+    lock = threading.Lock()
+    state = {"in_flight": 0, "peak": 0}
+
+    def load():
+        with b.slot():
+            with lock:
+                state["in_flight"] += 1
+                state["peak"] = max(state["peak"], state["in_flight"])
+            time.sleep(0.02)
+            with lock:
+                state["in_flight"] -= 1
+
+    threads = [threading.Thread(target=load) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert state["peak"] == 2 and state["in_flight"] == 0
+
+
+def test_min_interval_spaces_consecutive_starts(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(marketplace, "time", clock)
+    b = DomainBudget("www.amazon.fr", concurrency=3, min_interval=1.5)
+    starts = []
+    for _ in range(3):
+        b.acquire()
+        starts.append(clock.now)
+    assert starts == [50.0, 51.5, 53.0]
+    assert clock.sleeps == [1.5, 1.5]
+
+    # après une pause plus longue que l'intervalle, pas d'attente
+    for _ in range(3):
+        b.release()
+    clock.now += 10
+    b.acquire()
+    assert clock.sleeps == [1.5, 1.5]
+
+
+def test_min_interval_holds_across_threads():
+    b = DomainBudget("www.amazon.fr", concurrency=4, min_interval=0.05)
+    starts = []
+
+    def load():
+        with b.slot():
+            starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    starts.sort()
+    assert all(b2 - a >= 0.045 for a, b2 in zip(starts, starts[1:]))
+
+
+def test_budget_for_uses_domain_settings_and_tabs(settings):
+    marketplace.configure({"de": {"concurrency": 2, "min_interval": 3}})
+    de = budget_for("https://www.amazon.de/s?k=x")
+    assert (de.concurrency, de.min_interval) == (2, 3.0)
+    assert budget_for("https://WWW.amazon.de/dp/A1") is de
+    fr = budget_for("https://www.amazon.fr/dp/A1")
+    assert (fr.concurrency, fr.min_interval) == (marketplace.DEFAULT_CONCURRENCY, marketplace.DEFAULT_MIN_INTERVAL)
+
+    marketplace.set_loads_per_driver(3)           # 3 onglets par driver
+    assert budget_for("https://www.amazon.de/s?k=x").concurrency == 6
@@ -0,0 +1,85 @@
+# tests/test_normalize.py
+import math
+
+import pytest
+
+from utils import normalize
+
+pd = pytest.importorskip("pandas")
+
+EDGE_RECORDS = [
+    {"asin": "A1", "price": "1 299,99 €", "brand": "Visiter la boutique Samsung",
+     "seller": "Expédié par Amazon. Vendu par TechStore.", "url": "https://www.amazon.fr/dp/A1"},
+    {"asin": "A2", "price": "1 299,", "brand": "Marque : SAMSUNG", "seller": "Vendu et expédié par Amazon.",
+     "url": "https://www.amazon.fr/dp/A2"},
+    {"asin": "A3", "price": "$1,299.99", "brand": "Visit the Anker Store", "seller": "Ships from and sold by Amazon.com.",
+     "url": "https://www.amazon.com/dp/A3"},
+    {"asin": "A4", "price": 19.9, "brand": "  samsung  ", "seller": "Expédié par Amazon.",
+     "url": "https://www.amazon.de/dp/A4"},
+    {"asin": "A5", "price": 12, "brand": "", "seller": "", "url": "https://www.amazon.co.uk/dp/A5"},
+    {"asin": "A6", "price": ["12 €"], "brand": ["Sony"], "seller": {"name": "X"}, "url": ["https://www.amazon.fr"]},
+    {"asin": "A7", "price": {"value": 3}, "brand": None, "seller": None, "url": None},
+    {"asin": "A8", "price": float("nan"), "brand": float("nan"), "seller": 42, "url": 7},
+    {"asin": "A9", "price": "Prix non disponible", "brand": "Marque : Sony", "seller": "techstore",
+     "url": "https://www.amazon.it/dp/A9"},
+    {"asin": "A10", "price": None, "brand": "Sony", "seller": "TechStore", "url": "https://www.amazon.fr/dp/A10"},
+    {"asin": "A11", "price": "EUR 12,5", "brand": True, "seller": "Vendu par TechStore et expédié par Amazon.",
+     "url": "https://www.amazon.es/dp/A11"},
+    {"asin": "A12"},
+]
+
+
+def _missing(v):
+    return None if isinstance(v, float) and math.isnan(v) else v
+
+
+def _same(a, b):
+    # colonnes brutes : NaN d'entrée et NA du DataFrame valent tous deux "absent"
+    assert len(a) == len(b)
+    for ra, rb in zip(a, b):
+        assert set(ra) == set(rb)
+        for k, va in ra.items():
+            va, vb = _missing(va), _missing(rb[k])
+            if isinstance(va, float) and isinstance(vb, float):
+                assert math.isclose(va, vb), (ra["asin"], k, va, vb)
+            else:
+                assert va == vb, (ra["asin"], k, va, vb)
+
+
+def test_frame_matches_records_on_edge_cases():
+    by_record = normalize.normalize_records(EDGE_RECORDS)
+    frame = normalize.normalize_frame(pd.DataFrame.from_records(EDGE_RECORDS))
+    _same(by_record, normalize.frame_to_records(frame))
+
+
+def test_edge_case_values():
+    rows = {r["asin"]: r for r in normalize.normalize_records(EDGE_RECORDS)}
+    assert rows["A1"]["price_value"] == 1299.99 and rows["A1"]["currency"] == "EUR"
+    assert rows["A2"]["price_value"] == 1299.0
+    assert rows["A3"]["price_value"] == 1299.99 and rows["A3"]["currency"] == "USD"
+    assert rows["A4"]["currency"] == "EUR" and rows["A5"]["currency"] == "GBP"
+    assert rows["A1"]["brand_canonical"] == rows["A2"]["brand_canonical"] == rows["A4"]["brand_canonical"]
+    assert rows["A1"]["seller_canonical"] == "TechStore" and rows["A9"]["seller_canonical"] == "TechStore"
+    assert rows["A2"]["seller_canonical"] == "Amazon" and rows["A4"]["seller_canonical"] is None
+    for asin in ("A6", "A7", "A8", "A9", "A10"):
+        assert rows[asin]["price_value"] is None and rows[asin]["currency"] is None
+
+
+def test_frame_with_only_unhashable_prices():
+    df = pd.DataFrame({"asin": ["A", "B"], "price": [["1 €"], {"v": 2}]})
+    out = normalize.frame_to_records(normalize.normalize_frame(df))
+    assert [r["price_value"] for r in out] == [None, None]
+
+
+@pytest.mark.parametrize("raw, value", [("1 299,99 €", 1299.99), ("1.299,99", 1299.99), ("1,299", 1299.0),
+                                        ("12,5", 12.5), ("£12.50", 12.5), (7, 7.0), (float("nan"), None),
+                                        (True, None), (["1 €"], None), ("", None)])
+def test_parse_price(raw, value):
+    assert normalize.parse_price(raw) == value
+
+
+@pytest.mark.parametrize("prices", [["12 €", 3.2], [3.2, "12 €"], ["12 €", 7], ["1 299,", 0.5, None]])
+def test_frame_matches_records_on_mixed_price_types(prices):
+    recs = [{"asin": f"A{i}", "price": p, "url": "https://www.amazon.fr/dp/x"} for i, p in enumerate(prices)]
+    frame = normalize.normalize_frame(pd.DataFrame.from_records(recs))
+    _same(normalize.normalize_records(recs), normalize.frame_to_records(frame))
@@ -0,0 +1,64 @@
+# tests/test_parser.py
+import os
+
+import pytest
+
+from controller.parser import extract_product_links, parse_listing_results, parse_rating
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+@pytest.fixture(scope="module")
+def listing_html():
+    # page de résultats amazon.fr enregistrée puis allégée (cartes, sponsorisé, indisponible)
+    with open(os.path.join(FIXTURES, "listing_fr.html"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_parse_listing_results_fields(listing_html):
+    results = parse_listing_results(listing_html)
+
+    # ni le bandeau (data-asin vide) ni la carte sans lien produit
+    assert [r["asin"] for r in results] == ["B07W6JN8V8", "B0BRXNJ2QT", "B08XYZ1234"]
+    first = results[0]
+    assert first == {
+        "asin": "B07W6JN8V8",
+        "url": "https://www.amazon.fr/Logitech-M185-Souris-Compatible-Chromebook/dp/B07W6JN8V8/ref=sr_1_1",
+        "name": "Logitech M185 Souris sans Fil, 2,4 GHz avec Mini Récepteur USB",
+        "price": "12,99\xa0€",
+        "rating": 4.5,
+        "image_url": "https://m.media-amazon.com/images/I/61UxfXTUyvL._AC_UL320_.jpg",
+    }
+    sponsored = results[1]
+    assert sponsored["url"] == "https://www.amazon.fr/UGREEN-Souris-Silencieuse-Ergonomique/dp/B0BRXNJ2QT"
+    assert (sponsored["price"], sponsored["rating"]) == ("9,99\xa0€", 4.2)
+
+
+def test_missing_fields_are_none(listing_html):
+    unavailable = parse_listing_results(listing_html)[2]
+    assert unavailable["name"] == "Souris Bluetooth rechargeable"
+    assert unavailable["price"] is None and unavailable["rating"] is None
+    assert unavailable["url"] == "https://www.amazon.fr/gp/product/B08XYZ1234/ref=sr_1_3"
+
+
+def test_relative_links_follow_the_marketplace(listing_html):
+    results = parse_listing_results(listing_html, base_domain="https://www.amazon.de")
+    assert results[0]["url"].startswith("https://www.amazon.de/Logitech-M185")
+    assert results[1]["url"].startswith("https://www.amazon.fr/")      # lien absolu gardé tel quel
+    assert extract_product_links(listing_html, "https://www.amazon.de") == [(r["asin"], r["url"]) for r in results]
+
+
+def test_empty_or_blocked_page_has_no_results():
+    assert parse_listing_results("") == []
+    assert parse_listing_results("<html><title>Robot Check</title><form action='/errors/validateCaptcha'></form></html>") == []
+
+
+@pytest.mark.parametrize("text,value", [
+    ("4,5 sur 5 étoiles", 4.5),
+    ("4.5 out of 5 stars", 4.5),
+    ("5 sur 5 étoiles", 5.0),
+    ("", None),
+    (None, None),
+])
+def test_parse_rating(text, value):
+    assert parse_rating(text) == value
@@ -0,0 +1,49 @@
+# tests/test_report.py
+import os
+import json
+
+from view.report import _format_stats, _run_stats_by_dir, build_report, build_text_report_simple
+
+
+def _write(data_root, rel, names):
+    d = os.path.join(data_root, *rel.split("/"))
+    os.makedirs(d, exist_ok=True)
+    with open(os.path.join(d, "products.json"), "w", encoding="utf-8") as f:
+        json.dump([{"asin": f"A{i}", "name": n} for i, n in enumerate(names)], f)
+    return d
+
+
+def _stats(path, found, fetched):
+    return {"dir": os.path.basename(path), "path": path, "found": found, "fetched": fetched}
+
+
+def test_same_subcategory_name_in_two_categories_keeps_both_stats(tmp_path):
+    root = str(tmp_path)
+    mode = _write(root, "ScraperAllCategories/mode/Accessoires", ["sac"])
+    tech = _write(root, "ScraperAllCategories/technologie/Accessoires", ["câble", "housse"])
+    results = [("mode_Accessoires", "u1", 1, _stats(mode, 10, 1)),
+               ("technologie_Accessoires", "u2", 2, _stats(tech, 20, 2))]
+
+    run_stats = _run_stats_by_dir(results, root)
+    assert set(run_stats) == {"ScraperAllCategories/mode/Accessoires",
+                              "ScraperAllCategories/technologie/Accessoires"}
+
+    report = build_report(root, run_stats=run_stats)
+    subcats = report["subcats"]
+    assert set(subcats) == {"Accessoires", "technologie/Accessoires"}
+    assert subcats["Accessoires"]["stats"]["found"] == 10
+    assert subcats["Accessoires"]["saved"] == 1
+    assert subcats["technologie/Accessoires"]["stats"]["found"] == 20
+    assert subcats["technologie/Accessoires"]["saved"] == 2
+    assert report["totals"]["found"] == 30
+
+
+def test_text_report_shows_run_counters_in_french(tmp_path):
+    root = str(tmp_path)
+    audio = _write(root, "ScraperDefault/Audio", ["casque"])
+    stats = dict(_stats(audio, 7, 5), parse_failures=2, timings={"listing": 1.25})
+    report = build_report(root, run_stats=_run_stats_by_dir([("Audio", "u", 1, stats)], root))
+    text = build_text_report_simple(report)
+    assert "Dernier run : " + _format_stats(stats) in text
+    assert "trouvés 7 | déjà traités 0 | récupérés 5 | échecs parsing 2" in text
+    assert "temps listing 1.2s" in text
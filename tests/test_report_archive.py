@@ -0,0 +1,114 @@
+# tests/test_report_archive.py
+import os
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from view import report_archive
+from view.report_archive import apply_delta, apply_retention, iter_history, json_delta, list_archives, load_run
+
+
+@pytest.mark.parametrize("old,new", [
+    ({"a": 1, "b": {"c": [1, 2]}}, {"a": 1, "b": {"c": [1, 2, 3]}}),
+    ({"a": 1, "b": 2}, {"b": 3, "d": {"e": None}}),
+    ({"x": {"y": {"z": 1}}}, {"x": {"y": {}}}),
+    ({"a": {"b": 1}}, {"a": [1]}),
+    ([1, 2], {"a": 1}),
+    ({"a": 1}, None),
+    ("texte", "autre"),
+])
+def test_delta_round_trip(old, new):
+    assert apply_delta(old, json_delta(old, new)) == new
+
+
+def test_identical_documents_have_no_delta():
+    doc = {"a": {"b": [1, {"c": 2}]}}
+    assert json_delta(doc, json.loads(json.dumps(doc))) is None
+    assert apply_delta(doc, None) is doc
+
+
+def _report(i):
+    return {"generated_at": f"run {i}", "totals": {"sauvegardes": i},
+            "subcats": {"Audio": {"saved": i, "products": [f"p{j}" for j in range(i % 5)]},
+                        f"Sub{i % 3}": {"saved": 1, "products": ["x"]}}}
+
+
+def _write_runs(out_dir, now, days, per_day=1):
+    """per_day report_<ts>.json (8 h, 9 h...) pour chacun des `days` jours
+    précédant now ; retourne {ts: doc}."""
+    docs = {}
+    n = 0
+    morning = now.replace(hour=8, minute=0, second=0)
+    for d in range(days, 0, -1):
+        for k in range(per_day):
+            ts = (morning - timedelta(days=d) + timedelta(hours=k)).strftime(report_archive.TS_FORMAT)
+            docs[ts] = _report(n)
+            with open(os.path.join(out_dir, f"report_{ts}.json"), "w", encoding="utf-8") as f:
+                json.dump(docs[ts], f)
+            n += 1
+    return docs
+
+
+def test_retention_keeps_recent_and_compacts_one_run_per_day(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_archive, "KEYFRAME_EVERY", 4)
+    out = str(tmp_path)
+    now = datetime(2025, 6, 30, 12, 0, 0)
+    docs = _write_runs(out, now, days=30, per_day=2)
+
+    counts = apply_retention(out, keep_last=5, keep_days=10, now=now)
+
+    kept = [ts for ts, _ in list_archives(out)["report"]]
+    # moins de 10 jours (le 10e jour, à 8 h et 9 h, est déjà trop vieux) : 9 jours x 2 runs
+    assert len(kept) == 18 == counts["kept"]
+    old_days = 21
+    assert counts["compacted"] == old_days           # un run par jour ancien
+    assert counts["dropped"] == old_days             # l'autre run du jour est écarté
+    history = list(iter_history("report", out))
+    assert len(history) == old_days
+    for ts, doc in history:
+        assert doc == docs[ts]                       # keyframes + deltas reconstruits à l'identique
+        assert ts[:8] not in {k[:8] for k in kept}
+    # un run compacté reste accessible par son ts
+    ts, doc = history[7]
+    assert load_run(ts, out) == doc
+
+
+def test_retention_is_incremental(tmp_path):
+    out = str(tmp_path)
+    now = datetime(2025, 6, 30, 12, 0, 0)
+    docs = _write_runs(out, now, days=6)
+    apply_retention(out, keep_last=2, keep_days=1, now=now)
+    first = list(iter_history("report", out))
+    assert len(first) == 4
+
+    # deux jours plus tard : les runs devenus anciens s'ajoutent à l'historique existant
+    later = now + timedelta(days=2)
+    more = _write_runs(out, later, days=2)
+    docs.update(more)
+    apply_retention(out, keep_last=2, keep_days=1, now=later)
+    history = list(iter_history("report", out))
+    assert [ts for ts, _ in history[:len(first)]] == [ts for ts, _ in first]
+    assert len(history) == 6
+    assert all(doc == docs[ts] for ts, doc in history)
+    assert len(list_archives(out)["report"]) == 2
+
+
+def test_trace_retention_drops_old_runs_with_their_worker_files(tmp_path):
+    from view.report_archive import apply_trace_retention
+    now = datetime(2025, 6, 30, 12, 0, 0)
+    names = []
+    for d in range(6, 0, -1):
+        run = f"all_{(now - timedelta(days=d)).strftime('%Y%m%d-%H%M%S')}_42"
+        names += [f"trace_{run}.jsonl", f"trace_{run}-p43.jsonl"]
+    names.append("notes.txt")
+    for fn in names:
+        (tmp_path / fn).write_text("{}\n", encoding="utf-8")
+
+    counts = apply_trace_retention(str(tmp_path), keep_last=1, keep_days=2, now=now)
+
+    assert counts == {"kept": 2, "dropped": 4}
+    left = sorted(os.listdir(tmp_path))
+    recent = [f"all_{(now - timedelta(days=d)).strftime('%Y%m%d-%H%M%S')}_42" for d in (2, 1)]
+    assert left == sorted(["notes.txt"] + [f"trace_{r}{s}.jsonl" for r in recent for s in ("", "-p43")])
+    assert apply_trace_retention(str(tmp_path / "absent")) == {"kept": 0, "dropped": 0}
@@ -0,0 +1,63 @@
+# tests/test_saver.py
+import json
+
+from controller.saver import ProductsJsonWriter, save_products_json
+
+
+def _read(d):
+    with open(d / "products.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_writer_replaces_file_by_default(tmp_path):
+    save_products_json([{"asin": "A1", "name": "ancien"}], str(tmp_path))
+    with ProductsJsonWriter(str(tmp_path)) as w:
+        w.write({"asin": "A2", "name": "nouveau"})
+    assert _read(tmp_path) == [{"asin": "A2", "name": "nouveau"}]
+
+
+def test_keep_existing_carries_products_not_rewritten(tmp_path):
+    # run 1 : trois produits ; run 2 : A1 et A3 frais (non re-scrapés), A2 mis à jour
+    save_products_json([{"asin": "A1", "name": "un"}, {"asin": "A2", "name": "deux", "price": "10 €"},
+                        {"asin": "A3", "name": "trois"}, {"name": "sans asin"}], str(tmp_path))
+    with ProductsJsonWriter(str(tmp_path), keep_existing=True) as w:
+        w.write({"asin": "A2", "name": "deux", "price": "12 €"})
+        w.write({"asin": "A4", "name": "quatre"})
+    assert (w.count, w.carried) == (2, 2)
+    by_asin = {r["asin"]: r for r in _read(tmp_path)}
+    assert set(by_asin) == {"A1", "A2", "A3", "A4"}
+    assert by_asin["A2"]["price"] == "12 €"
+
+
+def test_keep_existing_with_nothing_new_keeps_everything(tmp_path):
+    save_products_json([{"asin": "A1", "name": "un"}], str(tmp_path))
+    with ProductsJsonWriter(str(tmp_path), keep_existing=True) as w:
+        pass
+    assert _read(tmp_path) == [{"asin": "A1", "name": "un"}]
+
+
+def test_keep_existing_without_previous_file(tmp_path):
+    with ProductsJsonWriter(str(tmp_path / "sub"), keep_existing=True) as w:
+        pass
+    assert _read(tmp_path / "sub") == []
+
+
+def test_failed_run_leaves_file_untouched(tmp_path):
+    save_products_json([{"asin": "A1"}], str(tmp_path))
+    try:
+        with ProductsJsonWriter(str(tmp_path), keep_existing=True) as w:
+            w.write({"asin": "A2"})
+            raise RuntimeError("driver mort")
+    except RuntimeError:
+        pass
+    assert _read(tmp_path) == [{"asin": "A1"}]
+    assert [p.name for p in tmp_path.iterdir()] == ["products.json"]
+
+
+
+def test_keep_existing_predicate_filters_carried_records(tmp_path):
+    save_products_json([{"asin": "A1"}, {"asin": "A2"}, {"asin": "A3"}], str(tmp_path))
+    with ProductsJsonWriter(str(tmp_path), keep_existing=lambda asin: asin == "A3") as w:
+        w.write({"asin": "A1"})
+    assert [r["asin"] for r in _read(tmp_path)] == ["A1", "A3"]
+    assert (w.count, w.carried) == (1, 1)
@@ -0,0 +1,102 @@
+# tests/test_scraper_default.py
+import json
+
+from controller.dead_letter import DeadLetterQueue
+from controller.saver import ProductsJsonWriter, save_products_json, upsert_products_json
+from controller.ScraperController.scraper_default import _carry_policy
+
+
+def _rescrape(tmp_path, keep, asins):
+    with ProductsJsonWriter(str(tmp_path), keep_existing=keep) as w:
+        for a in asins:
+            w.write({"asin": a, "name": f"{a} bis"})
+    with open(tmp_path / "products.json", encoding="utf-8") as f:
+        return {r["asin"]: r for r in json.load(f)}
+
+
+def test_without_scheduler_file_is_replaced_except_pending_dead_letters(tmp_path):
+    dlq = DeadLetterQueue(str(tmp_path / "dlq.json"))
+    save_products_json([{"asin": "A1"}, {"asin": "GONE"}, {"asin": "FAILING"}, {"asin": "DEAD"}], str(tmp_path))
+    dlq.add("product", "product:FAILING", "u", "timeout")
+    dlq.max_attempts = 1
+    dlq.add("product", "product:DEAD", "u", "timeout")
+    rows = _rescrape(tmp_path, _carry_policy(False, dlq), ["A1", "NEW"])
+    assert set(rows) == {"A1", "NEW", "FAILING"}
+
+
+def test_without_scheduler_nor_dead_letters_file_is_replaced(tmp_path):
+    save_products_json([{"asin": "A1"}, {"asin": "GONE"}], str(tmp_path))
+    assert set(_rescrape(tmp_path, _carry_policy(False, None), ["A1"])) == {"A1"}
+
+
+def test_with_scheduler_skipped_fresh_products_stay(tmp_path):
+    save_products_json([{"asin": "A1"}, {"asin": "FRESH", "price": "9 €"}], str(tmp_path))
+    rows = _rescrape(tmp_path, _carry_policy(True, None), ["A1"])
+    assert set(rows) == {"A1", "FRESH"} and rows["FRESH"]["price"] == "9 €"
+
+
+def test_dead_letter_recovery_survives_until_listed_again(tmp_path):
+    dlq = DeadLetterQueue(str(tmp_path / "dlq.json"))
+    save_products_json([{"asin": "A1"}], str(tmp_path))
+    # run 1 : A9 échoue puis est repris en fin de run (image comprise)
+    dlq.add("product", "product:A9", "u", "timeout")
+    upsert_products_json([{"asin": "A9", "name": "repris"}], str(tmp_path))
+    upsert_products_json([{"asin": "A9", "image_local": "images/A9.jpg"}], str(tmp_path))
+    dlq.succeed("product:A9")
+    # run 2 : A9 de nouveau listé mais en échec -> remis en file, l'ancienne fiche reste
+    dlq.add("product", "product:A9", "u", "timeout")
+    rows = _rescrape(tmp_path, _carry_policy(False, dlq), ["A1"])
+    assert rows["A9"] == {"asin": "A9", "name": "repris", "image_local": "images/A9.jpg"}
+
+
+def _fake_listing_run(tmp_path, monkeypatch, cards, budget, known=()):
+    """_scrape_subcategory en listing seul sur une page de cartes factice ;
+    retourne (fiches chargées, stats, products.json)."""
+    from controller import dead_letter, freshness
+    from controller.ScraperController import scraper_default as sd
+    from utils import trace
+    monkeypatch.setattr(sd, "SETTINGS", {"listing_only": True, "enrich_incomplete": True})
+    monkeypatch.setattr(trace, "SETTINGS", dict(trace.SETTINGS, enabled=False))
+    monkeypatch.setattr(dead_letter, "SETTINGS", dict(dead_letter.SETTINGS, enabled=False))
+    monkeypatch.setattr(freshness, "SETTINGS", dict(freshness.SETTINGS))
+    freshness.configure(enabled=True, budget=budget, path=str(tmp_path / "fresh.json"))
+    for asin in known:
+        freshness.get_tracker().record(asin, subcategory="Souris")
+    fetched = []
+
+    def fake_fetch(driver, url, page_type=None):
+        if page_type == "product":
+            fetched.append(url.rsplit("/", 1)[-1])
+        return url
+    monkeypatch.setattr(sd, "fetch_page", fake_fetch)
+    monkeypatch.setattr(sd, "parse_listing_results", lambda html, base: [dict(c) for c in cards])
+    monkeypatch.setattr(sd, "parse_product_page", lambda html: {"name": "fiche", "price": "5 €",
+                                                                "image_url": "https://img/x.jpg"})
+    monkeypatch.setattr(sd, "_download_image", lambda prod, images_dir, sub_dir: True)
+    monkeypatch.setattr(sd, "jitter_sleep", lambda *a: None)
+    stats = sd.new_subcat_stats("Souris")
+    sd._scrape_subcategory(None, "Souris", "https://www.amazon.fr/s?k=souris", str(tmp_path / "out"),
+                           max_products=10, max_pages=1, stats=stats)
+    with open(tmp_path / "out" / "Souris" / "products.json", encoding="utf-8") as f:
+        return fetched, stats, {r["asin"]: r for r in json.load(f)}
+
+
+def _card(asin, complete=True):
+    return {"asin": asin, "url": f"https://www.amazon.fr/dp/{asin}", "name": f"carte {asin}",
+            "price": "9 €" if complete else None, "image_url": "https://img/c.jpg"}
+
+
+def test_listing_only_enrichment_follows_freshness_budget(tmp_path, monkeypatch):
+    cards = [_card("C1"), _card("I1", False), _card("I2", False), _card("I3", False)]
+    fetched, stats, rows = _fake_listing_run(tmp_path, monkeypatch, cards, budget=2)
+    assert fetched == ["I1", "I2"]                   # budget : 2 fiches
+    assert stats["skipped_fresh"] == 1 and stats["fetched"] == 2
+    assert set(rows) == {"C1", "I1", "I2", "I3"}     # les cartes restent toutes
+    assert rows["I1"]["name"] == "fiche" and rows["I3"]["name"] == "carte I3"
+
+
+def test_listing_only_does_not_refetch_fresh_products(tmp_path, monkeypatch):
+    cards = [_card("I1", False), _card("I2", False)]
+    fetched, stats, rows = _fake_listing_run(tmp_path, monkeypatch, cards, budget=None, known=["I1"])
+    assert fetched == ["I2"] and stats["skipped_fresh"] == 1
+    assert set(rows) == {"I1", "I2"}
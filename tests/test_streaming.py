@@ -0,0 +1,46 @@
+# tests/test_streaming.py
+import json
+
+import pytest
+
+from controller.saver import ProductsJsonWriter
+from utils.streaming import iter_json_array
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "products.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("block", [1, 3, 7, 64, 1 << 16])
+def test_elements_split_across_read_blocks(tmp_path, block):
+    items = [{"asin": f"A{i}", "name": "é" * i, "price": 1234.5 + i, "tags": [i, None, True]} for i in range(20)]
+    items += [12345678901234567890, -0.000125, "chaîne, avec ] et [", None, []]
+    path = _write(tmp_path, json.dumps(items, ensure_ascii=False, indent=2))
+    assert list(iter_json_array(path, block=block)) == items
+
+
+def test_writer_output_round_trips(tmp_path):
+    recs = [{"asin": f"A{i}", "name": f"Produit {i}"} for i in range(5)]
+    with ProductsJsonWriter(str(tmp_path)) as w:
+        for r in recs:
+            w.write(r)
+    assert list(iter_json_array(str(tmp_path / "products.json"), block=5)) == recs
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("[]", []),
+    ("  \n[ ]  ", []),
+    ('{"products": [{"asin": "A"}]}', [{"asin": "A"}]),
+    ('{"asin": "A"}', [{"asin": "A"}]),
+    ('[{"asin": "A"}, {"asin": "B"}, {"asi', [{"asin": "A"}, {"asin": "B"}]),   # tronqué
+    ("pas du json", []),
+    ("", []),
+])
+def test_edge_documents(tmp_path, text, expected):
+    assert list(iter_json_array(_write(tmp_path, text), block=4)) == expected
+
+
+def test_missing_file_yields_nothing(tmp_path):
+    assert list(iter_json_array(str(tmp_path / "absent.json"))) == []
@@ -0,0 +1,85 @@
+# tests/test_tabs.py
+import time
+from collections import deque
+
+import pytest
+
+from controller import marketplace, tabs
+
+LOAD_SECONDS = 0.15
+
+
+class FakeDriver:
+    """Chrome factice : une navigation lancée par window.location met
+    LOAD_SECONDS à finir ; compte les chargements simultanés."""
+
+    def __init__(self):
+        self.window_handles = ["t0"]
+        self.current = "t0"
+        self.loading = {}            # onglet -> (url, fin du chargement)
+        self.pages = {}
+        self.in_flight = self.max_in_flight = 0
+        driver = self
+
+        class SwitchTo:
+            def new_window(self, kind):
+                driver.window_handles.append(f"t{len(driver.window_handles)}")
+                driver.current = driver.window_handles[-1]
+
+            def window(self, handle):
+                driver.current = handle
+        self.switch_to = SwitchTo()
+
+    def execute_script(self, script, *args):
+        if script == tabs._NAVIGATE_JS:
+            self.loading[self.current] = (args[0], time.perf_counter() + LOAD_SECONDS)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return None
+        url, done_at = self.loading.get(self.current, (None, 0))
+        if url is not None and time.perf_counter() >= done_at:
+            self.pages[self.current] = url
+            del self.loading[self.current]
+            self.in_flight -= 1
+        return "ready" if self.current in self.pages else "loading"
+
+    @property
+    def page_source(self):
+        return f"<html><span id='productTitle'>{self.pages.get(self.current)}</span></html>"
+
+
+@pytest.fixture
+def budgets(monkeypatch):
+    monkeypatch.setattr(marketplace, "SETTINGS", {})
+    monkeypatch.setattr(marketplace, "LOADS", dict(marketplace.LOADS))
+    monkeypatch.setattr(marketplace, "_budgets", {})
+    monkeypatch.setattr(tabs, "SETTINGS", dict(tabs.SETTINGS))
+    yield
+    tabs.configure(1)
+
+
+def _run(n_tabs, urls):
+    marketplace.configure({"fr": {"min_interval": 0}})   # concurrency par défaut (1 driver)
+    tabs.configure(n_tabs)
+    driver = FakeDriver()
+    todo = deque((u.rsplit("/", 1)[-1], u, 0) for u in urls)
+    t0 = time.perf_counter()
+    got = [(item[0], err) for item, html, err in tabs.pool_for(driver).fetch_many(todo, page_type="product")]
+    return driver, got, time.perf_counter() - t0
+
+
+def test_default_budget_lets_every_tab_load(budgets):
+    urls = [f"https://www.amazon.fr/dp/A{i}" for i in range(6)]
+    driver, got, elapsed = _run(3, urls)
+    assert sorted(a for a, _ in got) == [f"A{i}" for i in range(6)]
+    assert all(err is None for _, err in got)
+    assert driver.max_in_flight == 3
+    assert elapsed < 6 * LOAD_SECONDS          # pas un chargement à la fois
+
+
+def test_explicit_concurrency_is_per_driver(budgets):
+    marketplace.configure({"fr": {"concurrency": 2, "min_interval": 0}})
+    tabs.configure(3)
+    assert marketplace.budget_for("https://www.amazon.fr/dp/X").concurrency == 6
+    tabs.configure(1)
+    assert marketplace.budget_for("https://www.amazon.fr/dp/X").concurrency == 2
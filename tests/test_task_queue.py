@@ -0,0 +1,188 @@
+# tests/test_task_queue.py
+import time
+
+import pytest
+
+from controller import task_queue
+from controller.task_queue import DONE, FAILED, LEASED, PENDING, MemoryQueue, SQLiteQueue, open_queue
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    q = MemoryQueue(max_attempts=2) if request.param == "memory" \
+        else SQLiteQueue(str(tmp_path / "q.sqlite"), max_attempts=2)
+    yield q
+    q.close()
+
+
+def test_enqueue_lease_complete(queue):
+    tid = queue.enqueue("b1", "subcategory", {"name": "Souris"}, key="sub:Souris")
+    assert queue.enqueue("b1", "subcategory", {"name": "Souris"}, key="sub:Souris") is None
+
+    task = queue.lease("w1", 60, kinds=["subcategory"], batch="b1")
+    assert task["id"] == tid and task["payload"] == {"name": "Souris"} and task["attempts"] == 1
+    assert queue.lease("w2", 60, batch="b1") is None
+    assert not queue.complete(tid, "w2", {"asins": []})   # pas son bail
+    assert queue.complete(tid, "w1", {"asins": ["A1"]})
+
+    done = queue.tasks("b1", status=DONE)
+    assert [t["result"] for t in done] == [{"asins": ["A1"]}]
+    assert queue.counts("b1") == {PENDING: 0, LEASED: 0, DONE: 1, FAILED: 0}
+
+
+def test_priority_then_fifo(queue):
+    queue.enqueue("b", "subcategory", {"n": 1})
+    queue.enqueue("b", "category", {"n": 2}, priority=1)
+    queue.enqueue("b", "subcategory", {"n": 3})
+    order = [queue.lease("w", 60)["payload"]["n"] for _ in range(3)]
+    assert order == [2, 1, 3]
+
+
+def test_expired_lease_is_released_then_failed(queue):
+    tid = queue.enqueue("b", "category", {})
+    assert queue.lease("w1", 0.01)["attempts"] == 1
+    time.sleep(0.05)
+    again = queue.lease("w2", 0.01)
+    assert again["id"] == tid and again["worker"] == "w2" and again["attempts"] == 2
+    assert not queue.heartbeat(tid, "w1", 60)   # l'ancien worker a perdu le bail
+    time.sleep(0.05)
+    assert queue.lease("w3", 60) is None        # tentatives épuisées
+    t = queue.tasks("b")[0]
+    assert t["status"] == FAILED and t["error"] == "bail expiré trop de fois"
+
+
+def test_heartbeat_keeps_lease(queue):
+    tid = queue.enqueue("b", "category", {})
+    queue.lease("w1", 0.2)
+    for _ in range(3):
+        time.sleep(0.1)
+        assert queue.heartbeat(tid, "w1", 0.2)
+    assert queue.lease("w2", 60) is None
+
+
+def test_fail_retries_up_to_max_attempts(queue):
+    tid = queue.enqueue("b", "subcategory", {})
+    queue.lease("w", 60)
+    assert queue.fail(tid, "w", "BlockedPageError: listing")
+    assert queue.tasks("b")[0]["status"] == PENDING
+    queue.lease("w", 60)
+    queue.fail(tid, "w", "BlockedPageError: listing")
+    t = queue.tasks("b")[0]
+    assert t["status"] == FAILED and t["attempts"] == 2 and t["error"].startswith("BlockedPageError")
+
+
+def test_fail_without_retry(queue):
+    tid = queue.enqueue("b", "subcategory", {})
+    queue.lease("w", 60)
+    queue.fail(tid, "w", "KeyError: x", retry=False)
+    assert queue.tasks("b")[0]["status"] == FAILED
+
+
+def test_memory_url_is_shared_within_process():
+    url = "memory://test-shared"
+    producer = open_queue(url)
+    producer.enqueue("b", "category", {"name": "mode"})
+    producer.close()
+
+    worker = open_queue(url)
+    task = worker.lease("w", 60, batch="b")
+    assert task["payload"] == {"name": "mode"}
+    assert worker.complete(task["id"], "w", {"subcategories": 0})
+    assert open_queue(url).counts("b")[DONE] == 1
+    assert open_queue("memory://autre").counts("b")[DONE] == 0
+
+
+def test_sqlite_url_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    q = open_queue("sqlite:///q/tasks.sqlite")
+    q.enqueue("b", "category", {})
+    q.close()
+    assert (tmp_path / "q" / "tasks.sqlite").exists()
+    assert task_queue.queue_scheme("memory://") == "memory"
+    assert task_queue.queue_scheme("q/tasks.sqlite") == "sqlite"
+
+
+def test_run_workers_rejects_memory_queue():
+    from controller.ScraperController.scraper_queue import run_workers
+    with pytest.raises(ValueError):
+        run_workers(2, "memory://")
+
+
+def test_lease_keeper_renews_during_long_task():
+    from controller.ScraperController.scraper_queue import LeaseKeeper
+    q = MemoryQueue()
+    tid = q.enqueue("b", "subcategory", {})
+    q.lease("w1", 0.15)
+    with LeaseKeeper(q, tid, "w1", 0.15) as keeper:
+        time.sleep(0.4)                          # plus long que le bail
+        assert q.lease("w2", 60) is None
+    assert not keeper.lost
+    assert q.complete(tid, "w1")
+
+
+def test_worker_settings_round_trip(monkeypatch):
+    from controller import freshness, marketplace, tabs
+    from controller.ScraperController import scraper_queue
+    from controller.ScraperController import scraper_default
+    monkeypatch.setattr(freshness, "SETTINGS", dict(freshness.SETTINGS))
+    monkeypatch.setattr(tabs, "SETTINGS", dict(tabs.SETTINGS))
+    monkeypatch.setattr(scraper_default, "SETTINGS", dict(scraper_default.SETTINGS))
+    monkeypatch.setattr(marketplace, "SETTINGS", {})
+    monkeypatch.setattr(marketplace, "LOADS", dict(marketplace.LOADS))
+    freshness.configure(enabled=True, budget=40)
+    marketplace.configure({"de": {"min_interval": 3}})
+    tabs.configure(4)
+    scraper_default.configure(listing_only=True)
+    snap = scraper_queue.worker_settings()
+
+    # un worker "spawn" repart des valeurs par défaut
+    freshness.configure(enabled=False)
+    marketplace.configure({})
+    tabs.configure(1)
+    scraper_default.configure(listing_only=False)
+    scraper_queue.apply_worker_settings(snap)
+
+    assert freshness.SETTINGS["enabled"] and freshness.SETTINGS["budget"] == 40
+    assert marketplace.SETTINGS == {"www.amazon.de": {"min_interval": 3}}
+    assert tabs.SETTINGS["tabs"] == 4
+    assert scraper_default.SETTINGS["listing_only"] is True
+
+
+def test_coordinator_replays_dead_letters_of_the_batch(tmp_path, monkeypatch):
+    from controller import dead_letter, fetcher
+    from controller.ScraperController import scraper_default, scraper_queue
+    monkeypatch.setattr(dead_letter, "SETTINGS", dict(dead_letter.SETTINGS, path=str(tmp_path / "dlq.json")))
+    monkeypatch.setattr(dead_letter, "_queue", None)
+    mode, sport = str(tmp_path / "mode"), str(tmp_path / "sport")
+    url = "memory://test-dlq"
+    q = open_queue(url)
+    for name, base in (("mode", mode), ("sport", sport)):
+        q.enqueue("lot", "category", {"name": name, "base_dir": base})
+    # un worker a noté un échec sous mode/ seulement
+    worker_dlq = dead_letter.DeadLetterQueue(dead_letter.SETTINGS["path"])
+    worker_dlq.add("product", "product:A1", "https://www.amazon.fr/dp/A1", "timeout", now=time.time() - 3600,
+                   asin="A1", sub_dir=str(tmp_path / "mode" / "Sacs"))
+    worker_dlq.items["product:A1"]["next_attempt"] = 0
+    worker_dlq.save()
+
+    calls, drivers = [], []
+
+    class FakeDriver:
+        def quit(self):
+            drivers.append("quit")
+    monkeypatch.setattr(fetcher, "init_driver", lambda headless=True: FakeDriver())
+
+    def fake_retry(driver, storage, out_root, results):
+        calls.append(out_root)
+        return {"products": 1, "images": 0, "recovered": 1}
+    monkeypatch.setattr(scraper_default, "retry_dead_letters", fake_retry)
+
+    assert scraper_queue.retry_batch_dead_letters("lot", [], url) == {"products": 1, "images": 0, "recovered": 1}
+    assert calls == [mode] and drivers == ["quit"]
+
+    # rien de dû : pas de driver lancé
+    worker_dlq.succeed("product:A1")
+    worker_dlq.save()
+    calls.clear()
+    assert scraper_queue.retry_batch_dead_letters("lot", [], url) == {}
+    assert calls == [] and drivers == ["quit"]
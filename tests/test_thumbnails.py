@@ -0,0 +1,44 @@
+# tests/test_thumbnails.py
+import json
+import os
+
+import pytest
+
+from utils import thumbnails
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _image(path, size):
+    Image.new("RGB", size, (200, 30, 30)).save(path, "JPEG")
+    return str(path)
+
+
+def _widths(derived):
+    return {fmt: [w for _, w in items] for fmt, items in derived.items()}
+
+
+@pytest.mark.parametrize("size, widths", [((120, 80), [120]), ((300, 200), [300]), ((1200, 800), [300, 600])])
+def test_rebuild_gives_same_derivatives(tmp_path, size, widths):
+    src = _image(tmp_path / "src.jpg", size)
+    out = str(tmp_path / "thumbs")
+    first = thumbnails.build_derivatives([src], out)
+    second = thumbnails.build_derivatives([src], out)     # tout existe déjà : rien n'est décodé
+    assert _widths(first[src]) == _widths(second[src]) == {"webp": widths, "jpeg": widths}
+    assert len(os.listdir(out)) == 2 * len(widths)
+
+
+def test_small_source_site_srcset_has_unique_widths(tmp_path):
+    import generate_html
+    d = tmp_path / "data" / "ScraperDefault" / "Souris"
+    (d / "images").mkdir(parents=True)
+    img = _image(d / "images" / "A1.jpg", (120, 80))
+    products = d / "products.json"
+    products.write_text(json.dumps([{"asin": "A1", "name": "Souris", "image_local": img}]), encoding="utf-8")
+    site = tmp_path / "site"
+    for _ in range(2):
+        generate_html.generate_site(str(tmp_path / "data"), str(site), thumbs=True, precompress=False)
+        os.utime(products)                                 # le 2e build ré-rend la catégorie
+    shard = (site / "shards" / "Souris" / "0.js").read_text(encoding="utf-8")
+    assert "120w" in shard and "-600." not in shard
+    assert not [n for n in os.listdir(site / "assets" / "thumbs") if "-600." in n]
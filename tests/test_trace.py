@@ -0,0 +1,32 @@
+# tests/test_trace.py
+import json
+
+from utils import trace
+
+
+def _write(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec) + "\n")
+
+
+def test_summarize_groups_timeouts_with_errors(tmp_path):
+    path = str(tmp_path / "trace_run.jsonl")
+    _write(path, [
+        {"run": "r", "url": "https://www.amazon.fr/dp/A1", "page_type": "product", "nav_s": 1, "outcome": "ok"},
+        {"run": "r", "url": "https://www.amazon.fr/dp/A2", "page_type": "product", "wait_s": 8, "outcome": "timeout"},
+        {"run": "r", "url": "https://www.amazon.fr/dp/A3", "page_type": "product", "wait_s": 8, "outcome": "timeout"},
+        {"run": "r", "url": "https://www.amazon.fr/s?k=x", "page_type": "listing", "wait_s": 10, "outcome": "timeout"},
+        {"run": "r", "url": "https://www.amazon.fr/dp/A4", "page_type": "product", "outcome": "error",
+         "error": "TimeoutException: page 4 lente"},
+    ])
+
+    summary = trace.summarize(path)
+
+    assert summary["outcomes"] == {"ok": 1, "timeout": 3, "error": 1}
+    clusters = {(c["outcome"], c["error"]): c["count"] for c in summary["errors"]}
+    assert clusters == {("timeout", "attente dépassée (product)"): 2,
+                        ("timeout", "attente dépassée (listing)"): 1,
+                        ("error", "TimeoutException: page # lente"): 1}
+    assert summary["errors"][0]["urls"] == ["https://www.amazon.fr/dp/A2", "https://www.amazon.fr/dp/A3"]
+    assert "2 x timeout @ www.amazon.fr : attente dépassée (product)" in trace.format_summary(summary)
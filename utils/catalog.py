@@ -0,0 +1,97 @@
+# utils/catalog.py
+# Chargement partagé des products.json sous data/ (rapports + site statique).
+# Découverte en une passe, lecture en parallèle (pool de threads, l'essentiel
+# du temps étant de l'I/O), décodage via orjson s'il est installé, et
+# restitution paresseuse dans l'ordre de découverte.
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+try:
+    import orjson as _orjson
+except Exception:
+    _orjson = None
+
+DATA_ROOT = "data"
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+
+def is_products_file(name: str) -> bool:
+    return name.lower() == "products.json"
+
+
+def is_products_like_file(name: str) -> bool:
+    """Noms acceptés par view/report_collect (products*.json, gross*.json)."""
+    low = name.lower()
+    if low in ("products.json", "grosses.json", "gross.json"):
+        return True
+    return low.endswith(".json") and ("products" in low or "gross" in low)
+
+
+def discover_product_files(data_root: str = DATA_ROOT,
+                           match: Callable[[str], bool] = is_products_file) -> List[str]:
+    """Parcourt data_root une seule fois (os.scandir) et retourne les chemins retenus."""
+    out: List[str] = []
+    stack = [data_root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for e in entries:
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    subdirs.append(e.path)
+                elif match(e.name):
+                    out.append(e.path)
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+    return out
+
+
+def load_json(path: str) -> Any:
+    """Lit et décode un fichier JSON ; None si illisible."""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        if _orjson is not None:
+            return _orjson.loads(raw)
+        return json.loads(raw.decode("utf-8"))
+    except Exception:
+        return None
+
+
+def iter_catalog(data_root: str = DATA_ROOT, files: Optional[List[str]] = None,
+                 workers: int = DEFAULT_WORKERS,
+                 match: Callable[[str], bool] = is_products_file) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (chemin, données décodées) pour chaque fichier, dans l'ordre.
+    Les lectures sont faites en parallèle avec au plus 2*workers fichiers en
+    vol, de sorte que la mémoire reste bornée même si l'appelant consomme
+    lentement. Les fichiers illisibles donnent None.
+    """
+    if files is None:
+        files = discover_product_files(data_root, match)
+    if workers <= 1 or len(files) <= 1:
+        for p in files:
+            yield p, load_json(p)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        it = iter(files)
+        for p in it:
+            pending.append((p, pool.submit(load_json, p)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            p, fut = pending.popleft()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append((nxt, pool.submit(load_json, nxt)))
+            yield p, fut.result()
@@ -1,8 +1,16 @@
 # utils/downloader.py
 import os
+import time
+import random
 import requests
 from urllib.parse import urlparse
-from requests.exceptions import RequestException
+from requests.exceptions import RequestException, HTTPError
+from utils.metrics import METRICS
+
+BACKOFF_SECONDS = 0.5       # attente avant le 2e essai, doublée à chaque essai
+MAX_BACKOFF_SECONDS = 8.0
+# codes HTTP qui valent un nouvel essai (les autres 4xx sont définitifs)
+RETRY_STATUS = (408, 425, 429)
 
 def _guess_ext_from_url(url):
     path = urlparse(url).path
@@ -11,14 +19,28 @@ def _guess_ext_from_url(url):
         return ext
     return ".jpg"
 
-def download_image(url: str, out_path: str, timeout: int = 10, retries: int = 2) -> bool:
+def _retryable(exc: RequestException) -> bool:
+    if isinstance(exc, HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        return status >= 500 or status in RETRY_STATUS
+    return True  # timeout, connexion coupée...
+
+def download_image(url: str, out_path: str, timeout: int = 10, retries: int = 2,
+                   backoff: float = BACKOFF_SECONDS) -> bool:
     """
     Télécharge l'image depuis `url` et écrit dans `out_path`.
     Retourne True si ok, False sinon.
-    Gestion simple de retry + écriture atomique.
+    Retry avec backoff exponentiel (backoff, 2*backoff... + jitter) sur les
+    erreurs passagères (réseau, 5xx, 429) ; écriture atomique.
     """
     if not url:
         return False
+    with METRICS.timer("image_download_seconds"):
+        ok = _download_image(url, out_path, timeout, retries, backoff)
+    METRICS.inc("images_downloaded", outcome="ok" if ok else "failed")
+    return ok
+
+def _download_image(url: str, out_path: str, timeout: int, retries: int, backoff: float) -> bool:
     out_dir = os.path.dirname(out_path)
     os.makedirs(out_dir, exist_ok=True)
     tmp = out_path + ".tmp"
@@ -47,14 +69,16 @@ def download_image(url: str, out_path: str, timeout: int = 10, retries: int = 2)
             # move tmp to final atomically
             os.replace(tmp, out_path)
             return True
-        except RequestException:
+        except RequestException as e:
             # remove tmp if exists
             try:
                 if os.path.exists(tmp):
                     os.remove(tmp)
             except Exception:
                 pass
-            if attempt < retries:
+            if attempt < retries and _retryable(e):
+                METRICS.inc("image_download_retries")
+                time.sleep(min(MAX_BACKOFF_SECONDS, backoff * (2 ** attempt)) * random.uniform(0.8, 1.2))
                 continue
             return False
 
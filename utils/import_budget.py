@@ -0,0 +1,90 @@
+# utils/import_budget.py
+# Garde-fou sur le temps de démarrage : importe un module dans un interpréteur
+# neuf avec -X importtime et échoue si le cumul dépasse le budget ou si un
+# module lourd (Selenium, bs4, Pillow...) est chargé alors qu'il ne devrait pas.
+#
+#   python -m utils.import_budget                 # chemin "rapport" (import main)
+#   python -m utils.import_budget --budget-ms 250 --module view.report
+import os
+import re
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_MODULE = "main"
+DEFAULT_BUDGET_MS = 150.0
+DEFAULT_RUNS = 3
+
+# modules qui ne doivent jamais être chargés par le chemin rapport / menu
+FORBIDDEN = ("selenium", "webdriver_manager", "bs4", "lxml", "PIL", "requests", "generate_html",
+             "controller.fetcher", "controller.parser")
+
+_LINE_RE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(\S+)")
+
+
+def measure(module: str = DEFAULT_MODULE, cwd: Optional[str] = None) -> Tuple[float, Dict[str, float]]:
+    """Importe module dans un sous-processus ; retourne (cumul ms de module,
+    {module importé: cumul ms}). Le démarrage de l'interpréteur n'est pas compté."""
+    cwd = cwd or os.getcwd()
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (cwd, env.get("PYTHONPATH")) if p)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"import {module} a échoué")
+    per_module: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        per_module[m.group(3)] = int(m.group(2)) / 1000.0
+    return per_module.get(module, 0.0), per_module
+
+
+def forbidden_loaded(per_module: Dict[str, float], forbidden=FORBIDDEN) -> List[str]:
+    return sorted(name for name in per_module
+                  if any(name == f or name.startswith(f + ".") for f in forbidden))
+
+
+def check(module: str = DEFAULT_MODULE, budget_ms: float = DEFAULT_BUDGET_MS, runs: int = DEFAULT_RUNS,
+          forbidden=FORBIDDEN, cwd: Optional[str] = None) -> Dict[str, object]:
+    """Meilleur temps sur `runs` imports à froid (le premier réchauffe le cache disque)."""
+    best, per_module = None, {}
+    for _ in range(max(1, runs)):
+        total, detail = measure(module, cwd)
+        if best is None or total < best:
+            best, per_module = total, detail
+    bad = forbidden_loaded(per_module, forbidden)
+    slowest = sorted(per_module.items(), key=lambda kv: kv[1], reverse=True)[:10]
+    return {"module": module, "total_ms": round(best, 1), "budget_ms": budget_ms,
+            "forbidden": bad, "slowest": slowest,
+            "ok": best <= budget_ms and not bad}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Vérifie le budget de temps d'import à froid.")
+    ap.add_argument("--module", default=DEFAULT_MODULE)
+    ap.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    ap.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    ap.add_argument("--allow", action="append", default=[], help="module lourd toléré (répétable)")
+    args = ap.parse_args(argv)
+    forbidden = tuple(f for f in FORBIDDEN if f not in args.allow)
+    try:
+        res = check(args.module, args.budget_ms, args.runs, forbidden)
+    except RuntimeError as e:
+        print(f"ERREUR: {e}", file=sys.stderr)
+        return 2
+    print(f"import {res['module']}: {res['total_ms']} ms (budget {res['budget_ms']} ms)")
+    for name, ms in res["slowest"]:
+        print(f"  {ms:8.1f} ms  {name}")
+    if res["forbidden"]:
+        print("Modules lourds chargés : " + ", ".join(res["forbidden"]), file=sys.stderr)
+    if not res["ok"]:
+        print("ÉCHEC : budget d'import dépassé.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
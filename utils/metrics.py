@@ -0,0 +1,175 @@
+# utils/metrics.py
+# Instrumentation légère des chemins chauds (navigation Chrome, attente,
+# parsing, images, écritures, rapports, site) : compteurs et histogrammes de
+# latence par run, exportés en JSON et au format textfile-collector Prometheus.
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+METRICS_DIR = os.path.join("view", "reports", "metrics")
+PROM_PREFIX = "amazon_scraper_"
+PROM_FILENAME = "amazon_scraper.prom"
+
+# bornes (secondes) des histogrammes de latence
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimation par bornes de buckets (suffisant pour repérer les lenteurs)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {str(b): n for b, n in zip(self.buckets, self.counts)},
+        }
+
+
+class MetricsRegistry:
+    """Compteurs et histogrammes nommés, avec labels ; thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters: Dict[str, Dict[LabelKey, float]] = {}
+            self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+            self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """with METRICS.timer("parse_seconds", page_type="product"): ..."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {name: [{"labels": dict(k), "value": v} for k, v in series.items()]
+                        for name, series in self.counters.items()}
+            histograms = {name: [dict(labels=dict(k), **h.to_dict()) for k, h in series.items()]
+                          for name, series in self.histograms.items()}
+        return {"started_at": datetime.utcfromtimestamp(self.started_at).isoformat() + "Z",
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "counters": counters, "histograms": histograms}
+
+    def to_prometheus(self, extra_labels: Optional[Dict[str, Any]] = None) -> str:
+        extra = _label_key(extra_labels or {})
+
+        def fmt(key: LabelKey, more: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = extra + key + more
+            if not pairs:
+                return ""
+            esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                metric = PROM_PREFIX + name + "_total"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in series.items():
+                    lines.append(f"{metric}{fmt(key)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                metric = PROM_PREFIX + name
+                lines.append(f"# TYPE {metric} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, n in zip(h.buckets, h.counts):
+                        cumulative += n
+                        lines.append(f"{metric}_bucket{fmt(key, (('le', repr(float(bound))),))} {cumulative}")
+                    lines.append(f"{metric}_bucket{fmt(key, (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{metric}_sum{fmt(key)} {h.sum:.6f}")
+                    lines.append(f"{metric}_count{fmt(key)} {h.count}")
+        metric = PROM_PREFIX + "last_run_timestamp_seconds"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric}{fmt(())} {int(time.time())}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+# raccourcis module-level
+inc = METRICS.inc
+observe = METRICS.observe
+timer = METRICS.timer
+
+
+def _atomic_write_text(path: str, text: str):
+    # le textfile collector peut lire à tout moment : écrire à côté puis renommer
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def export_metrics(kind: str, out_dir: str = METRICS_DIR, registry: MetricsRegistry = METRICS) -> Dict[str, str]:
+    """Écrit metrics_<kind>.json et amazon_scraper.prom pour le run courant."""
+    os.makedirs(out_dir, exist_ok=True)
+    json_path = os.path.join(out_dir, f"metrics_{kind}.json")
+    prom_path = os.path.join(out_dir, PROM_FILENAME)
+    payload = dict(kind=kind, **registry.snapshot())
+    _atomic_write_text(json_path, json.dumps(payload, ensure_ascii=False, indent=2))
+    _atomic_write_text(prom_path, registry.to_prometheus({"kind": kind}))
+    return {"json": json_path, "prom": prom_path}
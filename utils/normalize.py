@@ -0,0 +1,361 @@
+# utils/normalize.py
+# Normalisation des champs bruts stockés par parse_product_page, en une passe
+# sur tous les produits d'un run :
+#   price  "1 299,99 €", "$1,299.99", "1 299," (.a-price-whole) -> price_value, currency
+#   brand  "Visiter la boutique Samsung", "Marque : SAMSUNG"    -> brand_canonical
+#   seller "Expédié par Amazon. Vendu par TechStore."           -> seller_canonical
+# normalize_frame() travaille colonne par colonne avec les opérations
+# vectorisées de pandas (.str, masques booléens) ; normalize_records() est la même
+# logique enregistrement par enregistrement, gardée comme référence (et pour
+# l'historique de prix de controller/freshness, qui ne voit qu'un prix à la
+# fois). Les deux donnent le même résultat, cf. benchmarks/bench_normalize.py.
+#
+# Pour chaque marque / vendeur, la graphie canonique est la plus fréquente du
+# run parmi celles qui ne diffèrent que par la casse ("SAMSUNG" -> "Samsung").
+#
+# pandas n'est importé qu'au premier appel (_pd()), pour ne pas peser sur
+# l'import de main (cf. utils/import_budget.py).
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from .catalog import DATA_ROOT, iter_catalog
+
+REPORTS_DIR = os.path.join("view", "reports")
+
+# dossier data/ de chaque type de run (cf. controller/ScraperController)
+KIND_DIRS = {
+    "default": "ScraperDefault",
+    "categories": "ScraperCategories",
+    "all_categories": "ScraperAllCategories",
+}
+
+COLUMNS = ["asin", "name", "subcategory", "price", "brand", "seller", "rating", "url", "source"]
+OUTPUT_COLUMNS = ["asin", "name", "subcategory", "price", "price_value", "currency", "brand", "brand_canonical",
+                  "seller", "seller_canonical", "rating", "url", "source"]
+
+SETTINGS = {"enabled": True, "dir": REPORTS_DIR}
+
+# --- motifs partagés par les deux implémentations ----------------------------
+
+_PRICE_PATTERN = r"(\d[\d\s  .,]*)"
+_SPACES_PATTERN = r"[\s  ]"
+_CURRENCY_PATTERN = r"(€|EUR|£|GBP|CHF|US\$|USD|\$)"
+CURRENCIES = {"€": "EUR", "EUR": "EUR", "£": "GBP", "GBP": "GBP", "CHF": "CHF",
+              "US$": "USD", "USD": "USD", "$": "USD"}
+# devise implicite d'après le domaine (prix réduit à .a-price-whole, sans symbole)
+_TLD_PATTERN = r"amazon\.([a-z.]+?)(?:[/?#:]|$)"
+TLD_CURRENCIES = {"fr": "EUR", "de": "EUR", "it": "EUR", "es": "EUR", "nl": "EUR", "be": "EUR",
+                  "co.uk": "GBP", "com": "USD"}
+
+_BRAND_PREFIX = r"(?i)^(?:visite[rz] la boutique(?:\s+de)?|visit the|marque\s*:|brand\s*:)\s*"
+_BRAND_SUFFIX = r"(?i)\s+store$"
+_SOLD_BY = r"(?i)(?:vendu|sold)(?:\s+et\s+expédié|\s+and\s+(?:shipped|fulfilled))?\s+(?:par|by)\s+(.+)"
+_SELLER_TAIL = r"(?i)(?:\s+(?:et|and)\s+(?:expédié|shipped|fulfilled)\b.*|\.\s.*)$"
+_SHIPPING_ONLY = r"(?i)expédié|ships|shipped|fulfilled"
+_AMAZON = r"(?i)amazon(?:\.[a-z.]+|\s+eu\b.*)?"
+_STRIP_CHARS = " .,;:-"
+
+_PRICE_RE = re.compile(_PRICE_PATTERN)
+_SPACES_RE = re.compile(_SPACES_PATTERN)
+_CURRENCY_RE = re.compile(_CURRENCY_PATTERN)
+_TLD_RE = re.compile(_TLD_PATTERN)
+_WS_RE = re.compile(r"\s+")
+_BRAND_PREFIX_RE = re.compile(_BRAND_PREFIX)
+_BRAND_SUFFIX_RE = re.compile(_BRAND_SUFFIX)
+_SOLD_BY_RE = re.compile(_SOLD_BY)
+_SELLER_TAIL_RE = re.compile(_SELLER_TAIL)
+_SHIPPING_ONLY_RE = re.compile(_SHIPPING_ONLY)
+_AMAZON_RE = re.compile(_AMAZON)
+
+_pd_module = None
+_pd_checked = False
+
+
+def _pd():
+    """Module pandas, importé à la première utilisation ; None si absent."""
+    global _pd_module, _pd_checked
+    if not _pd_checked:
+        _pd_checked = True
+        try:
+            import pandas
+            _pd_module = pandas
+        except Exception:
+            _pd_module = None
+    return _pd_module
+
+
+def configure(enabled: Optional[bool] = None, directory: Optional[str] = None):
+    if enabled is not None:
+        SETTINGS["enabled"] = bool(enabled)
+    if directory is not None:
+        SETTINGS["dir"] = directory
+
+
+def enabled() -> bool:
+    return SETTINGS["enabled"]
+
+
+# --- par enregistrement --------------------------------------------------------
+
+def parse_price(value: Any) -> Optional[float]:
+    """'1 299,99 €' -> 1299.99 ; '$1,299.99' -> 1299.99 ; None si illisible."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value) if value == value else None   # NaN -> None
+    if not isinstance(value, str):
+        return None          # None, listes, dicts... : pas un prix
+    m = _PRICE_RE.search(value)
+    if not m:
+        return None
+    s = _SPACES_RE.sub("", m.group(0)).rstrip(".,")
+    if "," in s and "." in s:
+        # le dernier séparateur est le séparateur décimal
+        if s.rfind(",") > s.rfind("."):
+            s = s.replace(".", "").replace(",", ".")
+        else:
+            s = s.replace(",", "")
+    elif "," in s:
+        head, _, tail = s.rpartition(",")
+        s = head.replace(",", "") + "." + tail if len(tail) != 3 else s.replace(",", "")
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def parse_currency(price: Any, url: Any = None) -> Optional[str]:
+    """Code ISO de la devise du prix, sinon celle de la marketplace de url."""
+    m = _CURRENCY_RE.search(str(price)) if isinstance(price, str) else None
+    if m:
+        return CURRENCIES[m.group(1)]
+    m = _TLD_RE.search(url) if isinstance(url, str) else None
+    return TLD_CURRENCIES.get(m.group(1)) if m else None
+
+
+def _clean(value: Any) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    return _WS_RE.sub(" ", value).strip() or None
+
+
+def clean_brand(value: Any) -> Optional[str]:
+    s = _clean(value)
+    if s is None:
+        return None
+    s = _BRAND_SUFFIX_RE.sub("", _BRAND_PREFIX_RE.sub("", s)).strip(_STRIP_CHARS)
+    return s or None
+
+
+def clean_seller(value: Any) -> Optional[str]:
+    s = _clean(value)
+    if s is None:
+        return None
+    m = _SOLD_BY_RE.search(s)
+    if m:
+        s = _SELLER_TAIL_RE.sub("", m.group(1))
+    elif _SHIPPING_ONLY_RE.search(s):
+        return None          # "Expédié par Amazon." : le vendeur n'est pas indiqué
+    s = s.strip(_STRIP_CHARS)
+    if _AMAZON_RE.fullmatch(s):
+        return "Amazon"
+    return s or None
+
+
+def _canonical_spellings(values: Iterable[Optional[str]]) -> Dict[str, str]:
+    """casefold -> graphie la plus fréquente (à égalité, la plus petite)."""
+    counts = Counter(v for v in values if v)
+    best: Dict[str, str] = {}
+    for v, n in counts.items():
+        key = v.casefold()
+        cur = best.get(key)
+        if cur is None or (-n, v) < (-counts[cur], cur):
+            best[key] = v
+    return best
+
+
+def normalize_records(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Version enregistrement par enregistrement de normalize_frame()."""
+    out = []
+    for rec in records:
+        row = {c: rec.get(c) for c in COLUMNS}
+        value = parse_price(row["price"])
+        row["price_value"] = value
+        row["currency"] = parse_currency(row["price"], row["url"]) if value is not None else None
+        row["brand_canonical"] = clean_brand(row["brand"])
+        row["seller_canonical"] = clean_seller(row["seller"])
+        out.append(row)
+    for col in ("brand_canonical", "seller_canonical"):
+        best = _canonical_spellings(r[col] for r in out)
+        for r in out:
+            if r[col]:
+                r[col] = best[r[col].casefold()]
+    return [{c: r[c] for c in OUTPUT_COLUMNS} for r in out]
+
+
+# --- vectorisé (pandas) ------------------------------------------------------
+# Sans pyarrow, les méthodes .str de pandas bouclent en Python sur chaque
+# élément : les opérations texte portent donc sur les valeurs distinctes
+# (pd.factorize), peu nombreuses pour une marque, un vendeur ou un prix, et le
+# résultat est redistribué sur les lignes par take().
+
+def _scalar(value):
+    return value if isinstance(value, (str, int, float)) else None
+
+
+def _distinct(col):
+    """(codes, valeurs distinctes en Series objet) ; NA -> code -1. Les valeurs
+    non scalaires (listes, dicts : non hashables) comptent comme NA."""
+    pd = _pd()
+    try:
+        codes, uniques = pd.factorize(col)
+    except TypeError:
+        # rare : on ne paie le passage Python sur chaque ligne que dans ce cas
+        codes, uniques = pd.factorize(col.astype(object).map(_scalar))
+    return codes, pd.Series(uniques, dtype=object)
+
+
+def _take(values, codes, index):
+    """values[codes] avec NA pour le code -1, sur l'index des lignes."""
+    pd = _pd()
+    return pd.Series(pd.api.extensions.take(values.array, codes, allow_fill=True), index=index)
+
+
+def _strings(raw):
+    """Valeurs str de raw (le reste -> NA), en dtype string."""
+    return raw.where(raw.map(type).eq(str)).astype("string")
+
+
+def _clean_series(col):
+    return col.str.replace(r"\s+", " ", regex=True).str.strip().replace("", None)
+
+
+def _price_values(price):
+    num = price.str.extract(_PRICE_PATTERN, expand=False)
+    num = num.str.replace(_SPACES_PATTERN, "", regex=True).str.rstrip(".,")
+    last_comma = num.str.rfind(",")
+    last_dot = num.str.rfind(".")
+    has_comma = last_comma >= 0
+    has_dot = last_dot >= 0
+    tail3 = (num.str.len() - last_comma - 1) == 3
+    comma_decimal = (has_comma & has_dot & (last_comma > last_dot)) | (has_comma & ~has_dot & ~tail3)
+    comma_thousands = (has_comma & has_dot & (last_dot > last_comma)) | (has_comma & ~has_dot & tail3)
+    # virgule décimale : les points sont des milliers, la dernière virgule devient le point
+    as_decimal = num.str.replace(".", "", regex=False).str.replace(r",(?=[^,]*$)", ".", regex=True)
+    as_decimal = as_decimal.str.replace(",", "", regex=False)
+    num = num.mask(comma_decimal.fillna(False), as_decimal)
+    num = num.mask(comma_thousands.fillna(False), num.str.replace(",", "", regex=False))
+    return _pd().to_numeric(num, errors="coerce")
+
+
+def _clean_brands(brand):
+    brand = _clean_series(brand)
+    brand = brand.str.replace(_BRAND_PREFIX, "", regex=True).str.replace(_BRAND_SUFFIX, "", regex=True)
+    return brand.str.strip(_STRIP_CHARS).replace("", None)
+
+
+def _clean_sellers(seller):
+    seller = _clean_series(seller)
+    sold_by = seller.str.extract(_SOLD_BY, expand=False).str.replace(_SELLER_TAIL, "", regex=True)
+    shipping_only = seller.str.contains(_SHIPPING_ONLY, regex=True).fillna(False)
+    seller = sold_by.fillna(seller.mask(shipping_only)).str.strip(_STRIP_CHARS).replace("", None)
+    return seller.mask(seller.str.fullmatch(_AMAZON).fillna(False), "Amazon")
+
+
+def _canonical_series(values):
+    """Chaque valeur -> graphie la plus fréquente de sa forme casefold."""
+    import numpy as np
+    pd = _pd()
+    codes, uniques = _distinct(values)
+    if not len(uniques):
+        return values
+    table = pd.DataFrame({"value": uniques.astype("string"),
+                          "n": np.bincount(codes[codes >= 0], minlength=len(uniques))})
+    table["key"] = table["value"].str.casefold()
+    best = table.sort_values(["key", "n", "value"], ascending=[True, False, True]).drop_duplicates("key")
+    canonical = table["key"].map(dict(zip(best["key"], best["value"]))).astype("string")
+    return _take(canonical, codes, values.index)
+
+
+def normalize_frame(df):
+    """
+    Ajoute price_value (float), currency (code ISO), brand_canonical et
+    seller_canonical à un DataFrame de produits (colonnes de COLUMNS, les
+    absentes valent NA). Retourne un nouveau DataFrame aux colonnes OUTPUT_COLUMNS.
+    """
+    pd = _pd()
+    if pd is None:
+        raise RuntimeError("pandas n'est pas installé (pip install pandas)")
+    out = df.reindex(columns=COLUMNS).copy()
+
+    codes, raw = _distinct(out["price"])
+    numeric = raw.map(type).isin([int, float])
+    price = _strings(raw)
+    # prix déjà numériques : repris tels quels
+    # float64 d'abord : to_numeric peut rendre Int64 ("12 €"), où un 3.2 ne rentre pas
+    value = _price_values(price).astype("float64").mask(numeric, pd.to_numeric(raw.where(numeric), errors="coerce"))
+    currency = price.str.extract(_CURRENCY_PATTERN, expand=False).map(CURRENCIES).astype("string")
+    out["price_value"] = _take(value.astype("float64"), codes, out.index)
+    currency = _take(currency, codes, out.index)
+    priced = out["price_value"].notna()
+    # pas de devise dans le prix : celle de la marketplace (URLs toutes distinctes,
+    # on ne les regarde que pour ces lignes)
+    missing = currency.isna() & priced
+    if missing.any():
+        urls = _strings(out.loc[missing, "url"].astype(object))
+        currency = currency.fillna(urls.str.extract(_TLD_PATTERN, expand=False).map(TLD_CURRENCIES))
+    out["currency"] = currency.where(priced)
+
+    codes, raw = _distinct(out["brand"])
+    out["brand_canonical"] = _canonical_series(_take(_clean_brands(_strings(raw)), codes, out.index))
+    codes, raw = _distinct(out["seller"])
+    out["seller_canonical"] = _canonical_series(_take(_clean_sellers(_strings(raw)), codes, out.index))
+    return out[OUTPUT_COLUMNS]
+
+
+def frame_to_records(df) -> List[Dict[str, Any]]:
+    """Lignes du DataFrame en dicts, NA/NaN -> None (comparaison avec normalize_records)."""
+    pd = _pd()
+    obj = df.astype(object)
+    return obj.where(pd.notna(obj), None).to_dict("records")
+
+
+# --- étape de run ------------------------------------------------------------
+
+def load_frame(data_root: str = DATA_ROOT, files: Optional[List[str]] = None):
+    """Tous les products.json sous data_root en un DataFrame (colonne source = dossier)."""
+    pd = _pd()
+    if pd is None:
+        raise RuntimeError("pandas n'est pas installé (pip install pandas)")
+    records: List[Dict[str, Any]] = []
+    for path, data in iter_catalog(data_root, files=files):
+        if not isinstance(data, list):
+            continue
+        source = os.path.relpath(os.path.dirname(path), data_root)
+        for rec in data:
+            if isinstance(rec, dict):
+                records.append(dict(rec, source=source))
+    return pd.DataFrame.from_records(records, columns=COLUMNS) if records else pd.DataFrame(columns=COLUMNS)
+
+
+def output_path(kind: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or SETTINGS["dir"], f"products_normalized_{kind}.csv")
+
+
+def normalize_run(kind: str, data_root: str = DATA_ROOT, directory: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Normalise les produits d'un type de run (data/<KIND_DIRS[kind]>, tout
+    data_root pour un kind inconnu) et écrit view/reports/products_normalized_<kind>.csv.
+    """
+    started = time.perf_counter()
+    root = os.path.join(data_root, KIND_DIRS[kind]) if kind in KIND_DIRS else data_root
+    df = normalize_frame(load_frame(root))
+    path = output_path(kind, directory)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    df.to_csv(tmp, index=False, encoding="utf-8")
+    os.replace(tmp, path)
+    return {"path": path, "rows": int(len(df)), "priced": int(df["price_value"].notna().sum()),
+            "brands": int(df["brand_canonical"].nunique()), "sellers": int(df["seller_canonical"].nunique()),
+            "seconds": round(time.perf_counter() - started, 3)}
@@ -0,0 +1,164 @@
+# utils/streaming.py
+# Mode "mémoire bornée" pour les très gros catalogues : les trois étapes
+# (scrape, rapport, site) traitent les produits par paquets au lieu de tout
+# garder en mémoire. Réglage global (comme METRICS) posé une fois par main.py
+# via configure() ; chaque étape lit SETTINGS.
+#
+#   - iter_json_array()  lit un products.json élément par élément
+#   - MemoryBudget       surveille le RSS et réduit la taille des paquets
+#                        quand le plafond configuré est dépassé
+import gc
+import os
+import json
+import sys
+from typing import Any, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except Exception:  # Windows
+    resource = None
+
+DEFAULT_CHUNK = 256            # produits traités par paquet
+MIN_CHUNK = 16
+REPORT_MAX_NAMES = 50          # noms de produits gardés par sous-catégorie dans le rapport
+READ_BLOCK = 1 << 16
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+SETTINGS = {
+    "enabled": False,
+    "memory_mb": None,         # plafond de RSS (Mo) ; None = pas de plafond
+    "chunk": DEFAULT_CHUNK,
+    "report_max_names": REPORT_MAX_NAMES,
+}
+
+
+def configure(enabled: bool = True, memory_mb: Optional[float] = None, chunk: Optional[int] = None,
+              report_max_names: Optional[int] = None):
+    SETTINGS["enabled"] = bool(enabled)
+    SETTINGS["memory_mb"] = memory_mb
+    if chunk:
+        SETTINGS["chunk"] = max(MIN_CHUNK, int(chunk))
+    if report_max_names is not None:
+        SETTINGS["report_max_names"] = int(report_max_names)
+
+
+def enabled() -> bool:
+    return SETTINGS["enabled"]
+
+
+def current_rss_mb() -> Optional[float]:
+    """RSS courant (Linux : /proc), sinon pic de RSS via getrusage."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ko sous Linux, octets sous macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class MemoryBudget:
+    """Taille de paquet adaptative : divisée par deux (jusqu'à MIN_CHUNK) tant
+    que le RSS dépasse le plafond après un gc.collect()."""
+
+    def __init__(self, memory_mb: Optional[float] = None, chunk: Optional[int] = None):
+        self.memory_mb = memory_mb if memory_mb is not None else SETTINGS["memory_mb"]
+        self.chunk = chunk or SETTINGS["chunk"]
+        self.warned = False
+
+    def check(self) -> int:
+        if not self.memory_mb:
+            return self.chunk
+        rss = current_rss_mb()
+        if rss is not None and rss > self.memory_mb:
+            gc.collect()
+            rss = current_rss_mb()
+            if rss is not None and rss > self.memory_mb and self.chunk > MIN_CHUNK:
+                self.chunk = max(MIN_CHUNK, self.chunk // 2)
+                if not self.warned:
+                    print(f"[streaming] RSS {rss:.0f} Mo > plafond {self.memory_mb:.0f} Mo : paquets réduits à {self.chunk}")
+                    self.warned = True
+        return self.chunk
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_json_array(path: str, block: int = READ_BLOCK) -> Iterator[Any]:
+    """
+    Yield les éléments d'un fichier JSON un par un sans charger tout le
+    fichier : un tableau [...] est lu élément par élément ; un objet enveloppe
+    ({"products": [...]}) ou tout autre document est décodé en entier puis
+    déplié (cas marginal, fichiers hérités). Fichier illisible : rien.
+    """
+    decoder = json.JSONDecoder()
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except OSError:
+        return
+    with f:
+        buf = f.read(block)
+        pos = 0
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if not buf[pos:pos + 1] == "[":
+            try:
+                data = json.loads(buf + f.read())
+            except Exception:
+                return
+            if isinstance(data, dict):
+                for key in ("products", "items", "results"):
+                    if isinstance(data.get(key), list):
+                        yield from data[key]
+                        return
+                yield data
+            return
+        pos += 1
+        eof = False
+        while True:
+            # sauter blancs et virgules ; recharger si le tampon est épuisé
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ","):
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    return
+                buf, pos = f.read(block), 0
+                eof = not buf
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    return  # tableau tronqué : on s'arrête au dernier élément complet
+                more = f.read(block)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            if not eof and (end == len(buf) or (isinstance(item, (int, float)) and buf[end] in _NUMBER_CHARS)):
+                # un nombre peut être coupé en fin de tampon ("-0." | "000125") :
+                # relire avec la suite
+                more = f.read(block)
+                if more:
+                    buf, pos = buf[pos:] + more, 0
+                    continue
+                eof = True
+            yield item
+            pos = end
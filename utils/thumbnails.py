@@ -0,0 +1,137 @@
+# utils/thumbnails.py
+# Dérivés d'images pour le site statique : vignettes redimensionnées en WebP
+# (format moderne) + JPEG (repli), nommées par hash du contenu source pour
+# être réutilisées d'un build à l'autre et entre catégories.
+# Pillow est optionnel : sans lui, available() renvoie False et le site garde
+# les images d'origine. Il n'est importé qu'au premier besoin (_pil()).
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Image = None
+_pil_checked = False
+
+# boîtes (largeur, hauteur) : 1x et 2x de la zone image d'une carte (~280x200)
+THUMB_BOXES: Tuple[Tuple[int, int], ...] = ((300, 200), (600, 400))
+WEBP_QUALITY = 78
+JPEG_QUALITY = 82
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def _pil():
+    """Module PIL.Image, importé à la première utilisation ; None si absent."""
+    global Image, _pil_checked
+    if not _pil_checked:
+        _pil_checked = True
+        try:
+            from PIL import Image as _Image
+            Image = _Image
+        except Exception:
+            Image = None
+    return Image
+
+
+def available() -> bool:
+    return _pil() is not None
+
+
+def file_hash(path: str, chunk_size: int = 1 << 16) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_hash(path: str, cache: Optional[Dict[str, Dict]] = None) -> str:
+    """Hash du contenu, mémorisé dans cache par (taille, mtime) pour éviter de
+    relire les sources inchangées."""
+    st = os.stat(path)
+    if cache is not None:
+        hit = cache.get(path)
+        if hit and hit.get("size") == st.st_size and hit.get("mtime") == st.st_mtime_ns:
+            return hit["hash"]
+    digest = file_hash(path)
+    if cache is not None:
+        cache[path] = {"size": st.st_size, "mtime": st.st_mtime_ns, "hash": digest}
+    return digest
+
+
+def make_derivatives(src: str, out_dir: str, digest: str) -> Optional[Dict[str, List[Tuple[str, int]]]]:
+    """
+    Produit les vignettes de src dans out_dir et retourne
+    {"webp": [(chemin, largeur), ...], "jpeg": [...]} ou None si échec.
+    Les fichiers déjà présents (même hash) ne sont pas régénérés.
+    """
+    if _pil() is None:
+        return None
+    os.makedirs(out_dir, exist_ok=True)
+    out: Dict[str, List[Tuple[str, int]]] = {"webp": [], "jpeg": []}
+    img = None
+    try:
+        # taille lue dans l'en-tête (pas de décodage) : vaut aussi quand les
+        # vignettes existent déjà et que img n'est jamais chargée
+        with Image.open(src) as probe:
+            src_w, src_h = probe.size
+        for box_w, box_h in THUMB_BOXES:
+            base = os.path.join(out_dir, f"{digest[:16]}-{box_w}")
+            webp, jpeg = base + ".webp", base + ".jpg"
+            if os.path.exists(webp) and os.path.exists(jpeg):
+                with Image.open(jpeg) as done:
+                    width = done.width
+            else:
+                if img is None:
+                    img = Image.open(src)
+                    img.load()
+                    if img.mode not in ("RGB", "RGBA"):
+                        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+                thumb = img.copy()
+                thumb.thumbnail((box_w, box_h), Image.LANCZOS)
+                thumb.save(webp, "WEBP", quality=WEBP_QUALITY, method=4)
+                if thumb.mode == "RGBA":
+                    bg = Image.new("RGB", thumb.size, (255, 255, 255))
+                    bg.paste(thumb, mask=thumb.split()[-1])
+                    thumb = bg
+                thumb.save(jpeg, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+                width = thumb.width
+            if out["jpeg"] and out["jpeg"][-1][1] >= width:
+                break  # même largeur que la boîte précédente : descripteur srcset en double
+            out["webp"].append((webp, width))
+            out["jpeg"].append((jpeg, width))
+            # une source plus petite que la boîte donne la même vignette : inutile d'aller plus loin
+            if src_w <= box_w and src_h <= box_h:
+                break
+        return out
+    except Exception:
+        return None
+    finally:
+        if img is not None:
+            try:
+                img.close()
+            except Exception:
+                pass
+
+
+def build_derivatives(sources: Iterable[str], out_dir: str, hash_cache: Optional[Dict[str, Dict]] = None,
+                      workers: int = DEFAULT_WORKERS) -> Dict[str, Dict[str, List[Tuple[str, int]]]]:
+    """Génère en parallèle les dérivés de chaque source ; {source: dérivés}."""
+    if _pil() is None:
+        return {}
+    unique = sorted(set(sources))
+    digests = {}
+    for src in unique:
+        try:
+            digests[src] = source_hash(src, hash_cache)
+        except OSError:
+            continue
+
+    def job(src):
+        return src, make_derivatives(src, out_dir, digests[src])
+
+    results: Dict[str, Dict[str, List[Tuple[str, int]]]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for src, derived in pool.map(job, list(digests)):
+            if derived:
+                results[src] = derived
+    return results
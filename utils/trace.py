@@ -0,0 +1,296 @@
+# utils/trace.py
+# Trace structurée par URL (JSON Lines, une ligne par page chargée) pour
+# analyser les pages lentes et les erreurs d'un run :
+#   run, ts, url, page_type, nav_s, wait_s, parse_s, bytes, outcome, retry, error
+# fetch_page note la partie chargement, le scraper complète avec le parsing et
+# le numéro d'essai (done) ; l'écriture se fait dans un thread dédié pour ne
+# pas ralentir la boucle de scrape. summarize() liste les URLs les plus lentes
+# et regroupe les erreurs (timeouts compris).
+import os
+import re
+import json
+import heapq
+import time
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+TRACE_DIR = os.path.join("view", "reports", "traces")
+MAX_PENDING = 256     # chargements en attente de leur parsing (au-delà : écrits tels quels)
+
+SETTINGS = {"enabled": True, "dir": TRACE_DIR}
+
+_STOP = object()
+
+
+class TraceWriter:
+    """Écrit les enregistrements reçus dans un fichier JSONL depuis un thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        self.count = 0
+        self._q: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: Dict[str, Any]):
+        self._q.put(record)
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                rec = self._q.get()
+                if rec is _STOP:
+                    break
+                try:
+                    f.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+                    self.count += 1
+                except Exception:
+                    continue
+                if self._q.empty():
+                    f.flush()
+
+    def close(self, timeout: float = 5.0):
+        self._q.put(_STOP)
+        self._thread.join(timeout)
+
+
+_lock = threading.Lock()
+_writer: Optional[TraceWriter] = None
+_run_id: Optional[str] = None
+_pending: "OrderedDict" = OrderedDict()   # (thread, url) -> enregistrement sans parsing
+
+
+def configure(enabled: Optional[bool] = None, directory: Optional[str] = None):
+    if enabled is not None:
+        SETTINGS["enabled"] = bool(enabled)
+    if directory is not None:
+        SETTINGS["dir"] = directory
+
+
+def new_run_id(kind: str = "run") -> str:
+    return f"{kind}_{datetime.now().strftime('%Y%m%d-%H%M%S')}_{os.getpid()}"
+
+
+def trace_path(run_id: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or SETTINGS["dir"], f"trace_{run_id}.jsonl")
+
+
+def start(kind: str = "run", run_id: Optional[str] = None) -> Optional[str]:
+    """Ouvre la trace d'un run ; retourne son chemin (None si désactivée)."""
+    global _writer, _run_id
+    if not SETTINGS["enabled"]:
+        return None
+    stop()
+    _run_id = run_id or new_run_id(kind)
+    os.makedirs(SETTINGS["dir"], exist_ok=True)
+    path = trace_path(_run_id)
+    with _lock:
+        _writer = TraceWriter(path)
+    return path
+
+
+def current_run() -> Optional[str]:
+    """Identifiant du run en cours de trace (None si aucune trace ouverte)."""
+    return _run_id if _writer is not None else None
+
+
+def stop() -> Optional[str]:
+    """Écrit les chargements restés en attente et ferme la trace."""
+    global _writer
+    w = _current_writer()
+    if w is None:
+        return None
+    with _lock:
+        rest = list(_pending.values())
+        _pending.clear()
+        _writer = None
+    for rec in rest:
+        w.emit(rec)
+    w.close()
+    return w.path
+
+
+def _current_writer() -> Optional[TraceWriter]:
+    # processus fils (workers multiprocessing) : le thread d'écriture du
+    # parent n'existe pas ici, on ouvre un fichier propre au processus
+    global _writer
+    w = _writer
+    if w is None or w.pid == os.getpid():
+        return w
+    with _lock:
+        if _writer is w:
+            _pending.clear()
+            _writer = TraceWriter(trace_path(f"{_run_id}-p{os.getpid()}"))
+        return _writer
+
+
+def _emit(rec: Dict[str, Any]):
+    w = _current_writer()
+    if w is not None:
+        w.emit(rec)
+
+
+def fetch(url: str, page_type: Optional[str] = None, start: Optional[float] = None,
+          nav_s: Optional[float] = None, wait_s: Optional[float] = None, size: Optional[int] = None,
+          outcome: str = "ok", error: Optional[str] = None, **extra):
+    """Chargement d'une page ; l'enregistrement attend done() pour le parsing."""
+    if _current_writer() is None:
+        return
+    rec = {"run": _run_id, "ts": round(start or time.time(), 3), "url": url, "page_type": page_type or "other",
+           "nav_s": _round(nav_s), "wait_s": _round(wait_s), "parse_s": None, "bytes": size,
+           "outcome": outcome, "retry": 0, "error": error, "worker": threading.current_thread().name}
+    rec.update(extra)
+    key = (threading.get_ident(), url)
+    flushed = []
+    with _lock:
+        old = _pending.pop(key, None)
+        if old is not None:
+            flushed.append(old)
+        _pending[key] = rec
+        while len(_pending) > MAX_PENDING:
+            flushed.append(_pending.popitem(last=False)[1])
+    for r in flushed:
+        _emit(r)
+
+
+def done(url: str, parse_s: Optional[float] = None, outcome: Optional[str] = None,
+         retry: Optional[int] = None, error: Optional[str] = None, **extra):
+    """Complète (ou crée) l'enregistrement de url et l'écrit."""
+    if _current_writer() is None:
+        return
+    with _lock:
+        rec = _pending.pop((threading.get_ident(), url), None)
+    if rec is None:
+        rec = {"run": _run_id, "ts": round(time.time(), 3), "url": url, "page_type": "other",
+               "nav_s": None, "wait_s": None, "parse_s": None, "bytes": None, "outcome": "ok",
+               "retry": 0, "error": None, "worker": threading.current_thread().name}
+    if parse_s is not None:
+        rec["parse_s"] = _round(parse_s)
+    if outcome is not None:
+        rec["outcome"] = outcome
+    if retry is not None:
+        rec["retry"] = retry
+    if error is not None:
+        rec["error"] = error
+    rec.update(extra)
+    _emit(rec)
+
+
+def _round(v: Optional[float]) -> Optional[float]:
+    return None if v is None else round(v, 4)
+
+
+# --- analyse -----------------------------------------------------------------
+
+def resolve(target: Optional[str] = None, directory: Optional[str] = None) -> Optional[str]:
+    """Chemin d'une trace : fichier, identifiant de run, ou la plus récente."""
+    directory = directory or SETTINGS["dir"]
+    if target and os.path.isfile(target):
+        return target
+    if target:
+        path = trace_path(target, directory)
+        return path if os.path.isfile(path) else None
+    try:
+        files = [os.path.join(directory, f) for f in os.listdir(directory)
+                 if f.startswith("trace_") and f.endswith(".jsonl")]
+    except OSError:
+        return None
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def _total(rec: Dict[str, Any]) -> float:
+    return sum(rec.get(k) or 0 for k in ("nav_s", "wait_s", "parse_s"))
+
+
+_NOISE_RE = re.compile(r"https?://\S+|0x[0-9a-f]+|\d+", re.I)
+
+
+def _error_key(rec: Dict[str, Any]) -> str:
+    msg = (rec.get("error") or "").splitlines()[0] if rec.get("error") else ""
+    if not msg and rec.get("outcome") == "timeout":
+        # les attentes dépassées n'ont pas de message : on les regroupe par type de page
+        msg = f"attente dépassée ({rec.get('page_type') or 'other'})"
+    return _NOISE_RE.sub("#", msg)[:80]
+
+
+def summarize(path: str, top: int = 10) -> Dict[str, Any]:
+    """URLs les plus lentes, répartition des issues, erreurs et attentes
+    dépassées regroupées (issue, hôte, message sans chiffres ni URLs)."""
+    slowest: List[tuple] = []     # tas des `top` plus lents : (secondes, n°, ligne)
+    outcomes: Dict[str, int] = {}
+    types: Dict[str, Dict[str, Any]] = {}
+    clusters: Dict[tuple, Dict[str, Any]] = {}
+    runs = set()
+    count = 0
+    for rec in iter_records(path):
+        count += 1
+        runs.add(rec.get("run"))
+        outcome = rec.get("outcome") or "ok"
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        total = _total(rec)
+        t = types.setdefault(rec.get("page_type") or "other", {"count": 0, "seconds": 0.0, "max": 0.0})
+        t["count"] += 1
+        t["seconds"] += total
+        t["max"] = max(t["max"], total)
+        row = {"url": rec.get("url"), "page_type": rec.get("page_type"), "seconds": round(total, 3),
+               "outcome": outcome, "retry": rec.get("retry", 0)}
+        if len(slowest) < top:
+            heapq.heappush(slowest, (total, count, row))
+        elif top > 0:
+            heapq.heappushpop(slowest, (total, count, row))
+        if outcome != "ok":
+            key = (outcome, (urlparse(rec.get("url") or "").netloc or ""), _error_key(rec))
+            c = clusters.setdefault(key, {"outcome": key[0], "host": key[1], "error": key[2],
+                                          "count": 0, "urls": []})
+            c["count"] += 1
+            if len(c["urls"]) < 3:
+                c["urls"].append(rec.get("url"))
+    for t in types.values():
+        t["mean"] = round(t["seconds"] / t["count"], 3) if t["count"] else 0.0
+        t["seconds"] = round(t["seconds"], 3)
+        t["max"] = round(t["max"], 3)
+    return {"path": path, "runs": sorted(r for r in runs if r), "records": count, "outcomes": outcomes,
+            "page_types": types, "slowest": [r for _, _, r in sorted(slowest, key=lambda x: (-x[0], x[1]))],
+            "errors": sorted(clusters.values(), key=lambda c: -c["count"])}
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [f"Trace : {summary['path']}",
+             f"Run(s) : {', '.join(summary['runs']) or '-'} | {summary['records']} page(s)",
+             "Issues : " + (", ".join(f"{k} {v}" for k, v in sorted(summary["outcomes"].items())) or "-"), ""]
+    lines.append("Par type de page (nombre, moyenne, max) :")
+    for name, t in sorted(summary["page_types"].items()):
+        lines.append(f"  {name:<10} {t['count']:>5}  {t['mean']:>7.2f}s  {t['max']:>7.2f}s")
+    lines.append("")
+    lines.append(f"URLs les plus lentes ({len(summary['slowest'])}) :")
+    for r in summary["slowest"]:
+        extra = f" [{r['outcome']}]" if r["outcome"] != "ok" else ""
+        retry = f" (essai {r['retry'] + 1})" if r.get("retry") else ""
+        lines.append(f"  {r['seconds']:>7.2f}s  {r['page_type'] or '-':<9} {r['url']}{extra}{retry}")
+    lines.append("")
+    if summary["errors"]:
+        lines.append("Erreurs regroupées :")
+        for c in summary["errors"]:
+            lines.append(f"  {c['count']:>4} x {c['outcome']} @ {c['host'] or '-'} : {c['error'] or '-'}")
+            for u in c["urls"]:
+                lines.append(f"         {u}")
+    else:
+        lines.append("Aucune erreur.")
+    return "\n".join(lines)
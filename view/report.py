@@ -3,6 +3,11 @@ import os
 import json
 from datetime import datetime
 from typing import List, Dict, Any, Tuple, Optional
+from utils.metrics import METRICS
+from utils.catalog import discover_product_files, iter_catalog, load_json
+from utils import streaming
+from utils import trace
+from view.report_archive import apply_retention, apply_trace_retention, diff_runs, format_diff_text, list_archives
 
 REPORTS_DIR = os.path.join("view", "reports")
 DATA_ROOT = "data"
@@ -12,20 +17,10 @@ def ensure_reports_dir(path: str = REPORTS_DIR):
 
 def find_products_files(data_root: str = DATA_ROOT) -> List[str]:
     """Trouve tous les fichiers 'products.json' sous data_root."""
-    files = []
-    for root, _, filenames in os.walk(data_root):
-        for fn in filenames:
-            if fn.lower() == "products.json":
-                files.append(os.path.join(root, fn))
-    return files
+    return discover_product_files(data_root)
 
-def read_products(path: str) -> List[Dict[str, Any]]:
-    """Lit un products.json et retourne la liste d'objets (tolérant)."""
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        return []
+def _records_from_data(data: Any) -> List[Dict[str, Any]]:
+    """Extrait la liste de produits d'un JSON décodé (tolérant)."""
     if isinstance(data, list):
         return data
     if isinstance(data, dict):
@@ -33,14 +28,13 @@ def read_products(path: str) -> List[Dict[str, Any]]:
         for key in ("products", "items", "results"):
             if isinstance(data.get(key), list):
                 return data[key]
-        # sinon si dictionnaire de produits, tenter d'extraire
-        vals = []
-        for v in data.values():
-            if isinstance(v, dict) or isinstance(v, list):
-                vals.append(v)
         # on ne tente pas des conversions complexes — renvoyer vide si doute
     return []
 
+def read_products(path: str) -> List[Dict[str, Any]]:
+    """Lit un products.json et retourne la liste d'objets (tolérant)."""
+    return _records_from_data(load_json(path))
+
 def _product_name_from_record(rec: Any) -> str:
     """Récupère un nom lisible depuis un enregistrement produit."""
     if isinstance(rec, dict):
@@ -53,37 +47,96 @@ def _product_name_from_record(rec: Any) -> str:
             return f"{asin}"
     return "Produit sans nom"
 
-def build_report(data_root: str = DATA_ROOT) -> Dict[str, Any]:
+STAT_COUNTERS = ("found", "already_processed", "fetched", "parse_failures",
+                 "image_failures", "errors", "blocked", "skipped_fresh", "from_listing", "recovered", "written", "saved")
+
+def _rel_dir(path: str, data_root: str = DATA_ROOT) -> str:
+    return os.path.relpath(path, data_root).replace("\\", "/")
+
+def _run_stats_by_dir(results: List[Tuple], data_root: str = DATA_ROOT) -> Dict[str, Dict[str, Any]]:
+    """
+    Indexe les compteurs d'un run par dossier de sous-catégorie relatif à
+    data_root ("ScraperAllCategories/mode/Accessoires"), la clé que
+    build_report dérive de chaque products.json : deux catégories ayant une
+    sous-catégorie de même nom ne s'écrasent pas.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    for r in results or []:
+        stats = r[3] if len(r) > 3 and isinstance(r[3], dict) else None
+        if not stats:
+            continue
+        if stats.get("path"):
+            out[_rel_dir(stats["path"], data_root)] = stats
+        elif stats.get("dir"):
+            out[stats["dir"]] = stats
+    return out
+
+def build_report(data_root: str = DATA_ROOT, run_stats: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
     """
     Construit un rapport minimaliste :
     - totals: nombre de sous-catégories et nombre total de produits sauvegardés
     - subcats: mapping subcat_name -> {'saved': int, 'products': [names...]}
+      (le nom du dossier ; s'il est déjà pris par un autre dossier, son
+      chemin sous la racine du run, ex. "mode/Accessoires")
+    Si run_stats (dossier relatif à data_root -> compteurs du dernier run,
+    cf. _run_stats_by_dir) est fourni, les sous-catégories concernées
+    reçoivent 'found' et 'stats'.
+    En mode streaming, les fichiers sont lus produit par produit et seuls
+    les report_max_names premiers noms de chaque sous-catégorie sont gardés
+    ('products_truncated' indique combien ont été omis).
     """
     files = find_products_files(data_root)
     subcats: Dict[str, Dict[str, Any]] = {}
+    by_rel: Dict[str, Dict[str, Any]] = {}   # dossier relatif à data_root -> entrée
     total_products = 0
+    max_names = None
+    if streaming.enabled():
+        max_names = streaming.SETTINGS["report_max_names"]
+        source = ((p, streaming.iter_json_array(p)) for p in files)
+    else:
+        source = ((p, _records_from_data(data)) for p, data in iter_catalog(data_root, files=files))
 
-    for p in files:
+    for p, prods in source:
         # dériver le nom de sous-catégorie depuis le répertoire parent du products.json
-        rel_dir = os.path.relpath(os.path.dirname(p), data_root).replace("\\", "/")
+        rel_dir = _rel_dir(os.path.dirname(p), data_root)
         sub_name = rel_dir.split("/")[-1] if rel_dir else os.path.basename(os.path.dirname(p))
-        prods = read_products(p)
-        names = []
+        entry = by_rel.get(rel_dir)
+        if entry is None:
+            # même nom de sous-catégorie dans une autre catégorie (ou un autre run)
+            key = sub_name
+            if key in subcats:
+                key = rel_dir.split("/", 1)[-1]
+            if key in subcats:
+                key = rel_dir
+            entry = by_rel[rel_dir] = subcats[key] = {"saved": 0, "products": [], "example_path": p}
+        # si plusieurs products.json pour la même sous-catég (peu probable), on concatène
+        names = entry["products"]
+        saved = 0
         for rec in prods:
-            n = _product_name_from_record(rec)
-            names.append(n)
-        saved = len(names)
-        if sub_name in subcats:
-            # si plusieurs products.json pour la même sous-catég (peu probable), on concatène
-            subcats[sub_name]["products"].extend(names)
-            subcats[sub_name]["saved"] += saved
-        else:
-            subcats[sub_name] = {"saved": saved, "products": names, "example_path": p}
+            saved += 1
+            if max_names is None or len(names) < max_names:
+                names.append(_product_name_from_record(rec))
+        entry["saved"] += saved
         total_products += saved
+    if max_names is not None:
+        for entry in subcats.values():
+            if entry["saved"] > len(entry["products"]):
+                entry["products_truncated"] = entry["saved"] - len(entry["products"])
+
+    totals: Dict[str, Any] = {"sous_categories": len(subcats), "sauvegardes": total_products}
+    if run_stats:
+        found = 0
+        for key, stats in run_stats.items():
+            entry = by_rel.get(key) or subcats.get(key)
+            if entry is not None:
+                entry["found"] = stats.get("found", 0)
+                entry["stats"] = stats
+            found += stats.get("found", 0)
+        totals["found"] = found
 
     report = {
         "generated_at": datetime.utcnow().isoformat() + "Z",
-        "totals": {"sous_categories": len(subcats), "sauvegardes": total_products},
+        "totals": totals,
         "subcats": subcats
     }
     return report
@@ -97,7 +150,10 @@ def build_text_report_simple(report: Dict[str, Any]) -> str:
     saved = totals.get("sauvegardes", 0)
 
     lines.append(f"Rapport généré : {generated}")
-    lines.append(f"Total sous-catégories : {scount}    Produits extraits : {saved}\n")
+    if "found" in totals:
+        lines.append(f"Total sous-catégories : {scount}    Liens trouvés (dernier run) : {totals['found']}    Produits extraits : {saved}\n")
+    else:
+        lines.append(f"Total sous-catégories : {scount}    Produits extraits : {saved}\n")
 
     subcats = report.get("subcats", {})
     if not subcats:
@@ -107,6 +163,8 @@ def build_text_report_simple(report: Dict[str, Any]) -> str:
     for sub_name, info in sorted(subcats.items()):
         lines.append(f"Sous-catégorie : {sub_name}")
         lines.append(f"  Produits extraits : {info.get('saved',0)}")
+        if info.get("stats"):
+            lines.append("  Dernier run : " + _format_stats(info["stats"]))
         prods: List[str] = info.get("products", [])
         if not prods:
             lines.append("    (aucun produit)")
@@ -114,10 +172,24 @@ def build_text_report_simple(report: Dict[str, Any]) -> str:
             for n in prods:
                 # n est déjà une string (nom du produit)
                 lines.append(f"    - {n}")
+            if info.get("products_truncated"):
+                lines.append(f"    ... (+{info['products_truncated']} autres)")
         lines.append("")  # ligne vide entre sous-catégories
 
     return "\n".join(lines)
 
+def _format_stats(stats: Dict[str, Any]) -> str:
+    """Compteurs + timings d'une sous-catégorie sur une ligne."""
+    labels = {"found": "trouvés", "already_processed": "déjà traités", "fetched": "récupérés",
+              "parse_failures": "échecs parsing", "image_failures": "échecs image",
+              "errors": "erreurs", "blocked": "bloqués", "skipped_fresh": "à jour",
+              "from_listing": "depuis listing", "recovered": "repris", "saved": "nouveaux"}
+    parts = [f"{lbl} {stats.get(k, 0)}" for k, lbl in labels.items()]
+    timings = stats.get("timings") or {}
+    if timings:
+        parts.append("temps " + ", ".join(f"{k} {v:.1f}s" for k, v in timings.items()))
+    return " | ".join(parts)
+
 def generate_text_reports(report: Dict[str, Any], out_dir: str = REPORTS_DIR) -> Dict[str, str]:
     """
     Écrit trois fichiers texte simples:
@@ -163,18 +235,29 @@ def save_report_json(report: Dict[str, Any], out_dir: str = REPORTS_DIR) -> str:
     except Exception as e:
         return f"(erreur écriture JSON: {e})"
 
-def save_last_scrape(kind: str, results: List[Tuple[str, str, int]], out_dir: str = REPORTS_DIR) -> Dict[str, str]:
+def save_last_scrape(kind: str, results: List[Tuple], out_dir: str = REPORTS_DIR) -> Dict[str, str]:
     """
     Sauvegarde un résumé du dernier run (json + texte luible).
-    Résumé minimaliste : name / url / saved.
+    Résumé : name / url / saved, plus les compteurs et timings par
+    sous-catégorie quand le scraper les fournit (4e élément du tuple).
     """
     ensure_reports_dir(out_dir)
     ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     json_path = os.path.join(out_dir, f"last_run_{kind}_{ts}.json")
     txt_path = os.path.join(out_dir, f"last_run_{kind}.txt")
     try:
+        summary = []
+        totals = {k: 0 for k in STAT_COUNTERS}
+        for r in results:
+            entry = {"name": r[0], "url": r[1], "saved": int(r[2])}
+            stats = r[3] if len(r) > 3 and isinstance(r[3], dict) else None
+            if stats:
+                entry["stats"] = stats
+                for k in STAT_COUNTERS:
+                    totals[k] += int(stats.get(k, 0) or 0)
+            summary.append(entry)
         payload = {"generated_at": datetime.utcnow().isoformat()+"Z", "kind": kind,
-                   "summary":[{"name": r[0], "url": r[1], "saved": int(r[2])} for r in results]}
+                   "totals": totals, "summary": summary}
         with open(json_path, "w", encoding="utf-8") as f:
             json.dump(payload, f, ensure_ascii=False, indent=2)
         with open(txt_path, "w", encoding="utf-8") as f:
@@ -182,30 +265,50 @@ def save_last_scrape(kind: str, results: List[Tuple[str, str, int]], out_dir: st
             if not results:
                 f.write("Aucun élément collecté.\n")
             else:
-                for name, url, saved in results:
-                    f.write(f" - {name} : {saved} produits\n")
+                for entry in summary:
+                    f.write(f" - {entry['name']} : {entry['saved']} produits\n")
+                    if entry.get("stats"):
+                        f.write(f"     {_format_stats(entry['stats'])}\n")
         # regénérer rapports globaux
-        rpt = build_report()
-        generate_text_reports(rpt)
-        save_report_json(rpt)
+        with METRICS.timer("report_seconds"):
+            rpt = build_report(run_stats=_run_stats_by_dir(results))
+            generate_text_reports(rpt)
+            save_report_json(rpt)
+        # rétention : compacte les vieilles archives au lieu de les accumuler
+        try:
+            apply_retention(out_dir)
+            apply_trace_retention(trace.SETTINGS["dir"])
+        except Exception:
+            pass
         return {"json": json_path, "txt": txt_path}
     except Exception as e:
         return {"error": str(e)}
 
-def read_text_report(kind: str, out_dir: str = REPORTS_DIR) -> str:
-    mapping = {
-        "default": os.path.join(out_dir, "report_default.txt"),
-        "categories": os.path.join(out_dir, "report_categories.txt"),
-        "all_categories": os.path.join(out_dir, "report_all_categories.txt")
-    }
-    path = mapping.get(kind)
+TEXT_REPORTS = {
+    "default": "report_default.txt",
+    "categories": "report_categories.txt",
+    "all_categories": "report_all_categories.txt",
+}
+
+def load_text_report(kind: str, out_dir: str = REPORTS_DIR) -> Optional[str]:
+    """Contenu du rapport texte `kind`, None s'il n'a pas encore été généré
+    (une erreur de lecture est levée)."""
+    name = TEXT_REPORTS.get(kind)
+    path = os.path.join(out_dir, name) if name else None
     if not path or not os.path.exists(path):
-        return f"(Fichier {os.path.basename(path) if path else kind} introuvable. Générez le rapport d'abord.)"
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def read_text_report(kind: str, out_dir: str = REPORTS_DIR) -> str:
+    """Comme load_text_report, avec un message à afficher au lieu de None / d'une erreur."""
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
+        content = load_text_report(kind, out_dir)
     except Exception as e:
-        return f"(Erreur lecture {path}: {e})"
+        return f"(Erreur lecture {TEXT_REPORTS.get(kind, kind)}: {e})"
+    if content is None:
+        return f"(Fichier {TEXT_REPORTS.get(kind, kind)} introuvable. Générez le rapport d'abord.)"
+    return content
 
 def interactive_report_menu():
     ensure_reports_dir()
@@ -215,25 +318,39 @@ def interactive_report_menu():
         print("2) Afficher le rapport du scrape de la catégorie (dernier run)")
         print("3) Afficher le rapport du scrape de toutes les catégories (dernier run)")
         print("4) Regénérer et sauvegarder les rapports")
+        print("5) Comparer deux runs")
+        print("6) Appliquer la rétention des archives")
         print("0) Retour")
         c = input("Choix : ").strip()
         if c == "1":
+            if load_text_report("default") is None:
+                rpt = build_report(); generate_text_reports(rpt); save_report_json(rpt)
             content = read_text_report("default")
-            if "introuvable" in content:
-                rpt = build_report(); generate_text_reports(rpt); save_report_json(rpt); content = read_text_report("default")
             print("\n" + content)
         elif c == "2":
+            if load_text_report("categories") is None:
+                rpt = build_report(); generate_text_reports(rpt); save_report_json(rpt)
             content = read_text_report("categories")
-            if "introuvable" in content:
-                rpt = build_report(); generate_text_reports(rpt); save_report_json(rpt); content = read_text_report("categories")
             print("\n" + content)
         elif c == "3":
+            if load_text_report("all_categories") is None:
+                rpt = build_report(); generate_text_reports(rpt); save_report_json(rpt)
             content = read_text_report("all_categories")
-            if "introuvable" in content:
-                rpt = build_report(); generate_text_reports(rpt); save_report_json(rpt); content = read_text_report("all_categories")
             print("\n" + content)
         elif c == "4":
             rpt = build_report(); generate_text_reports(rpt); p = save_report_json(rpt); print(f"Rapports régénérés. JSON archivé: {p}")
+        elif c == "5":
+            runs = [ts for ts, _ in list_archives().get("report", [])]
+            if runs:
+                print("Runs disponibles : " + ", ".join(runs[-10:]))
+            a = input("Run de départ (ts) : ").strip()
+            b = input("Run d'arrivée (ts, vide = latest) : ").strip() or "latest"
+            print("\n" + format_diff_text(diff_runs(a, b)))
+        elif c == "6":
+            counts = apply_retention()
+            traces = apply_trace_retention(trace.SETTINGS["dir"])
+            print(f"Rétention : {counts['kept']} gardés, {counts['compacted']} compactés, {counts['dropped']} supprimés.")
+            print(f"Traces : {traces['kept']} run(s) gardé(s), {traces['dropped']} supprimé(s).")
         elif c == "0":
             break
         else:
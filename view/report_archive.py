@@ -0,0 +1,346 @@
+# view/report_archive.py
+# Rétention des archives de view/reports et historique compacté.
+#
+# Chaque run écrit last_run_<kind>_<ts>.json et report_<ts>.json. Les fichiers
+# récents (N derniers ou moins de D jours) restent tels quels ; les plus vieux
+# sont sous-échantillonnés (un par jour) puis compactés dans
+# history_<série>.jsonl.gz : une ligne JSON par run, un instantané complet
+# toutes les KEYFRAME_EVERY lignes et des deltas entre les deux.
+#
+# Les traces par URL (traces/trace_<run>.jsonl, cf. utils/trace.py) suivent
+# la même fenêtre ; elles ne servent qu'au diagnostic et ne sont pas compactées.
+import os
+import re
+import json
+import gzip
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+REPORTS_DIR = os.path.join("view", "reports")
+
+RETENTION_KEEP_LAST = 30
+RETENTION_KEEP_DAYS = 14
+KEYFRAME_EVERY = 20
+
+TS_FORMAT = "%Y%m%d_%H%M%S"
+ARCHIVE_RE = re.compile(r"^(report|last_run_[A-Za-z0-9_]+?)_(\d{8}_\d{6})\.json$")
+TRACES_DIR = os.path.join(REPORTS_DIR, "traces")
+TRACE_RE = re.compile(r"^trace_(.+?)(?:-p\d+)?\.jsonl$")   # -p<pid> : fichier d'un worker du run
+TRACE_TS_RE = re.compile(r"_(\d{8}-\d{6})_")
+
+_MISSING = object()
+
+
+def _history_path(series: str, out_dir: str) -> str:
+    return os.path.join(out_dir, f"history_{series}.jsonl.gz")
+
+
+def list_archives(out_dir: str = REPORTS_DIR) -> Dict[str, List[Tuple[str, str]]]:
+    """Retourne {série: [(ts, chemin), ...]} trié du plus ancien au plus récent."""
+    series: Dict[str, List[Tuple[str, str]]] = {}
+    try:
+        names = os.listdir(out_dir)
+    except FileNotFoundError:
+        return series
+    for fn in names:
+        m = ARCHIVE_RE.match(fn)
+        if m:
+            series.setdefault(m.group(1), []).append((m.group(2), os.path.join(out_dir, fn)))
+    for lst in series.values():
+        lst.sort()
+    return series
+
+
+# --- delta encoding -------------------------------------------------------
+
+def json_delta(old: Any, new: Any) -> Any:
+    """Delta récursif entre deux documents JSON.
+    Dicts : {"+": ajoutés/modifiés, "-": clés supprimées, "~": sous-deltas}.
+    Autres valeurs : {"=": nouvelle valeur}. None si identiques.
+    """
+    if old == new:
+        return None
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        return {"=": new}
+    delta: Dict[str, Any] = {}
+    added = {k: v for k, v in new.items() if k not in old}
+    removed = [k for k in old if k not in new]
+    nested = {}
+    for k, v in new.items():
+        if k in old and old[k] != v:
+            if isinstance(v, dict) and isinstance(old[k], dict):
+                nested[k] = json_delta(old[k], v)
+            else:
+                added[k] = v
+    if added:
+        delta["+"] = added
+    if removed:
+        delta["-"] = removed
+    if nested:
+        delta["~"] = nested
+    return delta
+
+
+def apply_delta(doc: Any, delta: Any) -> Any:
+    """Applique un delta produit par json_delta (retourne un nouvel objet)."""
+    if delta is None:
+        return doc
+    if "=" in delta:
+        return delta["="]
+    out = dict(doc) if isinstance(doc, dict) else {}
+    for k in delta.get("-", []):
+        out.pop(k, None)
+    for k, sub in delta.get("~", {}).items():
+        out[k] = apply_delta(out.get(k, {}), sub)
+    out.update(delta.get("+", {}))
+    return out
+
+
+# --- historique compacté --------------------------------------------------
+
+def iter_history(series: str, out_dir: str = REPORTS_DIR) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Rejoue l'historique d'une série : yield (ts, document reconstruit)."""
+    path = _history_path(series, out_dir)
+    if not os.path.exists(path):
+        return
+    state: Any = None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            if "base" in rec:
+                state = rec["base"]
+            elif state is not None:
+                state = apply_delta(state, rec.get("delta"))
+            else:
+                continue
+            yield rec["ts"], state
+
+
+def _history_tail(series: str, out_dir: str) -> Tuple[Optional[str], Any, int]:
+    """Dernier ts, dernier état et nombre de lignes depuis le dernier keyframe."""
+    last_ts, state, since_key = None, None, 0
+    path = _history_path(series, out_dir)
+    if not os.path.exists(path):
+        return last_ts, state, since_key
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            if "base" in rec:
+                state, since_key = rec["base"], 0
+            elif state is not None:
+                state, since_key = apply_delta(state, rec.get("delta")), since_key + 1
+            last_ts = rec.get("ts", last_ts)
+    return last_ts, state, since_key
+
+
+def compact_into_history(series: str, entries: List[Tuple[str, str]], out_dir: str = REPORTS_DIR) -> List[str]:
+    """Ajoute les fichiers (ts, chemin) à l'historique gzip de la série.
+    Retourne les chemins effectivement compactés (à supprimer par l'appelant).
+    Les entrées antérieures au dernier ts de l'historique sont ignorées.
+    """
+    last_ts, state, since_key = _history_tail(series, out_dir)
+    done: List[str] = []
+    lines: List[str] = []
+    for ts, path in sorted(entries):
+        if last_ts is not None and ts <= last_ts:
+            done.append(path)  # déjà présent dans l'historique
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except Exception:
+            continue
+        if state is None or since_key + 1 >= KEYFRAME_EVERY:
+            rec = {"ts": ts, "base": doc}
+            since_key = 0
+        else:
+            rec = {"ts": ts, "delta": json_delta(state, doc)}
+            since_key += 1
+        lines.append(json.dumps(rec, ensure_ascii=False, separators=(",", ":")))
+        state, last_ts = doc, ts
+        done.append(path)
+    if lines:
+        # gzip accepte plusieurs membres concaténés : on ajoute sans réécrire
+        with gzip.open(_history_path(series, out_dir), "at", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    return done
+
+
+def apply_retention(out_dir: str = REPORTS_DIR, keep_last: int = RETENTION_KEEP_LAST,
+                    keep_days: int = RETENTION_KEEP_DAYS, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Politique de rétention des archives JSON de out_dir :
+      - garde les keep_last plus récents de chaque série et tout ce qui a moins de keep_days jours
+      - au-delà, garde un run par jour (le dernier) compacté dans l'historique gzip
+      - supprime les fichiers compactés ou écartés par le sous-échantillonnage
+    Retourne des compteurs {kept, compacted, dropped}.
+    """
+    now = now or datetime.utcnow()
+    limit = now - timedelta(days=keep_days)
+    counts = {"kept": 0, "compacted": 0, "dropped": 0}
+    for series, entries in list_archives(out_dir).items():
+        old: List[Tuple[str, str]] = []
+        for i, (ts, path) in enumerate(reversed(entries)):
+            try:
+                when = datetime.strptime(ts, TS_FORMAT)
+            except ValueError:
+                when = now
+            if i < keep_last or when >= limit:
+                counts["kept"] += 1
+            else:
+                old.append((ts, path))
+        if not old:
+            continue
+        per_day: Dict[str, Tuple[str, str]] = {}
+        for ts, path in old:
+            day = ts[:8]
+            if day not in per_day or ts > per_day[day][0]:
+                per_day[day] = (ts, path)
+        compacted = compact_into_history(series, list(per_day.values()), out_dir)
+        counts["compacted"] += len(compacted)
+        keep_paths = {p for _, p in per_day.values()} - set(compacted)
+        for ts, path in old:
+            if path in keep_paths:
+                continue  # compaction échouée : on ne perd pas le fichier
+            try:
+                os.remove(path)
+                if path not in compacted:
+                    counts["dropped"] += 1
+            except OSError:
+                pass
+    return counts
+
+
+def apply_trace_retention(trace_dir: str = TRACES_DIR, keep_last: int = RETENTION_KEEP_LAST,
+                          keep_days: int = RETENTION_KEEP_DAYS, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Même fenêtre que apply_retention pour les traces JSONL : garde les keep_last
+    runs les plus récents et tout ce qui a moins de keep_days jours, supprime le
+    reste (fichiers des workers compris). Retourne {kept, dropped} en runs.
+    """
+    now = now or datetime.now()     # les identifiants de run sont en heure locale
+    limit = now - timedelta(days=keep_days)
+    runs: Dict[str, List[str]] = {}
+    try:
+        names = os.listdir(trace_dir)
+    except FileNotFoundError:
+        return {"kept": 0, "dropped": 0}
+    for fn in names:
+        m = TRACE_RE.match(fn)
+        if m:
+            runs.setdefault(m.group(1), []).append(os.path.join(trace_dir, fn))
+    dated = []
+    for run, paths in runs.items():
+        m = TRACE_TS_RE.search(run)
+        try:
+            when = datetime.strptime(m.group(1), "%Y%m%d-%H%M%S") if m else None
+        except ValueError:
+            when = None
+        if when is None:
+            try:
+                when = datetime.fromtimestamp(max(os.path.getmtime(p) for p in paths))
+            except OSError:
+                when = now
+        dated.append((when, run))
+    counts = {"kept": 0, "dropped": 0}
+    for i, (when, run) in enumerate(sorted(dated, reverse=True)):
+        if i < keep_last or when >= limit:
+            counts["kept"] += 1
+            continue
+        for path in runs[run]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        counts["dropped"] += 1
+    return counts
+
+
+# --- comparaison de runs --------------------------------------------------
+
+def load_run(ref: str, out_dir: str = REPORTS_DIR, series: str = "report") -> Optional[Dict[str, Any]]:
+    """Charge un run par chemin, par ts (YYYYmmdd_HHMMSS) ou 'latest',
+    depuis les fichiers encore présents puis depuis l'historique compacté."""
+    if os.path.isfile(ref):
+        with open(ref, "r", encoding="utf-8") as f:
+            return json.load(f)
+    files = dict(list_archives(out_dir).get(series, []))
+    if ref == "latest":
+        if not files:
+            return None
+        ref = max(files)
+    if ref in files:
+        with open(files[ref], "r", encoding="utf-8") as f:
+            return json.load(f)
+    for ts, doc in iter_history(series, out_dir):
+        if ts == ref:
+            return doc
+        if ts > ref:
+            break
+    return None
+
+
+def diff_reports(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Compare deux rapports (format build_report) par sous-catégorie."""
+    old_subs = old.get("subcats", {}) or {}
+    new_subs = new.get("subcats", {}) or {}
+    changed = {}
+    for name in sorted(set(old_subs) & set(new_subs)):
+        a, b = old_subs[name], new_subs[name]
+        pa, pb = set(a.get("products", [])), set(b.get("products", []))
+        if a.get("saved") != b.get("saved") or pa != pb:
+            changed[name] = {
+                "saved": [a.get("saved", 0), b.get("saved", 0)],
+                "products_added": sorted(pb - pa),
+                "products_removed": sorted(pa - pb),
+            }
+    return {
+        "from": old.get("generated_at"),
+        "to": new.get("generated_at"),
+        "subcats_added": sorted(set(new_subs) - set(old_subs)),
+        "subcats_removed": sorted(set(old_subs) - set(new_subs)),
+        "subcats_changed": changed,
+    }
+
+
+def diff_runs(ref_a: str, ref_b: str = "latest", out_dir: str = REPORTS_DIR, series: str = "report") -> Dict[str, Any]:
+    """Diff entre deux runs quelconques d'une série (fichiers ou historique)."""
+    a = load_run(ref_a, out_dir, series)
+    b = load_run(ref_b, out_dir, series)
+    if a is None or b is None:
+        missing = ref_a if a is None else ref_b
+        return {"error": f"run introuvable: {missing}"}
+    if series == "report":
+        return diff_reports(a, b)
+    return {"from": a.get("generated_at"), "to": b.get("generated_at"), "delta": json_delta(a, b)}
+
+
+def format_diff_text(diff: Dict[str, Any]) -> str:
+    if "error" in diff:
+        return f"({diff['error']})"
+    if "delta" in diff:
+        return json.dumps(diff, ensure_ascii=False, indent=2)
+    lines = [f"Comparaison {diff.get('from')} -> {diff.get('to')}"]
+    for name in diff.get("subcats_added", []):
+        lines.append(f"  + {name}")
+    for name in diff.get("subcats_removed", []):
+        lines.append(f"  - {name}")
+    for name, info in diff.get("subcats_changed", {}).items():
+        a, b = info["saved"]
+        lines.append(f"  ~ {name} : {a} -> {b} produits")
+        for n in info["products_added"]:
+            lines.append(f"      + {n}")
+        for n in info["products_removed"]:
+            lines.append(f"      - {n}")
+    if len(lines) == 1:
+        lines.append("  (aucune différence)")
+    return "\n".join(lines)
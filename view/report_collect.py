@@ -1,26 +1,14 @@
 # view/report_collect.py
-import os, json
+import os
 from typing import List, Dict, Any
+from utils.catalog import discover_product_files, is_products_like_file, iter_catalog, load_json
 
 DATA_ROOT = "data"
 
 def find_product_files(data_root: str = DATA_ROOT) -> List[str]:
-    out = []
-    for root, _, files in os.walk(data_root):
-        for fn in files:
-            low = fn.lower()
-            if low in ("products.json", "grosses.json", "gross.json"):
-                out.append(os.path.join(root, fn))
-            elif low.endswith(".json") and ("products" in low or "gross" in low):
-                out.append(os.path.join(root, fn))
-    return out
+    return discover_product_files(data_root, is_products_like_file)
 
-def read_products(path: str) -> List[Dict[str,Any]]:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        return []
+def _records_from_data(data: Any) -> List[Dict[str,Any]]:
     if isinstance(data, list):
         return data
     if isinstance(data, dict):
@@ -32,12 +20,15 @@ def read_products(path: str) -> List[Dict[str,Any]]:
             return vals
     return []
 
+def read_products(path: str) -> List[Dict[str,Any]]:
+    return _records_from_data(load_json(path))
+
 def collect_by_subdir(data_root: str = DATA_ROOT) -> Dict[str, Dict[str,Any]]:
     files = find_product_files(data_root)
     mapping: Dict[str, Dict[str,Any]] = {}
-    for p in files:
+    for p, data in iter_catalog(data_root, files=files):
         rel = os.path.relpath(os.path.dirname(p), data_root).replace("\\","/")
-        lst = read_products(p)
+        lst = _records_from_data(data)
         if rel not in mapping:
             mapping[rel] = {"products": [], "example_path": p}
         mapping[rel]["products"].extend(lst)